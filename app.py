@@ -20,3 +20,9 @@ with col1:
     
 st.markdown("---")
 st.info("📘 Curso: Sistemas de Informação – Disciplina de Fundamentos em Ciência de Dados (2025.2)")
+
+# a página inicial não importa pandas/plotly: com ela já desenhada, a pré-carga
+# prepara em segundo plano o conteúdo padrão dos três dashboards
+from controllers import warmup
+
+warmup.start()
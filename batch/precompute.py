@@ -0,0 +1,240 @@
+# Pré-cálculo em lote dos dashboards, sem Streamlit.
+#
+# Uso (a partir da raiz do repositório):
+#   python -m batch.precompute --data data
+#   python -m batch.precompute --data /dados/fcd --workers 8 --partition month
+#
+# Roda os cálculos dos controllers (visão de inventário e alertas,
+# conciliação do estoque, comparativo de fornecedores, volumes mensais e
+# top-N de compras e vendas) num pool de processos e grava os resultados
+# como artefatos versionados (models/artifacts.py), que os controllers usam
+# enquanto os dados não mudarem. Com históricos grandes, compras e vendas
+# também são divididas em partições por período: cada processo soma a sua
+# partição e o processo principal só combina os parciais (somas e
+# contagens). Feito para rodar de madrugada no cron; termina com erro se
+# algum cálculo falhar.
+#
+# O app lê os artefatos de <data>/artefatos ou de FCD_ARTIFACTS: com --out
+# apontando para outro lugar, inicie o app com FCD_ARTIFACTS=<out>.
+import argparse
+import hashlib
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from models import artifacts, compact, dataModel, sqlBackend, stockLedger
+from models.purchaseTotals import PurchaseTotals, accumulate
+from models.timeSeries import TimeSeriesEngine
+
+datasets = ["produtos", "estoque", "compras", "vendas", "fornecedores"]
+# particionamento automático a partir deste número de linhas (compras ou vendas)
+partitionMinRows = 2_000_000
+partitionFreqs = {"year": "Y", "quarter": "Q", "month": "M"}
+
+
+def _initWorker(dataDirStr: str):
+    # roda em cada processo filho: mesmos dados, sempre em pandas e sem ler artefatos antigos
+    dataModel.dataDir = Path(dataDirStr)
+    sqlBackend.backend = "pandas"
+    artifacts.enabled = False
+
+
+def _slice(df: pd.DataFrame, dateCol: str, bounds) -> pd.DataFrame:
+    lo, hi, withMissing = bounds
+    if lo is None or df.empty:
+        return df
+    dates = df[dateCol]
+    mask = (dates >= lo) & (dates < hi)
+    if withMissing:
+        # linhas sem data entram na primeira partição, para os totais baterem
+        mask |= dates.isna()
+    return df[mask]
+
+
+def _inventoryJob():
+    from controllers.inventoryController import InventoryController
+    start = time.perf_counter()
+    view = InventoryController().buildInventoryView(None)
+    alerts = view[view["quantidadeEstoque"] < view["estoqueMinimo"]] if not view.empty else view
+    return {"estoque_visao": view, "estoque_alertas": alerts}, time.perf_counter() - start
+
+
+def _ledgerJob():
+    from controllers.ledgerController import LedgerController
+    start = time.perf_counter()
+    return LedgerController().getReconciliation(), time.perf_counter() - start
+
+
+def _purchasesJob(bounds):
+    from controllers.purchasesController import PurchasesController
+    start = time.perf_counter()
+    compras = _slice(PurchasesController().comprasDf, "data_compra", bounds)
+    return PurchaseTotals().fold(compras), time.perf_counter() - start
+
+
+def _salesJob(bounds):
+    from controllers.salesController import SalesController
+    start = time.perf_counter()
+    vendas = _slice(SalesController().vendasDf, "data", bounds)
+    if vendas.empty or "produtoNome" not in vendas.columns:
+        return (None, None), time.perf_counter() - start
+    # mesmos somatórios do cubo: quantidade por produto e totais por dia
+    produtos = vendas.groupby("produtoNome", observed=True)[["quantidadeVendida"]].sum()
+    produtos.index = produtos.index.astype(object)
+    diario = vendas.groupby(vendas["data"].dt.normalize())[["quantidadeVendida", "valorTotal"]].sum()
+    return (produtos, diario), time.perf_counter() - start
+
+
+def plan(dates: pd.Series, partition: str) -> list:
+    """Limites (início, fim exclusivo, inclui sem data) de cada partição de `dates`."""
+    if dates is None or dates.isna().all():
+        return [(None, None, True)]
+    if partition == "auto":
+        partition = "month" if len(dates) >= partitionMinRows else "none"
+    if partition == "none":
+        return [(None, None, True)]
+    valid = dates.dropna()
+    periods = pd.period_range(valid.min(), valid.max(), freq=partitionFreqs[partition])
+    return [(p.start_time, (p + 1).start_time, i == 0) for i, p in enumerate(periods)]
+
+
+def _productNames(produtos: pd.DataFrame) -> pd.Series:
+    # mesmo mapeamento de PurchasesController._product_names
+    if produtos.empty or "produto_nome" not in produtos.columns:
+        return pd.Series(dtype="object")
+    return produtos.drop_duplicates("produto_id").set_index("produto_id")["produto_nome"]
+
+
+def _purchaseArtifacts(parts: list, names: pd.Series, top: int) -> dict:
+    totals = PurchaseTotals()
+    for part in parts:
+        totals.merge(part)
+    deps = ("compras", "produtos")
+    return {
+        "compras_comparativo": (totals.supplierComparative(), deps, {}),
+        "compras_volume_mensal": (totals.monthlyVolume(), deps, {}),
+        "compras_top_produtos": (totals.topProducts(names, top), deps, {"top": top}),
+    }
+
+
+def _salesArtifacts(parts: list, top: int) -> dict:
+    produtos = diario = None
+    for partProdutos, partDiario in parts:
+        if partProdutos is not None:
+            produtos = accumulate(produtos, partProdutos)
+            diario = accumulate(diario, partDiario)
+    deps = ("vendas", "produtos")
+    if produtos is None:
+        return {
+            "vendas_top_produtos": (pd.DataFrame(columns=["produtoNome", "quantidadeVendida"]), deps, {"top": top}),
+            "vendas_volume_mensal": (pd.DataFrame(columns=["data", "quantidadeVendida", "valorTotal"]), deps, {}),
+        }
+    topDf = produtos["quantidadeVendida"].sort_values(ascending=False).head(top).rename_axis("produtoNome").reset_index()
+    engine = TimeSeriesEngine(diario.sort_index().rename_axis("data"), "data", ["quantidadeVendida", "valorTotal"])
+    return {
+        "vendas_top_produtos": (topDf, deps, {"top": top}),
+        "vendas_volume_mensal": (engine.view("M"), deps, {}),
+    }
+
+
+def run(outDir: Path, workers: int = None, partition: str = "auto", top: int = 10, keep: int = 7) -> dict:
+    """Calcula e publica todos os artefatos; retorna o manifest gravado."""
+    started = time.perf_counter()
+    versions = {name: artifacts.versionTag(name) for name in datasets}
+
+    # CSVs interpretados em paralelo para o cache Arrow, que os filhos só mapeiam
+    frames = dataModel.loadAll(datasets, workers)
+    comprasPlan = plan(frames.get("compras", pd.DataFrame()).get("data_compra"), partition)
+    vendasPlan = plan(frames.get("vendas", pd.DataFrame()).get("data_venda"), partition)
+    names = _productNames(frames.get("produtos", pd.DataFrame()))
+    del frames
+    loaded = time.perf_counter()
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_initWorker,
+                             initargs=(str(dataModel.dataDir),)) as pool:
+        inventory = pool.submit(_inventoryJob)
+        ledger = pool.submit(_ledgerJob)
+        purchases = [pool.submit(_purchasesJob, b) for b in comprasPlan]
+        sales = [pool.submit(_salesJob, b) for b in vendasPlan]
+        inventoryResult, inventoryTime = inventory.result()
+        reconciliation, ledgerTime = ledger.result()
+        purchaseParts = [f.result() for f in purchases]
+        salesParts = [f.result() for f in sales]
+
+    results = {name: (df, ("produtos", "estoque"), {}) for name, df in inventoryResult.items()}
+    results["estoque_conciliacao"] = (
+        reconciliation, ("produtos", "estoque", "compras", "vendas"), {"tolerancia": stockLedger.defaultTolerance}
+    )
+    results.update(_purchaseArtifacts([p for p, _ in purchaseParts], names, top))
+    results.update(_salesArtifacts([p for p, _ in salesParts], top))
+
+    after = {name: artifacts.versionTag(name) for name in datasets}
+    if after != versions:
+        changed = [n for n in datasets if after[n] != versions[n]]
+        raise RuntimeError(f"dados mudaram durante o cálculo ({', '.join(changed)}); nada foi publicado")
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    digest = hashlib.sha1(repr(sorted(versions.items())).encode("utf-8")).hexdigest()[:8]
+    # nome ordenável pela data da execução; o sufixo identifica os dados de origem
+    directory = outDir / f"{stamp}-{digest}"
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        "geradoEm": datetime.now().isoformat(timespec="seconds"),
+        "dados": str(dataModel.dataDir.resolve()),
+        "compacto": compact.enabled,
+        "versoes": versions,
+        "particoes": {"compras": len(comprasPlan), "vendas": len(vendasPlan)},
+        "artefatos": {},
+    }
+    for name, (df, deps, params) in results.items():
+        manifest["artefatos"][name] = {
+            "arquivo": artifacts.write(df, directory, name),
+            "datasets": list(deps), "parametros": params, "linhas": len(df),
+        }
+    manifest["tempos"] = {
+        "carga": loaded - started,
+        "inventario": inventoryTime,
+        "conciliacao": ledgerTime,
+        "compras": [t for _, t in purchaseParts],
+        "vendas": [t for _, t in salesParts],
+        "total": time.perf_counter() - started,
+    }
+    artifacts.publish(directory, manifest, keep)
+    manifest["diretorio"] = str(directory)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-cálculo em lote dos dashboards do FCD.")
+    parser.add_argument("--data", default="data", help="diretório com os CSVs")
+    parser.add_argument("--out", help="diretório dos artefatos (padrão: FCD_ARTIFACTS ou <data>/artefatos, onde o app lê)")
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: núcleos da máquina)")
+    parser.add_argument("--partition", choices=["auto", "none", *partitionFreqs], default="auto",
+                        help=f"partições de compras/vendas por período (auto: mensal a partir de {partitionMinRows:,} linhas)")
+    parser.add_argument("--top", type=int, default=10, help="tamanho dos rankings de produtos")
+    parser.add_argument("--keep", type=int, default=7, help="execuções anteriores mantidas no diretório")
+    args = parser.parse_args()
+
+    dataModel.dataDir = Path(args.data)
+    outDir = Path(args.out) if args.out else artifacts.root()
+    try:
+        manifest = run(outDir, args.workers, args.partition, args.top, args.keep)
+    except Exception as e:
+        print(f"❌ Pré-cálculo falhou: {e}")
+        sys.exit(1)
+
+    for name, entry in manifest["artefatos"].items():
+        print(f"{name:25} {entry['linhas']:8d} linhas  {entry['arquivo']}")
+    print(f"✅ Artefatos publicados em {manifest['diretorio']} ({manifest['tempos']['total']:.2f}s)")
+    if outDir.resolve() != artifacts.root().resolve():
+        print(f"⚠️ O app só lê {artifacts.root()}: inicie-o com FCD_ARTIFACTS={outDir} para usar estes artefatos.")
+
+
+if __name__ == "__main__":
+    main()
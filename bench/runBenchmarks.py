@@ -0,0 +1,250 @@
+# Benchmarks dos loaders e dos métodos quentes dos controllers.
+#
+# Uso (a partir da raiz do repositório):
+#   python -m bench.runBenchmarks --rows 1000000 --out bench/results.json
+#   python -m bench.runBenchmarks --data /tmp/fcd-bench --compare bench/baseline.json
+#
+# Cada caso roda `--repeat` vezes a frio (cache compartilhado e memo vazios)
+# e o tempo mínimo/mediano vai para o JSON. Os casos que passam pelo memo
+# também são medidos com o resultado já memorizado (sufixo `.memo`). O pico
+# de memória é medido numa execução extra com tracemalloc, para não
+# distorcer os tempos.
+import argparse
+import json
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bench import syntheticData
+from models import dataModel, memo
+from models.dataStore import store
+
+datasets = ["produtos", "estoque", "compras", "vendas", "fornecedores"]
+# casos servidos pelo memo a partir da segunda chamada com o mesmo filtro
+memoCases = (
+    "purchases.filter_data", "purchases.get_supplier_comparative", "purchases.get_monthly_volume",
+    "sales.filterData", "sales.filterCube",
+)
+
+
+def _rows(value) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame):
+        return len(value[0])
+    return 0
+
+
+def _dropArrowCache():
+    shutil.rmtree(dataModel.dataDir / ".cache", ignore_errors=True)
+
+
+def _coldStore():
+    # esvazia o cache do processo e o memo, mas mantém os datasets já interpretados em Arrow
+    store.invalidate()
+    memo.clear()
+    for name in datasets:
+        store.get(name)
+
+
+def _controllerCases(cube: bool) -> dict:
+    # import tardio: os controllers leem o store na construção
+    from controllers.inventoryController import InventoryController
+    from controllers.purchasesController import PurchasesController
+    from controllers.salesController import SalesController
+
+    def purchases():
+        pc = PurchasesController()
+        return pc, pc.filter_data()
+
+    def sales():
+        return SalesController()
+
+    vendas = store.get("vendas")
+    lojas = sorted(vendas["loja_id"].dropna().unique())[:3] if "loja_id" in vendas else None
+    compras = store.get("compras")
+    fornecedores = sorted(compras["fornecedor"].dropna().unique())[:3] if "fornecedor" in compras else None
+    inicio = compras["data_compra"].quantile(0.25) if "data_compra" in compras else None
+    fim = compras["data_compra"].quantile(0.75) if "data_compra" in compras else None
+
+    cases = {
+        "inventory.buildInventoryView": (None, lambda _: InventoryController().buildInventoryView()),
+        "inventory.getLatestStockPerProduct": (None, lambda _: InventoryController().getLatestStockPerProduct()),
+        "purchases.load_data": (None, lambda _: PurchasesController().comprasDf),
+        "purchases.filter_data": (
+            PurchasesController, lambda pc: pc.filter_data(fornecedores=fornecedores, start=inicio, end=fim)
+        ),
+        "purchases.get_supplier_comparative": (purchases, lambda s: s[0].get_supplier_comparative(s[1])),
+        "purchases.get_monthly_volume": (purchases, lambda s: s[0].get_monthly_volume(s[1])),
+        "purchases.get_supplier_scorecard": (PurchasesController, lambda pc: pc.get_supplier_scorecard()),
+        "sales.reloadData": (None, lambda _: SalesController().vendasDf),
+        "sales.filterData": (sales, lambda sc: sc.filterData(lojas=lojas, startDate=inicio, endDate=fim)),
+        "sales.getTimeSeries": (sales, lambda sc: sc.getTimeSeries(sc.vendasDf)),
+    }
+    if cube:
+        cases["sales.filterCube"] = (sales, lambda sc: sc.filterCube(lojas=lojas, startDate=inicio, endDate=fim))
+    return cases
+
+
+def _measure(setup, fn, repeat: int) -> dict:
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        rows = _rows(fn(arg))
+        times.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "runs": times,
+        "peakMB": peak / 1024 / 1024,
+        "rowsOut": rows,
+    }
+
+
+def runAll(repeat: int = 3, cube: bool = True, only: str = None) -> dict:
+    results = {}
+
+    def wanted(case):
+        return only is None or only in case
+
+    for name in datasets:
+        loader = dataModel.loaders[name]
+        if wanted(f"load.{name}.cold"):
+            # sem cache Arrow: parse completo do CSV
+            results[f"load.{name}.cold"] = _measure(_dropArrowCache, lambda _: loader(), repeat)
+        if wanted(f"load.{name}.warm"):
+            loader()
+            results[f"load.{name}.warm"] = _measure(None, lambda _: loader(), repeat)
+    if wanted("load.loadAll"):
+        results["load.loadAll.cold"] = _measure(_dropArrowCache, lambda _: dataModel.loadAll(datasets), repeat)
+
+    _coldStore()
+    for case, (setup, fn) in _controllerCases(cube).items():
+        if not wanted(case):
+            continue
+
+        def coldSetup(setup=setup):
+            # o build de cada caso é medido sem os derivados em cache
+            _coldStore()
+            return setup() if setup else None
+
+        results[case] = _measure(coldSetup, fn, repeat)
+        if case not in memoCases:
+            continue
+
+        def memoSetup(setup=setup, fn=fn):
+            # mesma chamada já feita uma vez: a medida é só o acerto no memo
+            arg = coldSetup(setup)
+            fn(arg)
+            return arg
+        results[f"{case}.memo"] = _measure(memoSetup, fn, repeat)
+    return results
+
+
+def metadata(dataDir: Path, args) -> dict:
+    files = {
+        p.name: {"bytes": p.stat().st_size}
+        for p in sorted(dataDir.glob("*.csv"))
+    }
+    for name in datasets:
+        if f"{name}.csv" in files:
+            files[f"{name}.csv"]["rows"] = len(store.get(name))
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "dataDir": str(dataDir),
+        "files": files,
+        "repeat": args.repeat,
+        # ru_maxrss é em KiB no Linux
+        "maxRssMB": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Imprime as razões atual/baseline e devolve os casos que regrediram."""
+    regressions = []
+    print(f"{'caso':45} {'baseline':>10} {'atual':>10} {'razão':>7}")
+    for case, res in current["results"].items():
+        base = baseline.get("results", {}).get(case)
+        if not base:
+            print(f"{case:45} {'-':>10} {res['median']:10.4f} {'novo':>7}")
+            continue
+        ratio = res["median"] / base["median"] if base["median"] else float("inf")
+        flag = " ⚠️" if ratio > threshold else ""
+        print(f"{case:45} {base['median']:10.4f} {res['median']:10.4f} {ratio:7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(case)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos loaders e controllers do FCD.")
+    parser.add_argument("--data", help="diretório com os CSVs (se omitido, gera dados sintéticos)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--suppliers", type=int, default=20)
+    parser.add_argument("--products", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="roda só os casos que contêm este texto")
+    parser.add_argument("--no-cube", action="store_true", help="pula sales.filterCube")
+    parser.add_argument("--out", default="bench/results.json")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="razão atual/baseline acima da qual o caso conta como regressão")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.data:
+        dataDir = Path(args.data)
+    else:
+        tmp = tempfile.mkdtemp(prefix="fcd-bench-")
+        dataDir = syntheticData.generate(
+            tmp, args.rows, args.products, args.stores, args.suppliers, seed=args.seed
+        )
+    dataModel.dataDir = dataDir
+
+    try:
+        results = runAll(args.repeat, cube=not args.no_cube, only=args.only)
+        report = {"meta": metadata(dataDir, args), "results": results}
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    print(f"✅ Resultados salvos em {out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+    else:
+        for case, res in results.items():
+            print(f"{case:45} {res['median']:10.4f}s  pico {res['peakMB']:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
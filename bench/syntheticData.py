@@ -0,0 +1,177 @@
+# Gerador determinístico de dados sintéticos com os mesmos schemas de data/.
+#
+# Uso:
+#   python -m bench.syntheticData --out /tmp/fcd-bench --rows 1000000 --stores 50 --suppliers 40
+#
+# Os arquivos grandes (estoque, compras, vendas) são gravados em blocos, então
+# a memória usada não depende do número de linhas pedido (10^4 a 10^8).
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+categorias = ["Acessórios", "Pneus", "Transmissão", "Elétrica", "Motor", "Freios", "Suspensão"]
+marcas = ["Yamaha", "Kawasaki", "Suzuki", "NGK", "Bosch", "Magneti Marelli", "Pirelli", "Shineray", "Honda", "Cofap"]
+statusCompra = ["Entregue", "Pendente", "Cancelada"]
+statusPesos = [0.86, 0.095, 0.045]
+estados = ["PE", "SP", "MG", "CE", "RJ", "PR", "BA", "RS"]
+chunkRows = 1_000_000
+dataInicial = pd.Timestamp("2020-01-01")
+
+
+def storeNames(stores: int) -> list:
+    return ["Depósito Central"] + [f"Loja {i}" for i in range(1, stores)]
+
+
+def supplierNames(suppliers: int) -> list:
+    return [f"Fornecedor {i:04d}" for i in range(1, suppliers + 1)]
+
+
+def _rng(seed: int, stream: int, chunk: int = 0) -> np.random.Generator:
+    # um gerador por (arquivo, bloco): a saída não depende do tamanho do bloco anterior
+    return np.random.default_rng([seed, stream, chunk])
+
+
+def makeProdutos(products: int, seed: int) -> pd.DataFrame:
+    rng = _rng(seed, 1)
+    ids = np.arange(1, products + 1)
+    cat = rng.choice(categorias, products)
+    marca = rng.choice(marcas, products)
+    preco = rng.uniform(20, 2000, products).round(2)
+    return pd.DataFrame({
+        "produto_id": ids,
+        "sku": [f"SKU{i:05d}" for i in ids],
+        "produto_nome": [f"{c} {m} {i}" for c, m, i in zip(cat, marca, ids)],
+        "categoria": cat,
+        "marca": marca,
+        "preco_unitario": preco,
+        "custo_unitario": (preco * rng.uniform(0.4, 0.8, products)).round(2),
+        "estoque_inicial": rng.integers(0, 200, products),
+        "unidade_medida": "unidade",
+        "peso_kg": rng.uniform(0.1, 10, products).round(2),
+        "dimensao_cm": [f"{a}x{b}x{c}" for a, b, c in rng.integers(1, 100, (products, 3))],
+    })
+
+
+def makeFornecedores(suppliers: int, seed: int) -> pd.DataFrame:
+    rng = _rng(seed, 2)
+    ids = np.arange(1, suppliers + 1)
+    return pd.DataFrame({
+        "fornecedor_id": ids,
+        "nome_fornecedor": supplierNames(suppliers),
+        "cnpj": [f"{i:02d}.{i * 7 % 1000:03d}.{i * 13 % 1000:03d}/0001-{i % 100:02d}" for i in ids],
+        "email": [f"contato{i}@fornecedor.com" for i in ids],
+        "telefone": [f"(81) 3{i % 1000:03d}-{i % 10000:04d}" for i in ids],
+        "cidade": rng.choice(["Recife", "São Paulo", "Belo Horizonte", "Fortaleza", "Curitiba"], suppliers),
+        "estado": rng.choice(estados, suppliers),
+        "produto_principal": rng.choice(categorias, suppliers),
+        "avaliacao_media": rng.uniform(3, 5, suppliers).round(1),
+    })
+
+
+def _writeChunks(path: Path, rows: int, makeChunk):
+    # grava em blocos: cabeçalho só no primeiro
+    path.unlink(missing_ok=True)
+    for chunk, start in enumerate(range(0, rows, chunkRows)):
+        df = makeChunk(chunk, start, min(chunkRows, rows - start))
+        df.to_csv(path, mode="a", header=(start == 0), index=False)
+
+
+def writeEstoque(path: Path, rows: int, products: int, stores: int, seed: int):
+    lojas = np.array(storeNames(stores))
+    # o histórico só cresce: cada data de referência tem um lote fixo de linhas
+    rowsPerDate = max(min(products * stores, rows // 365 or 1), 1)
+
+    def makeChunk(chunk, start, n):
+        rng = _rng(seed, 3, chunk)
+        idx = np.arange(start, start + n)
+        datas = dataInicial + pd.to_timedelta(idx // rowsPerDate, unit="D")
+        return pd.DataFrame({
+            "estoque_id": idx + 1,
+            "data_referencia": datas.strftime("%Y-%m-%d"),
+            "produto_id": rng.integers(1, products + 1, n),
+            "quantidade_estoque": rng.integers(0, 200, n),
+            "estoque_minimo": rng.integers(5, 30, n),
+            "localizacao": lojas[rng.integers(0, stores, n)],
+        })
+
+    _writeChunks(path, rows, makeChunk)
+
+
+def writeCompras(path: Path, rows: int, products: int, suppliers: int, days: int, seed: int):
+    nomes = np.array(supplierNames(suppliers))
+    status = np.array(statusCompra)
+
+    def makeChunk(chunk, start, n):
+        rng = _rng(seed, 4, chunk)
+        qtd = rng.integers(1, 100, n)
+        preco = rng.uniform(20, 2000, n).round(2)
+        datas = dataInicial + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+        return pd.DataFrame({
+            "compra_id": np.arange(start + 1, start + n + 1),
+            # mesmo formato do compras.csv real: dia/mês/ano
+            "data_compra": datas.strftime("%d/%m/%Y"),
+            "produto_id": rng.integers(1, products + 1, n),
+            "fornecedor": nomes[rng.integers(0, suppliers, n)],
+            "quantidade_comprada": qtd,
+            "valor_unitario": preco,
+            "valor_total": (qtd * preco).round(2),
+            "prazo_entrega_dias": rng.integers(3, 21, n),
+            "status_compra": status[rng.choice(len(status), n, p=statusPesos)],
+        })
+
+    _writeChunks(path, rows, makeChunk)
+
+
+def writeVendas(path: Path, rows: int, products: int, stores: int, days: int, seed: int):
+    lojas = np.array(storeNames(stores)[1:] or storeNames(stores))
+
+    def makeChunk(chunk, start, n):
+        rng = _rng(seed, 5, chunk)
+        qtd = rng.integers(1, 10, n)
+        preco = rng.uniform(20, 2000, n).round(2)
+        datas = dataInicial + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+        return pd.DataFrame({
+            "venda_id": np.arange(start + 1, start + n + 1),
+            "data_venda": datas.strftime("%Y-%m-%d"),
+            "produto_id": rng.integers(1, products + 1, n),
+            "loja_id": lojas[rng.integers(0, len(lojas), n)],
+            "quantidade_vendida": qtd,
+            "valor_unitario": preco,
+            "valor_total": (qtd * preco).round(2),
+        })
+
+    _writeChunks(path, rows, makeChunk)
+
+
+def generate(out, rows: int = 100_000, products: int = None, stores: int = 10,
+             suppliers: int = 20, days: int = 730, seed: int = 42) -> Path:
+    """Gera produtos/fornecedores/estoque/compras/vendas em `out` e retorna o diretório."""
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    products = products or max(rows // 100, 10)
+    makeProdutos(products, seed).to_csv(out / "produtos.csv", index=False)
+    makeFornecedores(suppliers, seed).to_csv(out / "fornecedores.csv", index=False)
+    writeEstoque(out / "estoque.csv", rows, products, stores, seed)
+    writeCompras(out / "compras.csv", rows, products, suppliers, days, seed)
+    writeVendas(out / "vendas.csv", rows, products, stores, days, seed)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos no formato de data/.")
+    parser.add_argument("--out", required=True, help="diretório de saída")
+    parser.add_argument("--rows", type=int, default=100_000, help="linhas de estoque, compras e vendas")
+    parser.add_argument("--products", type=int, default=None, help="produtos (padrão: rows/100)")
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--suppliers", type=int, default=20)
+    parser.add_argument("--days", type=int, default=730, help="dias de histórico de compras/vendas")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    out = generate(args.out, args.rows, args.products, args.stores, args.suppliers, args.days, args.seed)
+    print(f"✅ Dados gerados em {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import time
+
+import streamlit as st
+
+from controllers import warmup
+from models import compact, instrumentation, memo, refresher
+
+
+def performancePanel():
+    """Painel "Performance" na barra lateral: liga a medição e exporta os eventos."""
+    with st.sidebar.expander("⏱️ Performance"):
+        enabled = st.checkbox(
+            "Medir tempos (todas as sessões)", value=instrumentation.isEnabled(), key="perfEnabled"
+        )
+        if enabled != instrumentation.isEnabled():
+            instrumentation.setEnabled(enabled)
+
+        estado = refresher.status()
+        if estado["emAndamento"]:
+            st.caption("🔄 Atualizando dados em segundo plano…")
+        elif estado["ultimaAtualizacao"]:
+            hora = time.strftime("%H:%M:%S", time.localtime(estado["ultimaAtualizacao"]))
+            st.caption(f"Dados atualizados em segundo plano às {hora} ({', '.join(estado['datasets'])}).")
+        if estado["erro"]:
+            st.caption(f"⚠️ Última atualização falhou: {estado['erro']}")
+
+        cache = memo.stats()
+        if cache["acertos"] or cache["faltas"]:
+            taxa = cache["acertos"] / (cache["acertos"] + cache["faltas"]) * 100
+            st.caption(
+                f"Memo de filtros: {cache['acertos']} acertos, {cache['faltas']} faltas ({taxa:.0f}%), "
+                f"{cache['entradas']} resultados em {cache['bytes'] / 1024 / 1024:,.1f} MB."
+            )
+
+        partida = warmup.report()
+        for secao, titulo in (("imports", "Imports"), ("paginas", "Pré-carga"), ("primeiroRender", "Primeiro render")):
+            if partida[secao]:
+                tempos = ", ".join(f"{nome} {seg:.2f}s" for nome, seg in partida[secao].items())
+                st.caption(f"{titulo}: {tempos}")
+
+        memoria = compact.report()
+        if not memoria.empty:
+            economia = memoria["economiaMB"].sum()
+            st.caption(f"Memória (modo compacto): {economia:,.1f} MB economizados")
+            st.dataframe(memoria.round(2), use_container_width=True, hide_index=True)
+
+        if not enabled:
+            st.caption("Medição desligada.")
+            return
+
+        resumo = instrumentation.summary()
+        if resumo.empty:
+            st.caption("Nenhum evento ainda; interaja com a página para medir.")
+        else:
+            st.dataframe(resumo.head(30), use_container_width=True, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("JSON", instrumentation.toJson(), file_name="fcd-perf.json",
+                               mime="application/json", key="perfJson")
+        with col2:
+            st.download_button("Chrome trace", instrumentation.toChromeTrace(), file_name="fcd-trace.json",
+                               mime="application/json", key="perfTrace")
+        if st.button("Limpar eventos", key="perfClear"):
+            instrumentation.clear()
@@ -0,0 +1,126 @@
+import math
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from models.instrumentation import traced
+
+# Reduções feitas no servidor antes de serializar qualquer coisa para o
+# navegador: tabelas paginadas, séries temporais decimadas e gráficos de
+# barras/dispersão limitados a um top-N com um grupo "Outros".
+
+defaultPageSize = 200
+defaultMaxPoints = 1000
+othersLabel = "Outros"
+
+
+def paginate(df: pd.DataFrame, page: int, pageSize: int = defaultPageSize) -> pd.DataFrame:
+    """Fatia `df` na página `page` (começando em 1)."""
+    start = max(page - 1, 0) * pageSize
+    return df.iloc[start:start + pageSize]
+
+
+@traced("render.pagedDataframe")
+def pagedDataframe(df: pd.DataFrame, key: str, pageSize: int = defaultPageSize, enrich=None, **kwargs):
+    """
+    st.dataframe que envia só a página selecionada ao navegador.
+
+    `enrich(pagina)` acrescenta colunas só às linhas exibidas (ex.: atributos
+    do produto buscados na dimensão em vez de guardados em cada linha).
+    """
+    total = len(df)
+    pages = max(math.ceil(total / pageSize), 1)
+    page = 1
+    if pages > 1:
+        page = int(st.number_input(
+            f"Página (1–{pages})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}Page"
+        ))
+    view = paginate(df, page, pageSize)
+    if enrich:
+        view = enrich(view)
+    # metadados de `attrs` (ex.: erros de conversão do loader) não vão para o navegador
+    view.attrs = {}
+    st.dataframe(view, **kwargs)
+    if pages > 1:
+        st.caption(f"Mostrando {min(pageSize, total - (page - 1) * pageSize)} de {total:,} linhas.")
+
+
+def minMaxDownsample(df: pd.DataFrame, x: str, y: str, maxPoints: int = defaultMaxPoints) -> pd.DataFrame:
+    """
+    Mantém, em cada balde de linhas consecutivas, os pontos de mínimo e
+    máximo de `y` (preserva picos e vales com ~maxPoints pontos).
+    """
+    n = len(df)
+    if n <= maxPoints or maxPoints < 4:
+        return df
+    buckets = maxPoints // 2
+    bucketId = np.arange(n) * buckets // n
+    frame = pd.DataFrame({"b": bucketId, "v": df[y].to_numpy(dtype="float64")}).dropna()
+    # o índice do frame auxiliar é a posição da linha em df
+    grouped = frame.groupby("b")["v"]
+    keep = np.union1d(grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy())
+    return df.iloc[keep]
+
+
+def lttbDownsample(df: pd.DataFrame, x: str, y: str, maxPoints: int = defaultMaxPoints) -> pd.DataFrame:
+    """
+    Largest-Triangle-Three-Buckets: escolhe em cada balde o ponto que forma o
+    maior triângulo com o ponto anterior e a média do balde seguinte.
+
+    O laço é por balde (≈ maxPoints iterações), não por linha.
+    """
+    n = len(df)
+    if n <= maxPoints or maxPoints < 3:
+        return df
+    xs = df[x].to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype("datetime64[ns]").astype("int64")
+    xs = xs.astype("float64")
+    ys = df[y].to_numpy(dtype="float64")
+
+    edges = np.linspace(1, n - 1, maxPoints - 1).astype(int)
+    keep = np.empty(maxPoints, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(maxPoints - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nxtLo, nxtHi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avgX = xs[nxtLo:nxtHi].mean() if nxtHi > nxtLo else xs[-1]
+        avgY = ys[nxtLo:nxtHi].mean() if nxtHi > nxtLo else ys[-1]
+        area = np.abs(
+            (xs[prev] - avgX) * (ys[lo:hi] - ys[prev]) - (xs[prev] - xs[lo:hi]) * (avgY - ys[prev])
+        )
+        prev = lo + int(np.nanargmax(area)) if len(area) and not np.isnan(area).all() else lo
+        keep[i + 1] = prev
+    return df.iloc[np.unique(keep)]
+
+
+@traced("render.downsample")
+def downsample(df: pd.DataFrame, x: str, y: str, maxPoints: int = defaultMaxPoints,
+               method: str = "lttb") -> pd.DataFrame:
+    """Decima uma série temporal ordenada por `x` para no máximo ~maxPoints pontos."""
+    if len(df) <= maxPoints:
+        return df
+    if method == "minmax":
+        return minMaxDownsample(df, x, y, maxPoints)
+    return lttbDownsample(df, x, y, maxPoints)
+
+
+@traced("render.topNWithOthers")
+def topNWithOthers(df: pd.DataFrame, labelCol: str, valueCol: str, n: int = 10,
+                   agg: dict = None) -> pd.DataFrame:
+    """
+    Mantém as `n` linhas com maior `valueCol` e junta o resto numa linha
+    "Outros". `agg` define como cada coluna numérica é combinada no grupo
+    "Outros" (soma por padrão).
+    """
+    if len(df) <= n:
+        return df
+    top = df.nlargest(n, valueCol)
+    rest = df.drop(top.index)
+    numeric = [c for c in df.columns if c != labelCol and pd.api.types.is_numeric_dtype(df[c])]
+    agg = {c: (agg or {}).get(c, "sum") for c in numeric}
+    others = rest[numeric].agg(agg).to_frame().T
+    others[labelCol] = othersLabel
+    return pd.concat([top, others], ignore_index=True)
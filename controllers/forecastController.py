@@ -0,0 +1,57 @@
+import pandas as pd
+from controllers.inventoryController import InventoryController
+from controllers.purchasesController import PurchasesController
+from controllers.salesController import SalesController
+from models.dataStore import store
+from models.instrumentation import traced
+from models import memo, stockForecast
+
+forecastColumns = [
+    "produtoId", "produtoNome", "categoria", "quantidadeEstoque", "estoqueMinimo",
+    "consumoDiario", "fonteConsumo", "prazoEntrega", "emPedido", "diasCobertura",
+    "dataRuptura", "pontoPedido", "dataPedido", "quantidadeSugerida", "rupturaNoPrazo",
+]
+
+class ForecastController:
+    def __init__(self, invCtrl: InventoryController = None, purchasesCtrl: PurchasesController = None):
+        self.invCtrl = invCtrl or InventoryController()
+        self.purchasesCtrl = purchasesCtrl or PurchasesController()
+
+    @traced()
+    def getForecast(self, locations=None, reviewDays: int = stockForecast.defaultReviewDays,
+                    windowDays: int = stockForecast.defaultWindowDays,
+                    serviceZ: float = stockForecast.defaultServiceZ) -> pd.DataFrame:
+        """Previsão de ruptura e reposição por produto (cache por versão dos dados e parâmetros)."""
+        key = (tuple(sorted(locations)) if locations else (), reviewDays, windowDays, serviceZ)
+        forecast, versions = store.getVersioned(
+            ("forecast", key), ("produtos", "estoque", "compras", "vendas"),
+            lambda: self._buildForecast(locations, reviewDays, windowDays, serviceZ)
+        )
+        return memo.tag(forecast, versions, ("forecast", key))
+
+    def _buildForecast(self, locations, reviewDays, windowDays, serviceZ) -> pd.DataFrame:
+        self.invCtrl.reloadData()
+        stock = self.invCtrl.buildInventoryView(locations)
+        if stock.empty:
+            return pd.DataFrame(columns=forecastColumns)
+
+        estoque = self.invCtrl.estoque
+        # data de referência: o snapshot de estoque mais recente
+        asOf = estoque["data_referencia"].max() if "data_referencia" in estoque.columns else pd.Timestamp.today()
+        if pd.isna(asOf):
+            asOf = pd.Timestamp.today()
+
+        # vendas vêm do cubo diário (já agregado por dia × loja × produto)
+        cube = SalesController().filterCube(lojas=locations)
+        self.purchasesCtrl.load_data()
+        compras = self.purchasesCtrl.comprasDf
+
+        out = stockForecast.forecast(
+            stock, asOf,
+            salesRate=stockForecast.salesConsumption(cube, windowDays),
+            snapshotRate=stockForecast.snapshotConsumption(estoque, locations),
+            leadTime=stockForecast.leadTimes(compras),
+            pending=stockForecast.onOrder(compras),
+            reviewDays=reviewDays, serviceZ=serviceZ,
+        )
+        return out[forecastColumns].sort_values("diasCobertura", kind="mergesort").reset_index(drop=True)
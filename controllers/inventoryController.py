@@ -1,118 +1,170 @@
 # controllers/inventoryController.py
 import pandas as pd
-from models.dataModel import loadProdutos, loadEstoque
+from models import artifacts, memo, refresher, sqlBackend, streaming
+from models.dataStore import store
+from models.instrumentation import traced
+from models.stockEngine import StockEngine, semLocalizacao
+
+inventoryColumns = [
+    "produtoId", "produtoNome", "categoria",
+    "quantidadeEstoque", "estoqueMinimo", "lojasEmAlerta",
+    "precoUnitario", "valorTotal"
+]
 
 class InventoryController:
     def __init__(self):
-        self.reloadData()
+        self.produtos = pd.DataFrame()
+        self.estoque = pd.DataFrame()
+        # estoque.csv grande demais para a memória: último registro lido em blocos
+        self.streaming = False
+        # no backend SQL o estoque fica no banco; os DataFrames só são
+        # carregados pelos métodos que ainda trabalham em pandas
+        if not sqlBackend.enabled():
+            self.reloadData()
 
     def reloadData(self):
         """Recarrega os dados brutos de produtos e estoque."""
-        self.produtos = loadProdutos()
-        self.estoque = loadEstoque()
-
-    def getLatestStockPerProduct(self) -> pd.DataFrame:
-        """Retorna o último registro de estoque por produto."""
-        dfEst = self.estoque.copy()
-
-        # Caso o CSV esteja vazio
-        if dfEst.empty:
-            return pd.DataFrame(columns=["produto_id", "quantidade_estoque", "estoque_minimo"])
-
-        # Normaliza nomes de colunas
-        dfEst.columns = dfEst.columns.str.strip().str.lower()
-
-        # Se tiver data, pega o registro mais recente
-        if "data_referencia" in dfEst.columns and dfEst["data_referencia"].notna().any():
-            dfEst = (
-                dfEst.sort_values("data_referencia")
-                .groupby("produto_id", as_index=False)
-                .last()
-            )
-        else:
-            # fallback: agrupa somando as quantidades
-            grouped = (
-                dfEst.groupby("produto_id", as_index=False)
-                .agg({
-                    "quantidade_estoque": "sum",
-                    "estoque_minimo": "max"
-                })
-                .reset_index(drop=True)
+        self.produtos = store.get("produtos")
+        self.streaming = streaming.shouldStream("estoque")
+        # no modo em blocos o histórico de estoque não é carregado
+        self.estoque = pd.DataFrame() if self.streaming else store.get("estoque")
+
+    def _engine(self) -> StockEngine:
+        # motor compartilhado pelo processo: snapshots incrementais por loja
+        return store.getState(("inventory", "stockEngine"), StockEngine)
+
+    def _ensureData(self):
+        if self.estoque.empty and self.produtos.empty:
+            self.reloadData()
+
+    @traced()
+    def getLocations(self) -> list:
+        """Lista as localizações (lojas/depósitos) presentes no estoque."""
+        if sqlBackend.enabled():
+            cols = sqlBackend.columns("estoque")
+            if "localizacao" not in cols:
+                hasRows = sqlBackend.query("SELECT COUNT(*) AS n FROM estoque", tables=("estoque",))["n"].iloc[0]
+                return [semLocalizacao] if hasRows else []
+            return sqlBackend.query(
+                "SELECT DISTINCT localizacao FROM estoque"
+                " WHERE localizacao IS NOT NULL AND data_referencia IS NOT NULL ORDER BY localizacao",
+                tables=("estoque",),
+            )["localizacao"].tolist()
+        self._ensureData()
+        if self.estoque.empty:
+            return []
+        return self._engine().locations(self.estoque)
+
+    @traced()
+    def getStockPerLocation(self, locations=None) -> pd.DataFrame:
+        """Retorna o último registro de estoque por produto e localização."""
+        self._ensureData()
+        if self.estoque.empty:
+            return pd.DataFrame(columns=[
+                "produto_id", "localizacao", "quantidade_estoque", "estoque_minimo", "em_alerta"
+            ])
+        perStore, _ = self._engine().rollup(self.estoque)
+        if locations:
+            perStore = perStore[perStore["localizacao"].isin(locations)]
+        return perStore
+
+    @traced()
+    def getLatestStockPerProduct(self, locations=None) -> pd.DataFrame:
+        """Retorna o estoque atual por produto, somando as lojas selecionadas."""
+        self._ensureData()
+        if self.streaming:
+            key = tuple(sorted(locations)) if locations else ()
+            return store.getDerived(
+                ("inventory", "streamLatest", key), ("estoque",), lambda: streaming.latestStockPerProduct(locations)
             )
-            dfEst = grouped
-
-        # Garante colunas essenciais
-        for c in ["quantidade_estoque", "estoque_minimo"]:
-            if c not in dfEst.columns:
-                dfEst[c] = 0
-
-        return dfEst[["produto_id", "quantidade_estoque", "estoque_minimo"]]
+        # Caso o CSV esteja vazio
+        if self.estoque.empty:
+            return pd.DataFrame(columns=["produto_id", "quantidade_estoque", "estoque_minimo", "lojas_em_alerta"])
+
+        _, dfEst = self._engine().rollup(self.estoque, locations)
+        return dfEst[["produto_id", "quantidade_estoque", "estoque_minimo", "lojas_em_alerta"]]
+
+    @traced()
+    def buildInventoryView(self, locations=None) -> pd.DataFrame:
+        """Constrói a tabela consolidada de inventário (opcionalmente só de algumas lojas)."""
+        # a view fica no cache compartilhado por versão dos dados e filtro de lojas
+        key = tuple(sorted(locations)) if locations else ()
+        view, versions = store.getVersioned(
+            ("inventory", "view", key), ("produtos", "estoque"),
+            lambda: self._buildInventoryView(locations)
+        )
+        # etiqueta do memo: filterByCategory sobre a view sai do cache compartilhado
+        return memo.tag(view, versions, ("inventory.view", key))
+
+    @traced()
+    def _buildInventoryView(self, locations=None) -> pd.DataFrame:
+        if sqlBackend.enabled() and self._sqlHasKeys():
+            inv = self._sqlInventory(locations)
+            if inv.empty or not inv["quantidade_estoque"].notna().any():
+                return pd.DataFrame(columns=inventoryColumns)
+            return self._finishInventoryView(inv)
+
+        if not locations:
+            # rede inteira: pré-calculada pelo job em lote, se os dados não mudaram
+            pre = artifacts.load("estoque_visao")
+            if pre is not None:
+                return pre
 
-    def buildInventoryView(self) -> pd.DataFrame:
-        """Constrói a tabela consolidada de inventário."""
-        produtos = self.produtos.copy()
-        estoqueLatest = self.getLatestStockPerProduct()
+        self.reloadData()
+        # produtos já chegam com cabeçalhos canônicos (models/schemas.py)
+        produtos = self.produtos
+        estoqueLatest = self.getLatestStockPerProduct(locations)
 
         # Caso algum CSV esteja vazio
         if produtos.empty or estoqueLatest.empty:
-            return pd.DataFrame(columns=[
-                "produtoId", "produtoNome", "categoria",
-                "quantidadeEstoque", "estoqueMinimo",
-                "precoUnitario", "valorTotal"
-            ])
-
-        # Normaliza nomes de colunas
-        produtos.columns = produtos.columns.str.strip().str.lower()
-
-        # Mapeia colunas
-        colmap = {}
-        colsLower = list(produtos.columns)
-
-        # === Identificação do produto ===
-        if "produto_id" in colsLower:
-            colmap["produto_id"] = "produto_id"
-        elif "produtoid" in colsLower:
-            colmap["produto_id"] = "produtoid"
-        elif "id" in colsLower:
-            colmap["produto_id"] = "id"
-
-        # === Nome do produto ===
-        if "produto_nome" in colsLower:
-            colmap["produto_nome"] = "produto_nome"
-        elif "produto nome" in colsLower:
-            colmap["produto_nome"] = "produto nome"
-        elif "produto" in colsLower:
-            colmap["produto_nome"] = "produto"
-
-        # === Categoria ===
-        if "categoria" in colsLower:
-            colmap["categoria"] = "categoria"
-
-        # === Preço ===
-        if "preco_unitario" in colsLower:
-            colmap["preco_unitario"] = "preco_unitario"
-        elif "preço_unitario" in colsLower:
-            colmap["preco_unitario"] = "preço_unitario"
-        elif "preco" in colsLower:
-            colmap["preco_unitario"] = "preco"
-
-        # === SKU ===
-        if "sku" in colsLower:
-            colmap["sku"] = "sku"
-
-        produtos = produtos.rename(columns={v: k for k, v in colmap.items()})
+            return pd.DataFrame(columns=inventoryColumns)
 
         # Verificação mínima
         if "produto_id" not in produtos.columns:
             print("⚠️ Nenhuma coluna identificada como 'produto_id' no CSV de produtos.")
-            produtos["produto_id"] = range(1, len(produtos) + 1)
+            produtos = produtos.assign(produto_id=range(1, len(produtos) + 1))
 
         # === Merge produtos + estoque ===
         inv = produtos.merge(estoqueLatest, how="left", on="produto_id")
-
+        return self._finishInventoryView(inv)
+
+    def _sqlHasKeys(self) -> bool:
+        # sem as colunas-chave o caminho em pandas trata os casos especiais
+        return "produto_id" in sqlBackend.columns("produtos") and {
+            "produto_id", "data_referencia", "quantidade_estoque", "estoque_minimo"
+        } <= sqlBackend.columns("estoque")
+
+    def _sqlInventory(self, locations=None) -> pd.DataFrame:
+        """Último registro por produto e loja, consolidado por produto, tudo no banco."""
+        hasLocation = "localizacao" in sqlBackend.columns("estoque")
+        keys = "produto_id, localizacao" if hasLocation else "produto_id"
+        cond, params = sqlBackend.where(
+            members=(("localizacao", locations if hasLocation else None),),
+            extra=["data_referencia IS NOT NULL", "produto_id IS NOT NULL"]
+            + (["localizacao IS NOT NULL"] if hasLocation else []),
+        )
+        # empate de data: vence a linha mais abaixo no arquivo, como no snapshot em pandas
+        return sqlBackend.query(
+            "WITH ultimo AS ("
+            " SELECT produto_id, quantidade_estoque, estoque_minimo,"
+            f" ROW_NUMBER() OVER (PARTITION BY {keys} ORDER BY data_referencia DESC, rowid DESC) AS ordem"
+            " FROM estoque" + cond +
+            "), rede AS ("
+            " SELECT produto_id, SUM(quantidade_estoque) AS quantidade_estoque,"
+            " SUM(estoque_minimo) AS estoque_minimo,"
+            " SUM(quantidade_estoque < estoque_minimo) AS lojas_em_alerta"
+            " FROM ultimo WHERE ordem = 1 GROUP BY produto_id"
+            ") SELECT p.*, r.quantidade_estoque, r.estoque_minimo, r.lojas_em_alerta"
+            " FROM produtos p LEFT JOIN rede r ON r.produto_id = p.produto_id",
+            params, tables=("produtos", "estoque"),
+        )
+
+    def _finishInventoryView(self, inv: pd.DataFrame) -> pd.DataFrame:
+        """Completa produtos + estoque consolidado com valores padrão, valor total e nomes camelCase."""
         # Preencher valores ausentes
         inv["quantidade_estoque"] = inv.get("quantidade_estoque", pd.Series([0]*len(inv))).fillna(0).astype(float)
         inv["estoque_minimo"] = inv.get("estoque_minimo", pd.Series([0]*len(inv))).fillna(0).astype(float)
+        inv["lojas_em_alerta"] = inv.get("lojas_em_alerta", pd.Series([0]*len(inv))).fillna(0).astype(int)
 
         if "preco_unitario" not in inv.columns:
             inv["preco_unitario"] = 0.0
@@ -128,6 +180,7 @@ class InventoryController:
             "categoria": "categoria",
             "quantidade_estoque": "quantidadeEstoque",
             "estoque_minimo": "estoqueMinimo",
+            "lojas_em_alerta": "lojasEmAlerta",
             "preco_unitario": "precoUnitario",
             "valor_total": "valorTotal"
         })
@@ -141,10 +194,18 @@ class InventoryController:
 
         return inv
 
+    @traced()
     def filterByCategory(self, inventoryDf: pd.DataFrame, categories: list) -> pd.DataFrame:
         """Filtra o inventário por categoria."""
         if inventoryDf.empty:
             return inventoryDf
         if not categories:
             return inventoryDf
-        return inventoryDf[inventoryDf["categoria"].isin(categories)]
+        return memo.aggregated(
+            "inventory.filterByCategory", inventoryDf, {"categories": categories},
+            lambda: inventoryDf[inventoryDf["categoria"].isin(categories)]
+        )
+
+
+# visão da rede inteira (padrão da página) refeita em segundo plano quando os CSVs mudam
+refresher.registerWarmup(("produtos", "estoque"), lambda: InventoryController().buildInventoryView())
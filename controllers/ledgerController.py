@@ -0,0 +1,74 @@
+import pandas as pd
+from controllers.inventoryController import InventoryController
+from controllers.purchasesController import PurchasesController
+from controllers.salesController import SalesController
+from models.dataStore import store
+from models.instrumentation import traced
+from models import artifacts, memo, stockLedger
+
+_ledgerTables = ("produtos", "estoque", "compras", "vendas")
+_productCols = ["produtoId", "produtoNome", "categoria"]
+
+reconciliationColumns = _productCols + [
+    "quantidadeEstoque", "periodos", "periodosDivergentes", "perda",
+    "entradaNaoRegistrada", "divergenciaLiquida", "ultimaConferencia", "ultimaSituacao",
+]
+
+class LedgerController:
+    def __init__(self, invCtrl: InventoryController = None, purchasesCtrl: PurchasesController = None):
+        self.invCtrl = invCtrl or InventoryController()
+        self.purchasesCtrl = purchasesCtrl or PurchasesController()
+
+    @traced()
+    def getMovements(self) -> pd.DataFrame:
+        """Entradas, saídas e saldo acumulado por produto e dia (cache por versão dos dados)."""
+        return store.getDerived(("ledger", "movements"), _ledgerTables, self._buildMovements)
+
+    def _buildMovements(self) -> pd.DataFrame:
+        # vendas vêm do cubo diário (já agregado por dia × loja × produto)
+        cube = SalesController().filterCube()
+        self.purchasesCtrl.load_data()
+        return stockLedger.dailyMovements(self.purchasesCtrl.comprasDf, cube)
+
+    @traced()
+    def getLedger(self, tolerance: float = stockLedger.defaultTolerance) -> pd.DataFrame:
+        """Conciliação por período entre snapshots de estoque de cada produto, com nome e categoria."""
+        ledger, versions = store.getVersioned(
+            ("ledger", "periods", tolerance), _ledgerTables, lambda: self._buildLedger(tolerance)
+        )
+        return memo.tag(ledger, versions, ("ledger.periods", tolerance))
+
+    def _buildLedger(self, tolerance) -> pd.DataFrame:
+        self.invCtrl.reloadData()
+        snapshots = stockLedger.networkSnapshots(self.invCtrl.estoque)
+        ledger = stockLedger.reconcile(snapshots, self.getMovements(), tolerance)
+        return self._withProducts(ledger)[_productCols + stockLedger.ledgerColumns[1:]]
+
+    @traced()
+    def getReconciliation(self, tolerance: float = stockLedger.defaultTolerance) -> pd.DataFrame:
+        """Resumo da conciliação por produto, maiores divergências primeiro."""
+        view, versions = store.getVersioned(
+            ("ledger", "reconciliation", tolerance), _ledgerTables, lambda: self._buildReconciliation(tolerance)
+        )
+        return memo.tag(view, versions, ("ledger.reconciliation", tolerance))
+
+    def _buildReconciliation(self, tolerance) -> pd.DataFrame:
+        # pré-calculada pelo job em lote (batch/precompute.py), se os dados não mudaram
+        pre = artifacts.load("estoque_conciliacao", {"tolerancia": tolerance})
+        if pre is not None:
+            return pre
+        summary = stockLedger.summarize(self.getLedger(tolerance))
+        if summary.empty:
+            return pd.DataFrame(columns=reconciliationColumns)
+        out = self._withProducts(summary, ["quantidadeEstoque"])[reconciliationColumns]
+        order = out["divergenciaLiquida"].abs().sort_values(ascending=False, kind="mergesort").index
+        return out.loc[order].reset_index(drop=True)
+
+    def _withProducts(self, df: pd.DataFrame, extra=()) -> pd.DataFrame:
+        # nome e categoria (para o filtro da página) vêm da visão de inventário da rede
+        view = self.invCtrl.buildInventoryView(None)
+        wanted = _productCols + list(extra)
+        cols = [c for c in wanted if c in view.columns]
+        if not df.empty and "produtoId" in cols:
+            df = df.merge(view[cols], on="produtoId", how="left")
+        return df.reindex(columns=list(dict.fromkeys(list(df.columns) + wanted)))
@@ -1,26 +1,50 @@
+import copy
+
 import pandas as pd
-import os
+from models import artifacts, compact, memo, refresher, sqlBackend, streaming
+from models.dataStore import store
+from models.dimensions import productDimension
+from models.instrumentation import traced
+from models.indexing import dateRange, extendFrame, membershipFilter, validSortedDates
+from models.purchaseTotals import PurchaseTotals
+from models.supplierScorecard import scorecard
+from models.timeSeries import TimeSeriesEngine, dailyBuckets
+
+# colunas de texto repetitivo guardadas como categóricas (códigos inteiros)
+categoricalCols = ["fornecedor", "produto_nome", "categoria", "marca", "status_compra"]
+
+# compras com os atributos do produto, no backend SQL
+_sql_from = " FROM compras c LEFT JOIN produtos p ON p.produto_id = c.produto_id"
+_tables = ("compras", "produtos")
 
 class PurchasesController:
     def __init__(self):
-        self.data_dir = "data"
         self.comprasDf = pd.DataFrame()
         self.produtosDf = pd.DataFrame()
-        self.load_data()
+        self._dates = validSortedDates(pd.Series([], dtype="datetime64[ns]"))
+        # versões de compras/produtos de onde saiu o merge carregado (chave do memo)
+        self._data_versions = None
+        # compras.csv grande demais para a memória: só agregados lidos em blocos
+        self.streaming = False
+        # no backend SQL os dados ficam no banco; o merge em pandas só é
+        # carregado quando algum método precisa dele
+        if not sqlBackend.enabled():
+            self.load_data()
 
+    @traced()
     def load_data(self):
-        """Carrega os CSVs e integra produtos às compras"""
+        """Carrega os CSVs (via cache compartilhado) e integra produtos às compras"""
         try:
-            compras_path = os.path.join(self.data_dir, "compras.csv")
-            produtos_path = os.path.join(self.data_dir, "produtos.csv")
-
-            if os.path.exists(compras_path):
-                self.comprasDf = pd.read_csv(compras_path, encoding="utf-8")
-
-            if os.path.exists(produtos_path):
-                self.produtosDf = pd.read_csv(produtos_path, encoding="utf-8")
-
-            self._merge_data()
+            self.streaming = streaming.shouldStream("compras")
+            if self.streaming:
+                # as compras não são carregadas; os agregados vêm de get_totals (em blocos)
+                self.produtosDf = store.get("produtos")
+                return
+            # o merge também fica no cache, então só é refeito quando um CSV muda
+            (self.comprasDf, self._dates), self._data_versions = store.getVersioned(
+                ("purchases", "merged"), _tables, self._build_indexed
+            )
+            self.produtosDf = store.get("produtos")
 
         except Exception as e:
             print(f"❌ Erro ao carregar dados: {e}")
@@ -28,45 +52,166 @@ class PurchasesController:
     def reload_data(self):
         self.load_data()
 
+    @traced()
+    def _build_indexed(self):
+        """Lê os CSVs, faz o merge e prepara o índice de datas ordenadas"""
+        self.comprasDf = store.get("compras")
+        self.produtosDf = store.get("produtos")
+        df = self._merge_data()
+        if compact.enabled and not df.empty:
+            # o merge largo repetiria categoria e marca (códigos) em cada compra
+            extra = productDimension().rowBytes(["categoria", "marca"], categorical=True)
+            size = compact.frameBytes(df)
+            compact.record("compras × produtos", size + int(extra * len(df)), size)
+        if "data_compra" in df.columns:
+            return df, validSortedDates(df["data_compra"])
+        return df, self._dates
+
     def _merge_data(self):
         """Une informações de produto à tabela de compras"""
-        if self.comprasDf.empty:
-            return
+        return self._merge_frames(self.comprasDf, self.produtosDf)
+
+    @staticmethod
+    def _merge_frames(compras, produtos):
+        if compras.empty:
+            return compras
 
-        df = self.comprasDf.copy()
+        df = compras.copy()
 
-        if not self.produtosDf.empty:
+        if compact.enabled:
+            # modo compacto: só o nome do produto entra em cada compra;
+            # categoria e marca vêm da dimensão quando são exibidas
+            if not produtos.empty:
+                df["produto_nome"] = productDimension().categorical(df["produto_id"], "produto_nome")
+        elif not produtos.empty:
             df = df.merge(
-                self.produtosDf[["produto_id", "produto_nome", "categoria", "marca"]],
+                produtos[["produto_id", "produto_nome", "categoria", "marca"]],
                 on="produto_id",
                 how="left"
             )
 
         if "data_compra" in df.columns:
-            df["data_compra"] = pd.to_datetime(df["data_compra"], errors="coerce")
+            # o loader já converte com o formato do schema (dia/mês/ano)
+            if not pd.api.types.is_datetime64_any_dtype(df["data_compra"]):
+                df["data_compra"] = pd.to_datetime(df["data_compra"], errors="coerce")
+            # ordenado por data: o filtro de período vira busca binária + fatia
+            df = df.sort_values("data_compra", kind="mergesort", na_position="last").reset_index(drop=True)
 
-        self.comprasDf = df
+        for c in categoricalCols:
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+
+        return df
 
     # ===============================
     # ======== FUNÇÕES BASE =========
     # ===============================
 
+    @traced()
+    def get_filter_options(self):
+        """Fornecedores, produtos e período disponíveis para os filtros da página"""
+        if sqlBackend.enabled():
+            tables = ("compras", "produtos")
+            fornecedores = sqlBackend.query(
+                "SELECT DISTINCT fornecedor FROM compras WHERE fornecedor IS NOT NULL ORDER BY fornecedor", tables=tables
+            )["fornecedor"].tolist()
+            produtos = sqlBackend.query(
+                "SELECT DISTINCT p.produto_nome" + _sql_from + " WHERE p.produto_nome IS NOT NULL ORDER BY p.produto_nome",
+                tables=tables,
+            )["produto_nome"].tolist()
+            period = sqlBackend.query(
+                "SELECT MIN(data_compra) AS inicio, MAX(data_compra) AS fim FROM compras",
+                tables=tables, dates=("inicio", "fim"),
+            )
+            return {"fornecedores": fornecedores, "produtos": produtos,
+                    "inicio": period["inicio"].iloc[0], "fim": period["fim"].iloc[0]}
+
+        df = self.comprasDf
+        if df.empty:
+            return {"fornecedores": [], "produtos": [], "inicio": None, "fim": None}
+        return {
+            "fornecedores": sorted(df["fornecedor"].dropna().unique()),
+            "produtos": sorted(df["produto_nome"].dropna().unique()) if "produto_nome" in df.columns else [],
+            "inicio": df["data_compra"].min(),
+            "fim": df["data_compra"].max(),
+        }
+
+    @traced()
     def filter_data(self, fornecedores=None, produtos=None, start=None, end=None):
-        """Filtra os dados por fornecedor, produto e data"""
-        df = self.comprasDf.copy()
+        """
+        Filtra os dados por fornecedor, produto e data.
+
+        Retorna uma fatia do DataFrame compartilhado (sem cópia quando só há
+        filtro de período); não modifique o resultado.
+        """
+        filters = {"fornecedores": fornecedores, "produtos": produtos, "start": start, "end": end}
+        return memo.filtered(
+            "purchases.filter_data", self._memo_versions(), filters,
+            lambda: self._filter_data(fornecedores, produtos, start, end)
+        )
+
+    def _memo_versions(self):
+        # no SQL cada consulta lê a versão atual; em pandas, a do merge carregado
+        if sqlBackend.enabled():
+            return memo.currentVersions(_tables)
+        return self._data_versions
+
+    def _filter_data(self, fornecedores, produtos, start, end):
+        if sqlBackend.enabled():
+            return self._sql_filter_data(fornecedores, produtos, start, end)
+
+        df = self.comprasDf
         if df.empty:
             return df
 
-        if fornecedores:
-            df = df[df["fornecedor"].isin(fornecedores)]
-        if produtos:
-            df = df[df["produto_nome"].isin(produtos)]
-        if start is not None:
-            df = df[df["data_compra"] >= start]
-        if end is not None:
-            df = df[df["data_compra"] <= end]
+        if "data_compra" in df.columns:
+            lo, hi = dateRange(self._dates, len(df), start, end)
+            # sem recorte de período devolve o próprio frame (os agregadores reconhecem)
+            if (lo, hi) != (0, len(df)):
+                df = df.iloc[lo:hi]
+
+        return membershipFilter(df, (("fornecedor", fornecedores), ("produto_nome", produtos)))
 
-        return df
+    def with_product_attributes(self, df):
+        """`df` com categoria e marca do produto (buscadas na dimensão se faltarem)"""
+        if df.empty or "produto_id" not in df.columns:
+            return df
+        return productDimension().attach(df, "produto_id", ["categoria", "marca"])
+
+    def _is_full(self, df):
+        # o frame completo, sem filtro: os totais incrementais já têm a resposta
+        return df is self.comprasDf and not df.empty
+
+    def get_totals(self) -> PurchaseTotals:
+        """
+        Totais por dia, fornecedor e produto de todas as compras.
+
+        Calculados uma vez por versão dos dados e estendidos com cada lote
+        acrescentado (models/ingestion.py), sem refazer o histórico. No modo
+        em blocos, somados lendo o CSV em pedaços (models/streaming.py).
+        """
+        if self.streaming:
+            return store.getDerived(("purchases", "streamTotals"), _tables, streaming.purchaseTotals)
+        return store.getDerived(("purchases", "totals"), ("compras", "produtos"), self._build_totals)
+
+    def _build_totals(self):
+        self.load_data()
+        return PurchaseTotals().fold(self.comprasDf)
+
+    def _sql_filter_data(self, fornecedores, produtos, start, end):
+        """filter_data no banco: só as linhas filtradas voltam para o pandas"""
+        members = (("c.fornecedor", fornecedores), ("p.produto_nome", produtos))
+        cond, params = sqlBackend.where(start, end, "c.data_compra", members)
+        df = sqlBackend.query(
+            "SELECT c.*, p.produto_nome, p.categoria, p.marca" + _sql_from + cond
+            # mesma ordem do pandas: por data (nulas no fim), depois ordem do arquivo
+            + " ORDER BY c.data_compra IS NULL, c.data_compra, c.rowid",
+            params, tables=("compras", "produtos"), dates=("data_compra",),
+        )
+        for c in categoricalCols:
+            if c in df.columns:
+                df[c] = df[c].astype("category")
+        return sqlBackend.attachSpec(df, start, end, "c.data_compra", members)
 
     def get_total_spent(self, df):
         """Retorna o total gasto"""
@@ -74,8 +219,13 @@ class PurchasesController:
             return df["valor_total"].sum()
         return 0.0
 
-    def get_supplier_comparative(self, df):
-        """Preço médio e prazo médio por fornecedor"""
+    @traced()
+    def get_supplier_comparative(self, df=None):
+        """Preço médio e prazo médio por fornecedor (`df=None`: todas as compras)"""
+        if df is None:
+            if self.streaming:
+                return self.get_totals().supplierComparative()
+            df = self.filter_data()
         if df.empty:
             return pd.DataFrame()
 
@@ -83,9 +233,26 @@ class PurchasesController:
         for c in cols:
             if c not in df.columns:
                 return pd.DataFrame()
+        return memo.aggregated("purchases.get_supplier_comparative", df, None, lambda: self._supplier_comparative(df))
+
+    def _supplier_comparative(self, df):
+        if self._is_full(df):
+            # pré-calculado pelo job em lote (batch/precompute.py), se os dados não mudaram
+            pre = artifacts.load("compras_comparativo")
+            return pre if pre is not None else self.get_totals().supplierComparative()
+
+        spec = sqlBackend.specOf(df)
+        if spec is not None:
+            cond, params = sqlBackend.specWhere(spec, extra=["c.fornecedor IS NOT NULL"])
+            return sqlBackend.query(
+                "SELECT c.fornecedor, AVG(c.valor_unitario) AS preco_medio,"
+                " AVG(c.prazo_entrega_dias) AS prazo_medio, SUM(c.valor_total) AS gasto_total"
+                + _sql_from + cond + " GROUP BY c.fornecedor ORDER BY c.fornecedor",
+                params, tables=("compras", "produtos"),
+            )
 
         comp = (
-            df.groupby("fornecedor")
+            df.groupby("fornecedor", observed=True)
             .agg({
                 "valor_unitario": "mean",
                 "prazo_entrega_dias": "mean",
@@ -101,26 +268,85 @@ class PurchasesController:
 
         return comp
 
-    def get_monthly_volume(self, df):
-        """Volume de compras por mês"""
+    @traced()
+    def get_monthly_volume(self, df=None):
+        """Volume de compras por mês (`df=None`: todas as compras)"""
+        if df is None:
+            if self.streaming:
+                return self.get_totals().monthlyVolume()
+            df = self.filter_data()
         if df.empty or "data_compra" not in df.columns:
             return pd.DataFrame()
+        return memo.aggregated("purchases.get_monthly_volume", df, None, lambda: self._monthly_volume(df))
 
-        ts = (
-            df.groupby(df["data_compra"].dt.to_period("M"))
-            .agg({"valor_total": "sum"})
-            .reset_index()
+    def _monthly_volume(self, df):
+        if self._is_full(df):
+            pre = artifacts.load("compras_volume_mensal")
+            return pre if pre is not None else self.get_totals().monthlyVolume()
+        return TimeSeriesEngine.fromFrame(df, "data_compra", ["valor_total"]).view("M")
+
+    @traced()
+    def get_volume_engine(self, fornecedores=None, produtos=None, start=None, end=None):
+        """
+        Totais diários de compras do recorte (cache por filtro), dos quais
+        saem as visões por dia/semana/mês/trimestre.
+        """
+        key = (
+            tuple(sorted(fornecedores)) if fornecedores else None,
+            tuple(sorted(produtos)) if produtos else None, start, end,
+        )
+        return store.getDerived(
+            ("purchases", "timeSeries", key), ("compras", "produtos"),
+            lambda: self._build_volume_engine(fornecedores, produtos, start, end)
         )
-        ts["data_compra"] = ts["data_compra"].dt.to_timestamp()
-        return ts
 
-    def get_top_products_by_spend(self, df, top=10):
-        """Produtos com maior gasto"""
+    def _build_volume_engine(self, fornecedores, produtos, start, end):
+        daily, dates = store.getDerived(("purchases", "daily"), ("compras", "produtos"), self._build_daily)
+        if daily.empty:
+            return TimeSeriesEngine.fromFrame(daily, "data_compra", ["valor_total", "quantidade_comprada"])
+        lo, hi = dateRange(dates, len(daily), start, end)
+        sliced = membershipFilter(daily.iloc[lo:hi], (("fornecedor", fornecedores), ("produto_nome", produtos)))
+        return TimeSeriesEngine.fromFrame(sliced, "data_compra", ["valor_total", "quantidade_comprada"])
+
+    def _build_daily(self):
+        """Compras somadas por (dia, fornecedor, produto), ordenadas por data"""
+        self.load_data()
+        df = self.comprasDf
+        cols = ["data_compra", "valor_total", "quantidade_comprada"]
+        if df.empty or any(c not in df.columns for c in cols):
+            return pd.DataFrame(columns=cols), self._dates
+        daily = dailyBuckets(df, "data_compra", ["valor_total", "quantidade_comprada"], ["fornecedor", "produto_nome"])
+        return daily, validSortedDates(daily["data_compra"])
+
+    @traced()
+    def get_top_products_by_spend(self, df=None, top=10):
+        """Produtos com maior gasto (`df=None`: todas as compras)"""
+        if df is None:
+            if self.streaming:
+                return self.get_totals().topProducts(self._product_names(), top)
+            df = self.filter_data()
         if df.empty or "valor_total" not in df.columns:
             return pd.DataFrame()
+        return memo.aggregated(
+            "purchases.get_top_products_by_spend", df, {"top": top}, lambda: self._top_products_by_spend(df, top)
+        )
+
+    def _top_products_by_spend(self, df, top):
+        if self._is_full(df) and "produto_nome" in df.columns:
+            pre = artifacts.load("compras_top_produtos", {"top": top})
+            return pre if pre is not None else self.get_totals().topProducts(self._product_names(), top)
+
+        spec = sqlBackend.specOf(df)
+        if spec is not None:
+            cond, params = sqlBackend.specWhere(spec, extra=["p.produto_nome IS NOT NULL"])
+            return sqlBackend.query(
+                "SELECT p.produto_nome, SUM(c.valor_total) AS gasto_total" + _sql_from + cond
+                + " GROUP BY p.produto_nome ORDER BY gasto_total DESC LIMIT ?",
+                params + [int(top)], tables=("compras", "produtos"),
+            )
 
         top_df = (
-            df.groupby("produto_nome")
+            df.groupby("produto_nome", observed=True)
             .agg({"valor_total": "sum"})
             .reset_index()
             .sort_values("valor_total", ascending=False)
@@ -128,3 +354,73 @@ class PurchasesController:
         )
         top_df.rename(columns={"valor_total": "gasto_total"}, inplace=True)
         return top_df
+
+    def _product_names(self):
+        if self.produtosDf.empty or "produto_nome" not in self.produtosDf.columns:
+            return pd.Series(dtype="object")
+        return self.produtosDf.drop_duplicates("produto_id").set_index("produto_id")["produto_nome"]
+
+    @traced()
+    def get_supplier_scorecard(self, by_category=False):
+        """
+        Scorecard de fornecedores sobre todo o histórico de compras.
+
+        Calculado uma vez por versão de compras/produtos/fornecedores; os
+        filtros da página só selecionam linhas do resultado.
+        """
+        return store.getDerived(
+            ("purchases", "scorecard", by_category), ("compras", "produtos", "fornecedores"),
+            lambda: self._build_scorecard(by_category)
+        )
+
+    def _build_scorecard(self, by_category):
+        self.load_data()
+        compras = self.with_product_attributes(self.comprasDf) if by_category else self.comprasDf
+        return scorecard(compras, store.get("fornecedores"), byCategory=by_category)
+
+
+# ===============================
+# ===== INGESTÃO INCREMENTAL ====
+# ===============================
+# Lotes acrescentados a compras (models/ingestion.py) estendem os derivados
+# em cache em vez de refazê-los; produtos vêm do cache (não mudam no append).
+
+def _append_merged(value, name, rows):
+    df, _ = value
+    if name != "compras" or df.empty or "data_compra" not in df.columns:
+        return None
+    new = compact.conform(PurchasesController._merge_frames(rows, store.get("produtos")), df)
+    merged = extendFrame(df, new, categoricalCols, "data_compra")
+    return merged, validSortedDates(merged["data_compra"])
+
+
+def _append_daily(value, name, rows):
+    daily, _ = value
+    if name != "compras" or daily.empty:
+        return None
+    new = PurchasesController._merge_frames(rows, store.get("produtos"))
+    # células (dia, fornecedor, produto) podem se repetir: as visões somam por dia
+    partial = dailyBuckets(new, "data_compra", ["valor_total", "quantidade_comprada"], ["fornecedor", "produto_nome"])
+    daily = extendFrame(daily, partial, ["fornecedor", "produto_nome"], "data_compra")
+    return daily, validSortedDates(daily["data_compra"])
+
+
+def _append_totals(value, name, rows):
+    if name != "compras":
+        return None
+    totals = copy.copy(value)
+    return totals.fold(rows)
+
+
+store.registerAppend(("purchases", "merged"), _append_merged)
+store.registerAppend(("purchases", "daily"), _append_daily)
+store.registerAppend(("purchases", "totals"), _append_totals)
+
+
+def _warm():
+    # merge e totais refeitos em segundo plano quando compras/produtos mudam
+    if not sqlBackend.enabled():
+        PurchasesController().get_totals()
+
+
+refresher.registerWarmup(("compras", "produtos"), _warm)
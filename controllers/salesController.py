@@ -1,83 +1,320 @@
 import pandas as pd
+from models import artifacts, compact, memo, refresher, sqlBackend, streaming
+from models.dimensions import productDimension
+from models.dataStore import store
+from models.indexing import extendFrame
+from models.instrumentation import traced
+from models.salesCube import SalesCube
+from models.schemas import viewNames
+from models.timeSeries import TimeSeriesEngine
+
+# vendas com os atributos do produto, no backend SQL
+_salesFrom = " FROM vendas v LEFT JOIN produtos p ON p.produto_id = v.produto_id"
+_salesTables = ("vendas", "produtos")
 
 class SalesController:
     def __init__(self):
         self.vendasDf = pd.DataFrame()
         self.produtosDf = pd.DataFrame()
-        self.reloadData()
+        # versões de vendas/produtos de onde saiu o merge carregado (chave do memo)
+        self._dataVersions = None
+        # vendas.csv grande demais para a memória: só agregados lidos em blocos
+        self.streaming = False
+        # no backend SQL as vendas ficam no banco; nada é carregado aqui
+        if not sqlBackend.enabled():
+            self.reloadData()
 
+    @traced()
     def reloadData(self):
-        # Ler vendas.csv
-        try:
-            self.vendasDf = pd.read_csv("data/vendas.csv")
-            if not self.vendasDf.empty:
-                # Renomear colunas para padrão interno
-                rename_map = {
-                    "data_venda": "data",
-                    "produto_id": "produtoId",
-                    "loja_id": "loja",
-                    "quantidade_vendida": "quantidadeVendida",
-                    "valor_unitario": "precoUnitario",
-                    "valor_total": "valorTotal"
-                }
-                self.vendasDf.rename(columns=rename_map, inplace=True)
-
-                # Converte data para datetime
-                if "data" in self.vendasDf.columns:
-                    self.vendasDf["data"] = pd.to_datetime(self.vendasDf["data"], errors="coerce")
-        except (FileNotFoundError, pd.errors.EmptyDataError):
-            self.vendasDf = pd.DataFrame(columns=[
+        self.streaming = streaming.shouldStream("vendas")
+        # vendas já mescladas com produtos ficam no cache compartilhado do processo
+        (self.vendasDf, self.produtosDf), self._dataVersions = store.getVersioned(
+            ("sales", "merged"), _salesTables, self._buildFrames
+        )
+
+    @traced()
+    def _buildFrames(self):
+        # Ler vendas.csv (no modo em blocos as vendas não são carregadas)
+        vendasDf = pd.DataFrame() if streaming.shouldStream("vendas") else store.get("vendas")
+        if not vendasDf.empty:
+            vendasDf = self._prepareVendas(vendasDf)
+        else:
+            vendasDf = pd.DataFrame(columns=[
                 "data", "loja", "produtoId", "quantidadeVendida", "precoUnitario", "valorTotal"
             ])
 
         # Ler produtos.csv
-        try:
-            self.produtosDf = pd.read_csv("data/produtos.csv")
-            if not self.produtosDf.empty:
-                rename_map_prod = {
-                    "produto_id": "produtoId",
-                    "produto_nome": "produtoNome",
-                    "preco_unitario": "precoUnitario"
-                }
-                self.produtosDf.rename(columns=rename_map_prod, inplace=True)
-        except (FileNotFoundError, pd.errors.EmptyDataError):
-            self.produtosDf = pd.DataFrame(columns=["produtoId", "produtoNome", "precoUnitario"])
+        produtosDf = store.get("produtos")
+        if not produtosDf.empty:
+            produtosDf = produtosDf.rename(columns=viewNames["produtos"])
+        else:
+            produtosDf = pd.DataFrame(columns=["produtoId", "produtoNome", "precoUnitario"])
 
         # Merge e cálculo do valor total somente se ambas as colunas existirem
-        if not self.vendasDf.empty and not self.produtosDf.empty and "produtoId" in self.vendasDf.columns and "produtoId" in self.produtosDf.columns:
-            self.vendasDf = self.vendasDf.merge(self.produtosDf, on="produtoId", how="left")
-            if "valorTotal" not in self.vendasDf.columns:
-                self.vendasDf["valorTotal"] = self.vendasDf["quantidadeVendida"] * self.vendasDf["precoUnitario"]
+        if not vendasDf.empty and not produtosDf.empty and "produtoId" in vendasDf.columns and "produtoId" in produtosDf.columns:
+            vendasDf = self._mergeProdutos(vendasDf, produtosDf)
+            if compact.enabled:
+                # o merge largo repetiria todas as colunas de produtos em cada venda
+                dimension = productDimension()
+                extra = dimension.rowBytes(dimension.columns) - vendasDf["produtoNome"].cat.codes.dtype.itemsize
+                size = compact.frameBytes(vendasDf)
+                compact.record("vendas × produtos", size + int(extra * len(vendasDf)), size)
         else:
-            self.vendasDf = pd.DataFrame(columns=[
+            vendasDf = pd.DataFrame(columns=[
                 "data", "loja", "produtoId", "produtoNome",
                 "quantidadeVendida", "precoUnitario", "valorTotal"
             ])
 
+        return vendasDf, produtosDf
+
+    @staticmethod
+    def _prepareVendas(vendasDf):
+        # Renomear colunas canônicas para o padrão interno
+        vendasDf = vendasDf.rename(columns=viewNames["vendas"])
+
+        # Converte data para datetime (o loader já usa o formato do schema)
+        if "data" in vendasDf.columns and not pd.api.types.is_datetime64_any_dtype(vendasDf["data"]):
+            vendasDf["data"] = pd.to_datetime(vendasDf["data"], errors="coerce")
+        return vendasDf
+
+    @staticmethod
+    def _mergeProdutos(vendasDf, produtosDf):
+        if compact.enabled:
+            return SalesController._attachProdutos(vendasDf)
+        # preço de tabela do produto não sobrescreve o preço praticado na venda
+        vendasDf = vendasDf.merge(produtosDf, on="produtoId", how="left", suffixes=("", "Produto"))
+        if "valorTotal" not in vendasDf.columns:
+            vendasDf["valorTotal"] = vendasDf["quantidadeVendida"] * vendasDf["precoUnitario"]
+        return vendasDf
+
+    @staticmethod
+    def _attachProdutos(vendasDf):
+        # modo compacto: só o nome do produto (códigos de categoria) entra em
+        # cada venda; os demais atributos ficam na dimensão de produtos
+        dimension = productDimension()
+        vendasDf = vendasDf.copy(deep=False)
+        vendasDf["produtoNome"] = dimension.categorical(vendasDf["produtoId"], "produto_nome")
+        if "precoUnitario" not in vendasDf.columns:
+            vendasDf["precoUnitario"] = dimension.lookup(vendasDf["produtoId"], ["preco_unitario"])["preco_unitario"]
+        if "valorTotal" not in vendasDf.columns:
+            vendasDf["valorTotal"] = vendasDf["quantidadeVendida"] * vendasDf["precoUnitario"]
+        return vendasDf
 
+    def getCube(self) -> SalesCube:
+        """Cubo (dia × loja × produto) construído uma vez por versão dos dados."""
+        return self._versionedCube()[0]
+
+    def _versionedCube(self):
+        return store.getVersioned(("sales", "cube"), _salesTables, self._buildCube)
+
+    @traced()
+    def _buildCube(self) -> SalesCube:
+        self.reloadData()
+        return SalesCube(self.vendasDf)
+
+    @traced()
+    def filterCube(self, lojas=None, produtos=None, startDate=None, endDate=None):
+        """Recorte agregado para KPIs, top-N e série temporal (sem tocar nas linhas brutas)."""
+        filters = {"lojas": lojas, "produtos": produtos, "startDate": startDate, "endDate": endDate}
+        if sqlBackend.enabled():
+            return memo.filtered(
+                "sales.filterCube", memo.currentVersions(_salesTables), filters,
+                lambda: self._sqlFilterCube(lojas, produtos, startDate, endDate)
+            )
+        cube, versions = self._versionedCube()
+        return memo.filtered(
+            "sales.filterCube", versions, filters, lambda: cube.slice(lojas, produtos, startDate, endDate)
+        )
+
+    def _sqlFilterCube(self, lojas, produtos, startDate, endDate):
+        members = (("v.loja_id", lojas), ("p.produto_nome", produtos))
+        cond, params = sqlBackend.where(startDate, endDate, "v.data_venda", members)
+        cube = sqlBackend.query(
+            "SELECT v.data_venda AS data, v.loja_id AS loja, v.produto_id AS produtoId,"
+            " MIN(p.produto_nome) AS produtoNome, SUM(v.quantidade_vendida) AS quantidadeVendida,"
+            f" SUM({self._sqlValorTotal()}) AS valorTotal" + _salesFrom + cond
+            + " GROUP BY v.data_venda, v.loja_id, v.produto_id ORDER BY v.data_venda",
+            params, tables=_salesTables, dates=("data",),
+        )
+        cube["loja"] = cube["loja"].astype("category")
+        cube["produtoNome"] = cube["produtoNome"].astype("category")
+        return sqlBackend.attachSpec(cube, startDate, endDate, "v.data_venda", members)
+
+    def _sqlValorTotal(self) -> str:
+        # mesmo critério do _buildFrames: valor do arquivo ou quantidade × preço
+        if "valor_total" in sqlBackend.columns("vendas"):
+            return "v.valor_total"
+        return "v.quantidade_vendida * v.valor_unitario"
+
+    @traced()
+    def getFilterOptions(self) -> dict:
+        """Lojas, produtos e período disponíveis para os filtros da página."""
+        if sqlBackend.enabled():
+            lojas = sqlBackend.query(
+                "SELECT DISTINCT loja_id FROM vendas WHERE loja_id IS NOT NULL ORDER BY loja_id", tables=_salesTables
+            )["loja_id"].tolist()
+            produtos = sqlBackend.query(
+                "SELECT DISTINCT p.produto_nome" + _salesFrom + " WHERE p.produto_nome IS NOT NULL ORDER BY p.produto_nome",
+                tables=_salesTables,
+            )["produto_nome"].tolist()
+            period = sqlBackend.query(
+                "SELECT MIN(data_venda) AS inicio, MAX(data_venda) AS fim FROM vendas",
+                tables=_salesTables, dates=("inicio", "fim"),
+            )
+            return {"lojas": lojas, "produtos": produtos,
+                    "inicio": period["inicio"].iloc[0], "fim": period["fim"].iloc[0]}
+
+        df = self.vendasDf
+        if df.empty:
+            return {"lojas": [], "produtos": [], "inicio": None, "fim": None}
+        return {
+            "lojas": sorted(df["loja"].dropna().unique()),
+            "produtos": sorted(df["produtoNome"].dropna().unique()),
+            "inicio": df["data"].min(),
+            "fim": df["data"].max(),
+        }
+
+    @traced()
     def filterData(self, lojas=None, produtos=None, startDate=None, endDate=None):
+        filters = {"lojas": lojas, "produtos": produtos, "startDate": startDate, "endDate": endDate}
+        if sqlBackend.enabled():
+            return memo.filtered(
+                "sales.filterData", memo.currentVersions(_salesTables), filters,
+                lambda: self._sqlFilterData(lojas, produtos, startDate, endDate)
+            )
+        return memo.filtered(
+            "sales.filterData", self._dataVersions, filters,
+            lambda: self._filterData(lojas, produtos, startDate, endDate)
+        )
+
+    def _filterData(self, lojas, produtos, startDate, endDate):
         if self.vendasDf.empty:
             return pd.DataFrame(columns=self.vendasDf.columns)
-        df = self.vendasDf.copy()
+        # uma máscara só e uma única seleção: sem cópia do frame inteiro por
+        # filtro. Sem filtros, o frame compartilhado volta como está.
+        df = self.vendasDf
+        mask = pd.Series(True, index=df.index)
         if lojas:
-            df = df[df["loja"].isin(lojas)]
+            mask &= df["loja"].isin(lojas)
         if produtos:
-            df = df[df["produtoNome"].isin(produtos)]
+            mask &= df["produtoNome"].isin(produtos)
         if startDate:
-            df = df[df["data"] >= startDate]
+            mask &= df["data"] >= startDate
         if endDate:
-            df = df[df["data"] <= endDate]
-        return df
+            mask &= df["data"] <= endDate
+        return df if mask.all() else df[mask]
+
+    def _sqlFilterData(self, lojas, produtos, startDate, endDate):
+        members = (("v.loja_id", lojas), ("p.produto_nome", produtos))
+        cond, params = sqlBackend.where(startDate, endDate, "v.data_venda", members)
+        df = sqlBackend.query(
+            "SELECT v.data_venda AS data, v.loja_id AS loja, v.produto_id AS produtoId,"
+            " p.produto_nome AS produtoNome, v.quantidade_vendida AS quantidadeVendida,"
+            f" v.valor_unitario AS precoUnitario, {self._sqlValorTotal()} AS valorTotal,"
+            " p.categoria, p.marca" + _salesFrom + cond + " ORDER BY v.rowid",
+            params, tables=_salesTables, dates=("data",),
+        )
+        return sqlBackend.attachSpec(df, startDate, endDate, "v.data_venda", members)
 
-    def getTopProducts(self, df, top=10):
+    @traced()
+    def getTopProducts(self, df=None, top=10):
+        """Produtos mais vendidos em `df` (`None`: todas as vendas)"""
+        if df is None:
+            if self.streaming:
+                return store.getDerived(
+                    ("sales", "streamTop", top), _salesTables, lambda: streaming.topSoldProducts(top)
+                )
+            df = self.filterCube()
         if df.empty:
             return pd.DataFrame(columns=["produtoNome", "quantidadeVendida"])
-        return df.groupby("produtoNome")["quantidadeVendida"].sum().sort_values(ascending=False).head(top).reset_index()
+        return memo.aggregated("sales.getTopProducts", df, {"top": top}, lambda: self._topProducts(df, top))
+
+    def _isFull(self, df):
+        # o cubo completo, sem filtro: o job em lote pode já ter a resposta
+        return not sqlBackend.enabled() and not df.empty and df is self.getCube().cube
+
+    def _topProducts(self, df, top):
+        if self._isFull(df):
+            # pré-calculado pelo job em lote (batch/precompute.py), se os dados não mudaram
+            pre = artifacts.load("vendas_top_produtos", {"top": top})
+            if pre is not None:
+                return pre
+        spec = sqlBackend.specOf(df)
+        if spec is not None:
+            cond, params = sqlBackend.specWhere(spec, extra=["p.produto_nome IS NOT NULL"])
+            return sqlBackend.query(
+                "SELECT p.produto_nome AS produtoNome, SUM(v.quantidade_vendida) AS quantidadeVendida"
+                + _salesFrom + cond + " GROUP BY p.produto_nome ORDER BY quantidadeVendida DESC LIMIT ?",
+                params + [int(top)], tables=_salesTables,
+            )
+        return df.groupby("produtoNome", observed=True)["quantidadeVendida"].sum().sort_values(ascending=False).head(top).reset_index()
 
     def getRevenue(self, df):
         return df["valorTotal"].sum() if not df.empty else 0
 
-    def getTimeSeries(self, df):
+    @traced()
+    def getTimeSeries(self, df, freq="M", window=None, yoy=False):
+        """Série de `df` na granularidade `freq`; sobre o cubo completo, sai dos totais diários em cache."""
         if df.empty:
             return pd.DataFrame(columns=["data", "quantidadeVendida"])
-        return df.groupby(pd.Grouper(key="data", freq="M"))["quantidadeVendida"].sum().reset_index()
+        if self._isFull(df):
+            if freq == "M" and not window and not yoy:
+                pre = artifacts.load("vendas_volume_mensal")
+                if pre is not None:
+                    return pre
+            return self.getTimeSeriesEngine().view(freq, window, yoy)
+        return memo.aggregated(
+            "sales.getTimeSeries", df, {"freq": freq, "window": window, "yoy": yoy},
+            lambda: TimeSeriesEngine.fromFrame(df, "data", ["quantidadeVendida"]).view(freq, window, yoy)
+        )
+
+    @traced()
+    def getTimeSeriesEngine(self, lojas=None, produtos=None, startDate=None, endDate=None) -> TimeSeriesEngine:
+        """
+        Totais diários do recorte, guardados por filtro no cache compartilhado:
+        trocar de granularidade não refaz nenhum groupby sobre as vendas.
+        """
+        key = (
+            tuple(sorted(lojas)) if lojas else None, tuple(sorted(produtos)) if produtos else None,
+            startDate, endDate,
+        )
+        return store.getDerived(
+            ("sales", "timeSeries", key), ("vendas", "produtos"),
+            lambda: TimeSeriesEngine.fromFrame(
+                self.filterCube(lojas, produtos, startDate, endDate), "data", ["quantidadeVendida", "valorTotal"]
+            )
+        )
+
+
+# Lotes acrescentados a vendas (models/ingestion.py) estendem o merge e o
+# cubo em cache em vez de refazê-los a partir de todas as vendas.
+
+def _appendMerged(value, name, rows):
+    vendasDf, produtosDf = value
+    if name != "vendas" or vendasDf.empty or produtosDf.empty or "produtoId" not in produtosDf.columns:
+        return None
+    new = SalesController._mergeProdutos(SalesController._prepareVendas(rows), produtosDf)
+    categorical = [c for c in vendasDf.columns if isinstance(vendasDf[c].dtype, pd.CategoricalDtype)]
+    return extendFrame(vendasDf, compact.conform(new, vendasDf), categorical), produtosDf
+
+
+def _appendCube(value, name, rows):
+    if name != "vendas" or value.cube.empty:
+        return None
+    produtosDf = store.get("produtos").rename(columns=viewNames["produtos"])
+    if produtosDf.empty:
+        return None
+    return value.extended(SalesController._mergeProdutos(SalesController._prepareVendas(rows), produtosDf))
+
+
+store.registerAppend(("sales", "merged"), _appendMerged)
+store.registerAppend(("sales", "cube"), _appendCube)
+
+
+def _warm():
+    # merge e cubo refeitos em segundo plano quando vendas/produtos mudam
+    if not sqlBackend.enabled():
+        SalesController().getCube()
+
+
+refresher.registerWarmup(_salesTables, _warm)
@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import time
+
+# Partida rápida: pré-carga, em segundo plano, do conteúdo padrão das páginas.
+#
+# app.py chama start() depois de desenhar a página inicial; a thread importa
+# pandas/plotly e os controllers, carrega os datasets e calcula o que cada
+# página mostra sem filtros (KPIs, séries, top-N), com as mesmas chamadas e
+# argumentos das páginas. Tudo fica no cache compartilhado e no memo, então o
+# primeiro acesso a cada página já sai do cache. Os módulos pesados só são
+# importados dentro da thread: importar este arquivo não carrega pandas.
+# FCD_WARMUP=0 desliga a pré-carga.
+
+enabled = os.environ.get("FCD_WARMUP", "1") != "0"
+
+_startLock = threading.Lock()
+_thread = None
+# tempos em segundos: imports, pré-carga por página e primeiro render de cada página
+_timings = {"imports": {}, "paginas": {}, "primeiroRender": {}}
+_timingsLock = threading.Lock()
+_heavyModules = ("pandas", "plotly.express")
+
+
+def _record(section: str, name: str, seconds: float, onlyFirst: bool = False):
+    with _timingsLock:
+        if onlyFirst and name in _timings[section]:
+            return
+        _timings[section][name] = seconds
+
+
+def _importHeavy():
+    for module in _heavyModules:
+        if module in sys.modules:
+            continue
+        start = time.perf_counter()
+        __import__(module)
+        _record("imports", module, time.perf_counter() - start)
+    start = time.perf_counter()
+    # o controller da previsão importa os outros três
+    import controllers.forecastController
+    _record("imports", "controllers", time.perf_counter() - start)
+
+
+def warmProjeto1():
+    """Inventário da rede inteira, todas as categorias, a previsão padrão e a conciliação."""
+    from controllers.forecastController import ForecastController
+    from controllers.inventoryController import InventoryController
+    from controllers.ledgerController import LedgerController
+    invCtrl = InventoryController()
+    invCtrl.getLocations()
+    inventoryDf = invCtrl.buildInventoryView(None)
+    categorias = sorted(inventoryDf["categoria"].dropna().unique().tolist()) if "categoria" in inventoryDf.columns else []
+    invCtrl.filterByCategory(inventoryDf, categorias)
+    forecastDf = ForecastController(invCtrl=invCtrl).getForecast(None, reviewDays=30)
+    invCtrl.filterByCategory(forecastDf, categorias)
+    ledgerCtrl = LedgerController(invCtrl=invCtrl)
+    invCtrl.filterByCategory(ledgerCtrl.getReconciliation(), categorias)
+    invCtrl.filterByCategory(ledgerCtrl.getLedger(), categorias)
+
+
+def warmProjeto2():
+    """Cubo do período inteiro, top-N, série mensal e a tabela de vendas."""
+    from controllers.salesController import SalesController
+    salesCtrl = SalesController()
+    if salesCtrl.streaming:
+        # vendas lidas em blocos: a página só mostra o ranking do histórico inteiro
+        salesCtrl.getTopProducts()
+        return
+    opcoes = salesCtrl.getFilterOptions()
+    if not opcoes["lojas"] and not opcoes["produtos"]:
+        return
+    # seleção completa vira "sem filtro" na página
+    cubeDf = salesCtrl.filterCube(None, None, None, None)
+    salesCtrl.getTopProducts(cubeDf)
+    salesCtrl.getTimeSeries(cubeDf, "M", 0, False)
+    salesCtrl.filterData(None, None, None, None)
+
+
+def warmProjeto3():
+    """Compras sem filtro: comparativo, scorecards, volume mensal e top produtos."""
+    from controllers.purchasesController import PurchasesController
+    ctrl = PurchasesController()
+    if ctrl.streaming:
+        # compras lidas em blocos: a página só mostra os agregados do histórico inteiro
+        ctrl.get_supplier_comparative()
+        ctrl.get_monthly_volume()
+        ctrl.get_top_products_by_spend()
+        return
+    opcoes = ctrl.get_filter_options()
+    if not opcoes["fornecedores"] and not opcoes["produtos"]:
+        return
+    # seleção completa vira "sem filtro" na página
+    filtered = ctrl.filter_data(None, None, None, None)
+    ctrl.get_supplier_comparative(filtered)
+    ctrl.get_supplier_scorecard()
+    ctrl.get_supplier_scorecard(by_category=True)
+    ctrl.get_volume_engine(None, None, None, None).view("M")
+    ctrl.get_top_products_by_spend(filtered)
+
+
+pages = {"projeto1": warmProjeto1, "projeto2": warmProjeto2, "projeto3": warmProjeto3}
+# datasets de que cada página depende (refeita em segundo plano quando mudam)
+pageDeps = {
+    "projeto1": ("produtos", "estoque", "compras", "vendas"),
+    "projeto2": ("vendas", "produtos"),
+    "projeto3": ("compras", "produtos", "fornecedores"),
+}
+
+
+def warmAll() -> dict:
+    """Pré-carrega as três páginas; retorna os tempos de cada uma (segundos)."""
+    from models import sqlBackend
+    from models.dataStore import store
+    start = time.perf_counter()
+    # no backend SQL os dados ficam no banco: a importação sai das próprias páginas
+    if not sqlBackend.enabled():
+        store.warm()
+    _record("paginas", "datasets", time.perf_counter() - start)
+    for name, warm in pages.items():
+        start = time.perf_counter()
+        try:
+            warm()
+        except Exception as e:
+            print(f"❌ Erro na pré-carga de {name}: {e}")
+            continue
+        _record("paginas", name, time.perf_counter() - start)
+    return report()["paginas"]
+
+
+def _run():
+    start = time.perf_counter()
+    _importHeavy()
+    from models import refresher
+    warmAll()
+    total = time.perf_counter() - start
+    _record("paginas", "total", total)
+    print(f"⏱️ Pré-carga concluída em {total:.2f}s (imports + dados + páginas padrão).")
+    # depois da pré-carga, mudanças em data/ também refazem as páginas padrão
+    for name, warm in pages.items():
+        refresher.registerWarmup(pageDeps[name], warm)
+    refresher.start()
+
+
+def start() -> bool:
+    """Inicia a pré-carga (uma vez por processo). Retorna False se estiver desligada."""
+    global _thread
+    if not enabled:
+        return False
+    with _startLock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="fcd-warmup", daemon=True)
+            _thread.start()
+    return True
+
+
+def done() -> bool:
+    return _thread is not None and not _thread.is_alive()
+
+
+def recordRender(page: str, seconds: float):
+    """Registra o tempo do primeiro render de `page` neste processo."""
+    _record("primeiroRender", page, seconds, onlyFirst=True)
+
+
+def report() -> dict:
+    with _timingsLock:
+        return {section: dict(values) for section, values in _timings.items()}
@@ -0,0 +1,92 @@
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# pyarrow é opcional: sem ele os loaders continuam lendo o CSV diretamente
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+    ipc = None
+
+cacheDirName = ".cache"
+
+
+def fileVersion(path: Path) -> tuple:
+    """Identifica a versão de um arquivo pelo caminho, tamanho e mtime."""
+    st = path.stat()
+    return (str(path.resolve()), st.st_size, st.st_mtime_ns)
+
+
+def _hash(value) -> str:
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()
+
+
+def _cachePrefix(path: Path) -> str:
+    # prefixo estável por arquivo de origem, usado para limpar versões antigas
+    return f"{path.stem}-{_hash(str(path.resolve()))[:8]}"
+
+
+def cacheFileFor(path: Path, salt: str = "") -> Path:
+    """Caminho do arquivo Arrow correspondente à versão atual de `path`."""
+    key = _hash((fileVersion(path), salt))[:16]
+    return path.parent / cacheDirName / f"{_cachePrefix(path)}-{key}.arrow"
+
+
+def readArrow(cacheFile: Path) -> pd.DataFrame:
+    """Lê um arquivo Arrow IPC via memory-map."""
+    source = pa.memory_map(str(cacheFile), "r")
+    table = ipc.open_file(source).read_all()
+    return table.to_pandas()
+
+
+def writeArrow(df: pd.DataFrame, cacheFile: Path) -> bool:
+    """Grava o DataFrame como Arrow IPC (sem compressão, para permitir mmap)."""
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        cacheFile.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cacheFile.with_suffix(f".{os.getpid()}.tmp")
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, cacheFile)
+    except Exception as e:
+        # colunas com tipos mistos ou diretório sem escrita: segue sem cache
+        print(f"⚠️ Não foi possível gravar o cache de {cacheFile.name}: {e}")
+        return False
+
+    # remove versões antigas do mesmo arquivo de origem
+    prefix = cacheFile.name.rsplit("-", 1)[0]
+    for old in cacheFile.parent.glob(f"{prefix}-*.arrow"):
+        if old != cacheFile:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    return True
+
+
+def readCached(path: Path, parser, salt: str = "") -> pd.DataFrame:
+    """
+    Lê `path` usando o cache colunar Arrow.
+
+    Na primeira leitura o CSV é interpretado por `parser` e gravado em
+    `.cache/`; nas seguintes o arquivo Arrow é mapeado em memória. A chave
+    inclui caminho, tamanho e mtime, então o cache é refeito quando o CSV muda.
+    """
+    if pa is None:
+        return parser(path)
+
+    cacheFile = cacheFileFor(path, salt)
+    if cacheFile.exists():
+        try:
+            return readArrow(cacheFile)
+        except Exception:
+            pass  # cache corrompido: reconstrói a partir do CSV
+
+    df = parser(path)
+    writeArrow(df, cacheFile)
+    return df
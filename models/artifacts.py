@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from models import compact, dataModel
+from models.arrowCache import pa
+
+# Artefatos pré-calculados pelo job em lote (batch/precompute.py).
+#
+# Cada execução grava um diretório versionado em <data>/artefatos/ com um
+# Parquet por resultado (JSON quando não há pyarrow) e um manifest.json com a
+# versão de cada dataset de origem; latest.json aponta para a última execução
+# completa e só é trocado depois que todos os arquivos estão gravados. load()
+# devolve um artefato apenas se os datasets de que ele depende continuam na
+# mesma versão: senão o controller calcula na hora, como antes.
+# FCD_ARTIFACTS aponta para outro diretório; FCD_ARTIFACTS=0 desliga a leitura.
+
+dirName = "artefatos"
+latestName = "latest.json"
+manifestName = "manifest.json"
+_setting = os.environ.get("FCD_ARTIFACTS", "")
+# o próprio job em lote desliga a leitura para sempre recalcular
+enabled = _setting != "0"
+
+# caminho do latest.json -> (mtime, manifest já lido)
+_manifestCache = {}
+
+
+def root() -> Path:
+    return Path(_setting) if _setting not in ("", "0") else dataModel.dataDir / dirName
+
+
+def versionTag(name: str):
+    """Identificador curto da versão atual do dataset `name` (None se não existir)."""
+    version = dataModel.datasetVersion(name)
+    if version is None:
+        return None
+    return hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:16]
+
+
+def write(df: pd.DataFrame, directory: Path, name: str) -> str:
+    """Grava `df` em `directory`; retorna o nome do arquivo."""
+    df = df.copy(deep=False)
+    # etiquetas do memo (timestamps em attrs) não vão para os metadados do Parquet
+    df.attrs = {}
+    if pa is not None:
+        fileName = f"{name}.parquet"
+        df.to_parquet(directory / fileName)
+    else:
+        fileName = f"{name}.json"
+        df.to_json(directory / fileName, orient="table", date_format="iso")
+    return fileName
+
+
+def _read(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_json(path, orient="table")
+
+
+def publish(directory: Path, manifest: dict, keep: int = 7):
+    """Grava o manifest de `directory`, aponta latest.json para ele e apaga versões antigas."""
+    (directory / manifestName).write_text(json.dumps(manifest, indent=2, default=str), encoding="utf-8")
+    base = directory.parent
+    tmp = base / (latestName + ".tmp")
+    tmp.write_text(json.dumps({"versao": directory.name}), encoding="utf-8")
+    # troca atômica: quem lê vê a execução anterior ou a nova, nunca metade
+    os.replace(tmp, base / latestName)
+    versions = sorted(p for p in base.iterdir() if p.is_dir() and (p / manifestName).exists())
+    for old in versions[:-keep] if keep > 0 else []:
+        if old != directory:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def manifest():
+    """Manifest da última execução publicada (None se não houver)."""
+    latest = root() / latestName
+    try:
+        mtime = latest.stat().st_mtime_ns
+    except OSError:
+        return None
+    cached = _manifestCache.get(str(latest))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        version = json.loads(latest.read_text(encoding="utf-8"))["versao"]
+        directory = latest.parent / version
+        data = json.loads((directory / manifestName).read_text(encoding="utf-8"))
+    except (OSError, ValueError, KeyError):
+        return None
+    data["diretorio"] = str(directory)
+    _manifestCache[str(latest)] = (mtime, data)
+    return data
+
+
+def load(name: str, params: dict = None):
+    """
+    Artefato `name` da última execução, ou None se não existir, se foi
+    calculado com outros `params` ou se algum dataset de origem mudou.
+    """
+    if not enabled:
+        return None
+    current = manifest()
+    if current is None or current.get("compacto") != compact.enabled:
+        return None
+    entry = current["artefatos"].get(name)
+    if entry is None or entry.get("parametros", {}) != (params or {}):
+        return None
+    versions = current["versoes"]
+    if any(versionTag(d) != versions.get(d) for d in entry["datasets"]):
+        return None
+    try:
+        return _read(Path(current["diretorio"]) / entry["arquivo"])
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,102 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Representação compacta dos DataFrames em memória.
+#
+# Com FCD_COMPACT ligado (padrão; FCD_COMPACT=0 desliga), os datasets do
+# cache compartilhado guardam texto repetitivo como categoria e inteiros no
+# menor tipo que comporta os valores, nunca abaixo de int32 (produtos entre
+# colunas int16 estourariam). Floats ficam em float64 para não mudar totais
+# monetários. Os controllers também deixam de repetir atributos de produto
+# em cada linha de fato: eles vêm da dimensão (models/dimensions.py) só
+# quando são usados. `report()` resume a memória economizada.
+
+enabled = os.environ.get("FCD_COMPACT", "1") != "0"
+# texto vira categoria quando há no máximo esta fração de valores distintos
+categoryMaxRatio = 0.5
+_minIntType = np.int32
+
+# rótulo -> (bytes na representação larga, bytes na compacta)
+_savings = {}
+_savingsLock = threading.Lock()
+
+
+def frameBytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _isText(series: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def _downcastInt(series: pd.Series) -> pd.Series:
+    if series.empty:
+        return series
+    lo, hi = series.min(), series.max()
+    for dtype in (_minIntType, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return series.astype(dtype) if dtype != series.dtype else series
+    return series
+
+
+def compactFrame(df: pd.DataFrame, label: str = None) -> pd.DataFrame:
+    """
+    Versão compacta de `df`: texto repetitivo como categoria e inteiros
+    reduzidos. Com `label`, a economia fica registrada em `report()`.
+    """
+    if df.empty:
+        return df
+    out = df.copy(deep=False)
+    for col in out.columns:
+        series = out[col]
+        if pd.api.types.is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            out[col] = _downcastInt(series)
+        elif _isText(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            if series.nunique(dropna=True) <= categoryMaxRatio * len(series):
+                out[col] = series.astype("category")
+    if label:
+        record(label, frameBytes(df), frameBytes(out))
+    return out
+
+
+def conform(rows: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajusta os inteiros de `rows` aos tipos reduzidos de `like`, para que um
+    concat não volte o histórico inteiro para int64 (quando os valores cabem).
+    """
+    out = rows.copy(deep=False)
+    for col in out.columns.intersection(like.columns):
+        target = like[col].dtype
+        if (pd.api.types.is_integer_dtype(out[col]) and pd.api.types.is_integer_dtype(target)
+                and not isinstance(target, pd.CategoricalDtype) and not out[col].empty):
+            info = np.iinfo(target)
+            if info.min <= out[col].min() and out[col].max() <= info.max:
+                out[col] = out[col].astype(target)
+    return out
+
+
+def record(label: str, wideBytes: int, compactBytes: int):
+    """Registra o tamanho de um item na representação larga e na compacta."""
+    with _savingsLock:
+        _savings[label] = (int(wideBytes), int(compactBytes))
+
+
+def report() -> pd.DataFrame:
+    """Memória por item (MB) na representação larga e na compacta, e a economia."""
+    with _savingsLock:
+        items = dict(_savings)
+    rows = [
+        {
+            "item": label,
+            "largaMB": wide / 1024 / 1024,
+            "compactaMB": small / 1024 / 1024,
+            "economiaMB": (wide - small) / 1024 / 1024,
+            "economiaPct": (1 - small / wide) * 100 if wide else 0.0,
+        }
+        for label, (wide, small) in sorted(items.items())
+    ]
+    return pd.DataFrame(rows, columns=["item", "largaMB", "compactaMB", "economiaMB", "economiaPct"])
@@ -1,45 +1,231 @@
-import pandas as pd
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import pandas as pd
+from models.instrumentation import traced
+from models.arrowCache import cacheFileFor, fileVersion, pa, readArrow, readCached, writeArrow
+from models.schemas import applySchema, fingerprint, normalizeColumns, readDtypes, schemaFor
+
 dataDir = Path("data")
 
-def _try_read_csv(path: Path) -> pd.DataFrame:
+# nome lógico do dataset -> arquivo em dataDir
+datasetFiles = {
+    "clientes": "clientes.csv",
+    "estoque": "estoque.csv",
+    "fornecedores": "fornecedores.csv",
+    "compras": "compras.csv",
+    "logistica": "logistica.csv",
+    "produtos": "produtos.csv",
+    "vendas": "vendas.csv",
+}
+
+# contagem de linhas com falha de conversão da última carga de cada dataset
+parseErrors = {}
+
+def _try_read_csv(path: Path, dtype: dict = None) -> pd.DataFrame:
     # tenta com separador padrão, se falhar tenta tab
     try:
-        return pd.read_csv(path)
+        return pd.read_csv(path, dtype=dtype)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
     except Exception:
-        return pd.read_csv(path, sep="\t", engine="python")
+        return pd.read_csv(path, sep="\t", engine="python", dtype=dtype)
+
+def _parseCsv(path: Path, name: str) -> pd.DataFrame:
+    df = _try_read_csv(path, readDtypes(name))
+    # cabeçalhos canônicos antes de aplicar os tipos do schema
+    df = normalizeColumns(df, name)
+    return applySchema(df, name)
+
+def _readCsv(path: Path, name: str) -> pd.DataFrame:
+    # usa o cache colunar quando disponível; o schema entra na chave do cache
+    df = readCached(path, lambda p: _parseCsv(p, name), salt=fingerprint(name))
+    parseErrors[name] = df.attrs.get("parseErrors", {})
+    return df
+
+def datasetPath(name: str) -> Path:
+    return dataDir / datasetFiles[name]
+
+def partitionRoot(name: str) -> Path:
+    # lotes acrescentados ficam ao lado do CSV: data/compras/mes=2024-05/...
+    return dataDir / Path(datasetFiles[name]).stem
+
+def partitionFiles(name: str) -> list:
+    """Lotes acrescentados a `name` (models/ingestion.py), na ordem em que foram gravados."""
+    root = partitionRoot(name)
+    if not root.is_dir():
+        return []
+    # o nome do arquivo começa pelo instante da gravação; o mês desempata dentro do lote
+    return sorted(root.glob("mes=*/*.csv"), key=lambda p: (p.name, p.parent.name))
+
+def datasetVersion(name: str):
+    """Versão atual do arquivo do dataset e dos seus lotes (None se não existir)."""
+    p = datasetPath(name)
+    base = fileVersion(p) if p.exists() else None
+    parts = partitionFiles(name)
+    if not parts:
+        return base
+    return (base, tuple(fileVersion(x) for x in parts))
+
+def readPartitions(name: str, paths) -> pd.DataFrame:
+    """Lê arquivos de lote de `name` (cada um com o próprio cache Arrow)."""
+    frames = [_readCsv(p, name) for p in paths]
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
+def _withPartitions(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    # arquivo principal + lotes; linhas de lote com chave já vista são ignoradas
+    parts = partitionFiles(name)
+    if not parts:
+        return df
+    errors = dict(parseErrors.get(name, {}))
+    batches = readPartitions(name, parts)
+    parseErrors[name] = errors
+    if batches.empty:
+        return df
+    out = pd.concat([df, batches], ignore_index=True) if not df.empty else batches
+    key = schemaFor(name).get("key")
+    if key in out.columns:
+        repeated = out[key].duplicated(keep="first").to_numpy() & out[key].notna().to_numpy()
+        repeated[: len(df)] = False
+        if repeated.any():
+            out = out[~repeated].reset_index(drop=True)
+    return out
+
+@traced("load.clientes")
 def loadClientes() -> pd.DataFrame:
     p = dataDir / "clientes.csv"
-    return _try_read_csv(p) if p.exists() else pd.DataFrame()
+    return _readCsv(p, "clientes") if p.exists() else pd.DataFrame()
 
+@traced("load.estoque")
 def loadEstoque() -> pd.DataFrame:
     p = dataDir / "estoque.csv"
     if not p.exists():
         return pd.DataFrame()
-    df = _try_read_csv(p)
-    if "data_referencia" in df.columns:
-        df["data_referencia"] = pd.to_datetime(df["data_referencia"], errors="coerce")
-    return df
+    # data_referencia já vem convertida pelo schema
+    return _readCsv(p, "estoque")
 
+@traced("load.compras")
 def loadCompras() -> pd.DataFrame:
     p = dataDir / "compras.csv"
-    return _try_read_csv(p) if p.exists() else pd.DataFrame()
+    return _withPartitions("compras", _readCsv(p, "compras") if p.exists() else pd.DataFrame())
 
+@traced("load.logistica")
 def loadLogistica() -> pd.DataFrame:
     p = dataDir / "logistica.csv"
-    return _try_read_csv(p) if p.exists() else pd.DataFrame()
+    return _readCsv(p, "logistica") if p.exists() else pd.DataFrame()
 
+@traced("load.produtos")
 def loadProdutos() -> pd.DataFrame:
     p = dataDir / "produtos.csv"
     if not p.exists():
         return pd.DataFrame()
-    df = _try_read_csv(p)
-    # limpa cabeçalhos
-    df.columns = [c.strip() for c in df.columns]
-    return df
+    return _readCsv(p, "produtos")
 
+@traced("load.vendas")
 def loadVendas() -> pd.DataFrame:
     p = dataDir / "vendas.csv"
-    return _try_read_csv(p) if p.exists() else pd.DataFrame()
\ No newline at end of file
+    return _withPartitions("vendas", _readCsv(p, "vendas") if p.exists() else pd.DataFrame())
+
+@traced("load.fornecedores")
+def loadFornecedores() -> pd.DataFrame:
+    p = dataDir / "fornecedores.csv"
+    return _readCsv(p, "fornecedores") if p.exists() else pd.DataFrame()
+
+loaders = {
+    "clientes": loadClientes,
+    "estoque": loadEstoque,
+    "fornecedores": loadFornecedores,
+    "compras": loadCompras,
+    "logistica": loadLogistica,
+    "produtos": loadProdutos,
+    "vendas": loadVendas,
+}
+
+# tempos da última chamada de loadAll, por dataset
+lastLoadTimings = {}
+# abaixo deste volume de CSV o custo de subir processos supera o ganho
+parallelMinBytes = int(os.environ.get("FCD_PARALLEL_MIN_MB", "64")) * 1024 * 1024
+
+def _parseToCache(name: str, dataDirStr: str):
+    # roda no processo filho: interpreta o CSV e grava o Arrow que o pai mapeia
+    global dataDir
+    dataDir = Path(dataDirStr)
+    start = time.perf_counter()
+    path = datasetPath(name)
+    cacheFile = cacheFileFor(path, fingerprint(name))
+    cached = cacheFile.exists()
+    if not cached and not writeArrow(_parseCsv(path, name), cacheFile):
+        return name, None, time.perf_counter() - start, cached
+    return name, str(cacheFile), time.perf_counter() - start, cached
+
+@traced("load.loadAll")
+def loadAll(names=None, workers: int = None) -> dict:
+    """
+    Carrega vários datasets em paralelo num pool de processos.
+
+    Cada processo filho interpreta um CSV e grava o cache Arrow; o processo
+    principal só mapeia esses arquivos em memória, então nenhum DataFrame
+    passa por pickle. Datasets com cache válido nem vão para o pool, e sem
+    pyarrow a carga é sequencial. Os tempos por dataset ficam em
+    `lastLoadTimings`: parse (no filho), read (mmap no pai) e total (desde o
+    início da chamada até o dataset ficar pronto).
+    """
+    names = [n for n in (names or list(loaders)) if datasetVersion(n) is not None]
+    frames = {n: pd.DataFrame() for n in (names or [])}
+    lastLoadTimings.clear()
+    if not names:
+        return frames
+
+    if pa is None:
+        for n in names:
+            start = time.perf_counter()
+            frames[n] = loaders[n]()
+            lastLoadTimings[n] = {"parse": time.perf_counter() - start, "read": 0.0,
+                                  "total": time.perf_counter() - start, "cached": False,
+                                  "rows": len(frames[n])}
+        return frames
+
+    # só lotes, sem arquivo principal: o loader lê os lotes diretamente
+    for n in [n for n in names if not datasetPath(n).exists()]:
+        frames[n] = loaders[n]()
+        names.remove(n)
+
+    start = time.perf_counter()
+    # só os datasets sem cache Arrow válido precisam de parse
+    results = [
+        (n, str(cacheFileFor(datasetPath(n), fingerprint(n))), 0.0, True) for n in names
+        if cacheFileFor(datasetPath(n), fingerprint(n)).exists()
+    ]
+    pending = [n for n in names if n not in {r[0] for r in results}]
+    pendingBytes = sum(datasetPath(n).stat().st_size for n in pending)
+    if len(pending) == 1 or (pending and pendingBytes < parallelMinBytes):
+        results += [_parseToCache(n, str(dataDir)) for n in pending]
+    elif pending:
+        workers = workers or min(len(pending), os.cpu_count() or 1)
+        # spawn: seguro mesmo quando o processo pai já tem threads (Streamlit)
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results += list(pool.map(_parseToCache, pending, [str(dataDir)] * len(pending)))
+
+    for name, cacheFile, parseSeconds, cached in results:
+        readStart = time.perf_counter()
+        if cacheFile:
+            df = readArrow(Path(cacheFile))
+            parseErrors[name] = df.attrs.get("parseErrors", {})
+            # lotes acrescentados são pequenos: lidos aqui, no processo principal
+            df = _withPartitions(name, df)
+        else:
+            df = loaders[name]()
+        frames[name] = df
+        lastLoadTimings[name] = {
+            "parse": parseSeconds,
+            "read": time.perf_counter() - readStart,
+            "total": time.perf_counter() - start,
+            "cached": cached,
+            "rows": len(df),
+        }
+    return frames
@@ -0,0 +1,322 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+from models import compact, dataModel, streaming
+
+
+def sizeOf(value) -> int:
+    """Estimativa do tamanho em bytes de um valor guardado em cache."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeOf(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeOf(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class ByteBoundedLRU:
+    """LRU limitado pelo total de bytes dos valores (não pelo número de itens)."""
+
+    def __init__(self, maxBytes: int):
+        self.maxBytes = maxBytes
+        self.totalBytes = 0
+        self._items = OrderedDict()  # chave -> (valor, bytes)
+        self._lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, nbytes: int = None):
+        nbytes = sizeOf(value) if nbytes is None else nbytes
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.totalBytes -= old[1]
+            self._items[key] = (value, nbytes)
+            self.totalBytes += nbytes
+            # remove os menos usados, mas nunca o item recém-inserido
+            while self.totalBytes > self.maxBytes and len(self._items) > 1:
+                _, (_, freed) = self._items.popitem(last=False)
+                self.totalBytes -= freed
+
+    def putMany(self, items):
+        """Insere vários (chave, valor, bytes) de uma vez: leitores veem todos ou nenhum."""
+        with self._lock:
+            for key, value, nbytes in items:
+                self.put(key, value, nbytes)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+            if item is not None:
+                self.totalBytes -= item[1]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.totalBytes = 0
+
+    def keys(self):
+        with self._lock:
+            return list(self._items.keys())
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DataStore:
+    """
+    Cache de dados compartilhado pelo processo inteiro.
+
+    Guarda uma única cópia de cada dataset (e de quadros derivados) para
+    todas as sessões e reruns do Streamlit. Cada entrada é associada à versão
+    do arquivo de origem e é recarregada quando o arquivo muda. Os DataFrames
+    devolvidos são compartilhados: os consumidores não devem modificá-los.
+
+    Dentro de `refreshing()` (models/refresher.py), as entradas novas são
+    montadas à parte e publicadas juntas no fim; enquanto isso, quem pede
+    uma entrada desatualizada recebe a última versão completa.
+    """
+
+    def __init__(self, maxBytes: int):
+        self._cache = ByteBoundedLRU(maxBytes)
+        self._keyLocks = {}
+        self._locksGuard = threading.Lock()
+        self._state = {}
+        self._appenders = {}
+        # entradas em montagem pela thread que está reconstruindo (refreshing)
+        self._staging = threading.local()
+        self._refreshing = {}
+        self._refreshGuard = threading.Lock()
+        self._refreshPending = None
+
+    def _keyLock(self, key) -> threading.Lock:
+        with self._locksGuard:
+            return self._keyLocks.setdefault(key, threading.Lock())
+
+    def version(self, name: str):
+        return dataModel.datasetVersion(name)
+
+    def get(self, name: str) -> pd.DataFrame:
+        """Retorna o dataset `name`, recarregando-o só se o arquivo mudou."""
+        return self.getDerived(("dataset", name), (name,), lambda: self._compacted(name, dataModel.loaders[name]()))
+
+    @staticmethod
+    def _compacted(name: str, df: pd.DataFrame) -> pd.DataFrame:
+        # modo compacto (models/compact.py): categorias e inteiros reduzidos
+        return compact.compactFrame(df, f"dataset {name}") if compact.enabled else df
+
+    def warm(self, names=None) -> dict:
+        """
+        Carrega em paralelo (dataModel.loadAll) os datasets ausentes ou
+        desatualizados no cache. Datasets grandes demais para a memória
+        (streaming.shouldStream) ficam de fora: os controllers os leem em
+        blocos. Retorna os tempos por dataset.
+        """
+        stale = []
+        for name in names or list(dataModel.loaders):
+            if streaming.shouldStream(name):
+                continue
+            cached = self._lookup(("dataset", name))
+            if cached is None or cached[1] != (self.version(name),):
+                stale.append(name)
+        if not stale:
+            return {}
+        # versões lidas antes da carga: no pior caso o dado é mais novo que a etiqueta
+        versions = {name: self.version(name) for name in stale}
+        for name, df in dataModel.loadAll(stale).items():
+            df = self._compacted(name, df)
+            self._publish(("dataset", name), ((name,), (versions[name],), df))
+        return dict(dataModel.lastLoadTimings)
+
+    def getDerived(self, key, deps: tuple, builder):
+        """
+        Retorna um valor derivado dos datasets em `deps`.
+
+        `builder()` só é executado quando alguma dependência muda de versão;
+        chamadas concorrentes para a mesma chave esperam um único build.
+        """
+        return self.getVersioned(key, deps, builder)[0]
+
+    def getVersioned(self, key, deps: tuple, builder):
+        """Como `getDerived`, mas retorna (valor, versões de `deps` de que ele saiu)."""
+        versions = tuple(self.version(d) for d in deps)
+        cached = self._lookup(key)
+        if cached is not None and cached[1] == versions:
+            return cached[2], cached[1]
+
+        staged = self._staged()
+        if staged is not None:
+            # reconstrução em segundo plano: o valor só aparece no fim do refreshing()
+            value = builder()
+            staged[key] = (deps, versions, value)
+            return value, versions
+        if cached is not None and (self._isRefreshing(deps) or self._isPending(deps)):
+            return cached[2], cached[1]
+
+        with self._keyLock(key):
+            cached = self._cache.get(key)
+            if cached is not None and cached[1] == versions:
+                return cached[2], cached[1]
+            value = builder()
+            self._cache.put(key, (deps, versions, value), sizeOf(value))
+            return value, versions
+
+    def _staged(self):
+        return getattr(self._staging, "entries", None)
+
+    def _lookup(self, key):
+        # a thread que reconstrói enxerga primeiro o que ela mesma já montou
+        staged = self._staged()
+        if staged is not None and key in staged:
+            return staged[key]
+        return self._cache.get(key)
+
+    def _publish(self, key, entry):
+        staged = self._staged()
+        if staged is not None:
+            staged[key] = entry
+        else:
+            self._cache.put(key, entry, sizeOf(entry[2]))
+
+    def _isRefreshing(self, deps) -> bool:
+        with self._refreshGuard:
+            return any(self._refreshing.get(d) for d in deps)
+
+    def _isPending(self, deps) -> bool:
+        return self._refreshPending is not None and self._refreshPending(deps)
+
+    def serveStaleWhile(self, pending):
+        """
+        `pending(deps)` diz se uma reconstrução em segundo plano já vai cuidar
+        de `deps`: enquanto for True, entradas desatualizadas são servidas.
+        """
+        self._refreshPending = pending
+
+    @contextmanager
+    def refreshing(self, names):
+        """
+        Reconstrói, na thread atual, as entradas que dependem de `names`.
+
+        Tudo o que for montado dentro do bloco (warm, getDerived) fica numa
+        área à parte e é publicado de uma vez na saída sem erro. Até lá, as
+        outras threads recebem a versão anterior dessas entradas em vez de
+        esperar pela carga.
+        """
+        names = list(names)
+        with self._refreshGuard:
+            for name in names:
+                self._refreshing[name] = self._refreshing.get(name, 0) + 1
+        self._staging.entries = {}
+        try:
+            yield
+            # tamanhos medidos fora do lock do cache
+            entries = [(key, entry, sizeOf(entry[2])) for key, entry in self._staging.entries.items()]
+            self._cache.putMany(entries)
+        finally:
+            self._staging.entries = None
+            with self._refreshGuard:
+                for name in names:
+                    self._refreshing[name] -= 1
+
+    def getState(self, key, factory):
+        """
+        Objeto persistente do processo (ex.: snapshots incrementais).
+
+        Ao contrário de `getDerived`, não é descartado quando os arquivos mudam:
+        o próprio objeto decide como se atualizar com os dados novos.
+        """
+        with self._locksGuard:
+            if key not in self._state:
+                self._state[key] = factory()
+            return self._state[key]
+
+    def registerAppend(self, prefix: tuple, updater):
+        """
+        Registra como atualizar as entradas cuja chave começa com `prefix`
+        quando linhas novas são acrescentadas a um dataset (applyAppend).
+
+        `updater(valor, name, linhas)` devolve o novo valor sem modificar o
+        antigo (que ainda pode estar em uso), ou None para descartá-lo.
+        """
+        self._appenders[tuple(prefix)] = updater
+
+    def _appenderFor(self, key):
+        if not isinstance(key, tuple):
+            return None
+        for size in range(len(key), 0, -1):
+            updater = self._appenders.get(key[:size])
+            if updater is not None:
+                return updater
+        return None
+
+    def applyAppend(self, name: str, previousVersion, rows: pd.DataFrame) -> dict:
+        """
+        Leva ao cache as linhas `rows` acrescentadas a `name`.
+
+        Entradas calculadas sobre `previousVersion` e com updater registrado
+        recebem só as linhas novas e passam a valer para a versão atual; as
+        demais que dependem de `name` são descartadas e refeitas sob demanda.
+        Retorna {"atualizadas": n, "descartadas": n}.
+        """
+        currentVersion = self.version(name)
+        counts = {"atualizadas": 0, "descartadas": 0}
+        for key in self._cache.keys():
+            cached = self._cache.get(key)
+            if cached is None or name not in cached[0]:
+                continue
+            updater = self._appenderFor(key)
+            with self._keyLock(key):
+                cached = self._cache.get(key)
+                if cached is None:
+                    continue
+                deps, versions, value = cached
+                position = deps.index(name)
+                newValue = None
+                # só entradas exatamente na versão anterior ao append podem ser estendidas
+                if updater is not None and versions[position] == previousVersion:
+                    newValue = updater(value, name, rows)
+                if newValue is None:
+                    self._cache.pop(key)
+                    counts["descartadas"] += 1
+                    continue
+                versions = versions[:position] + (currentVersion,) + versions[position + 1:]
+                self._cache.put(key, (deps, versions, newValue), sizeOf(newValue))
+                counts["atualizadas"] += 1
+        return counts
+
+    def invalidate(self, name: str = None):
+        """Descarta as entradas que dependem de `name` (ou todas)."""
+        if name is None:
+            self._cache.clear()
+            self._state.clear()
+            return
+        for key in self._cache.keys():
+            cached = self._cache.get(key)
+            if cached is not None and name in cached[0]:
+                self._cache.pop(key)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._cache),
+            "bytes": self._cache.totalBytes,
+            "maxBytes": self._cache.maxBytes,
+        }
+
+
+store = DataStore(maxBytes=int(os.environ.get("FCD_STORE_MAX_MB", "1024")) * 1024 * 1024)
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from models.dataStore import store
+
+
+class Dimension:
+    """
+    Tabela de dimensão (ex.: produtos) indexada pela chave.
+
+    As tabelas de fatos (vendas, compras) guardam só a chave; os atributos
+    são buscados aqui sob demanda, para as linhas que vão ser exibidas ou
+    agregadas, em vez de repetidos em cada linha por um merge. Chaves
+    repetidas na dimensão valem pela primeira ocorrência.
+    """
+
+    def __init__(self, table: pd.DataFrame, key: str):
+        self.key = key
+        if table.empty or key not in table.columns:
+            table = pd.DataFrame({key: pd.Series(dtype="int64")})
+        self.table = table.drop_duplicates(key).reset_index(drop=True)
+        self._index = pd.Index(self.table[key])
+
+    @property
+    def columns(self) -> list:
+        return [c for c in self.table.columns if c != self.key]
+
+    def positions(self, keys) -> np.ndarray:
+        """Linha da dimensão de cada chave (-1 quando a chave não existe)."""
+        return self._index.get_indexer(pd.Index(keys))
+
+    def lookup(self, keys: pd.Series, cols) -> pd.DataFrame:
+        """Atributos `cols` alinhados com `keys` (NaN para chaves sem cadastro)."""
+        cols = [c for c in cols if c in self.table.columns]
+        # posição -1 não existe no RangeIndex: o reindex devolve NaN nessas linhas
+        out = self.table[cols].reindex(self.positions(keys))
+        out.index = keys.index
+        return out
+
+    def categorical(self, keys: pd.Series, col: str) -> pd.Series:
+        """
+        Atributo `col` como categoria alinhada com `keys`.
+
+        Só os códigos inteiros são gerados por linha; os valores de texto
+        existem uma vez, nas categorias.
+        """
+        if col not in self.table.columns:
+            return pd.Series(pd.Categorical([np.nan] * len(keys)), index=keys.index, name=col)
+        values = self.table[col].astype("category")
+        codes = values.cat.codes.to_numpy()
+        pos = self.positions(keys)
+        rowCodes = np.where(pos >= 0, codes[pos], -1) if len(codes) else np.full(len(pos), -1)
+        return pd.Series(
+            pd.Categorical.from_codes(rowCodes, dtype=values.dtype), index=keys.index, name=col
+        )
+
+    def attach(self, facts: pd.DataFrame, keyCol: str, cols, rename: dict = None) -> pd.DataFrame:
+        """Cópia rasa de `facts` com os atributos `cols` (que ainda não estão lá) acrescentados."""
+        rename = rename or {}
+        missing = [c for c in cols if rename.get(c, c) not in facts.columns and c in self.table.columns]
+        if not missing or keyCol not in facts.columns:
+            return facts
+        attrs = self.lookup(facts[keyCol], missing).rename(columns=rename)
+        return pd.concat([facts, attrs], axis=1)
+
+    def rowBytes(self, cols, categorical: bool = False) -> float:
+        """Bytes por linha de fato que um merge de `cols` acrescentaria (média da dimensão)."""
+        cols = [c for c in cols if c in self.table.columns]
+        if not cols or self.table.empty:
+            return 0.0
+        if categorical:
+            return float(sum(self.table[c].astype("category").cat.codes.dtype.itemsize for c in cols))
+        return self.table[cols].memory_usage(index=False, deep=True).sum() / len(self.table)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.table.memory_usage(index=True, deep=True).sum())
+
+
+def productDimension() -> Dimension:
+    """Dimensão de produtos (chave produto_id), uma por versão de produtos.csv."""
+    return store.getDerived(
+        ("dimension", "produtos"), ("produtos",), lambda: Dimension(store.get("produtos"), "produto_id")
+    )
@@ -0,0 +1,41 @@
+import threading
+import weakref
+
+# Etiquetas presas à identidade de um objeto.
+#
+# `df.attrs` é copiado pelo pandas para qualquer frame derivado (assign,
+# reindex, sort_values, ...), então uma etiqueta guardada ali acompanha
+# frames com outros valores. Aqui a etiqueta vale só para o objeto exato
+# que a recebeu (id + weakref) e some quando ele é coletado.
+
+
+class IdentityTags:
+    def __init__(self):
+        self._tags = {}  # id(obj) -> (weakref, etiqueta)
+        # reentrante: o callback do weakref pode rodar durante um set()
+        self._lock = threading.RLock()
+
+    def set(self, obj, value):
+        """Etiqueta `obj` com `value`; retorna `obj`."""
+        key = id(obj)
+
+        def _drop(ref, key=key):
+            with self._lock:
+                entry = self._tags.get(key)
+                if entry is not None and entry[0] is ref:
+                    del self._tags[key]
+
+        with self._lock:
+            self._tags[key] = (weakref.ref(obj, _drop), value)
+        return obj
+
+    def get(self, obj, default=None):
+        """Etiqueta de `obj` (o mesmo objeto, não uma cópia), ou `default`."""
+        with self._lock:
+            entry = self._tags.get(id(obj))
+        if entry is None or entry[0]() is not obj:
+            return default
+        return entry[1]
+
+    def __len__(self) -> int:
+        return len(self._tags)
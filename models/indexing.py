@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+
+def validSortedDates(dates: pd.Series) -> np.ndarray:
+    """
+    Datas de uma coluna já ordenada (NaT no final), sem os NaT.
+
+    É o array usado nas buscas binárias de `dateRange`.
+    """
+    return dates.values[: int(dates.notna().sum())]
+
+
+def dateRange(sortedDates: np.ndarray, total: int, start=None, end=None) -> tuple:
+    """
+    Intervalo [lo, hi) de linhas com start <= data <= end via busca binária.
+
+    `sortedDates` vem de `validSortedDates`; `total` é o número de linhas do
+    DataFrame (incluindo as com data nula, que só saem quando há filtro).
+    """
+    lo, hi = 0, total
+    if start or end:
+        hi = len(sortedDates)
+    if start:
+        lo = int(np.searchsorted(sortedDates, np.datetime64(pd.Timestamp(start)), side="left"))
+    if end:
+        hi = int(np.searchsorted(sortedDates, np.datetime64(pd.Timestamp(end)), side="right"))
+    return lo, max(lo, hi)
+
+
+def categoryMask(col: pd.Series, values) -> np.ndarray:
+    """Máscara de pertinência usando os códigos inteiros de uma coluna categórica."""
+    wanted = col.cat.categories.get_indexer(list(values))
+    return np.isin(col.cat.codes.values, wanted[wanted >= 0])
+
+
+def membershipFilter(df: pd.DataFrame, filters) -> pd.DataFrame:
+    """
+    Aplica filtros de pertinência [(coluna, valores), ...] numa só máscara.
+
+    Filtros vazios são ignorados; sem filtros ativos o próprio `df` é devolvido.
+    """
+    mask = None
+    for col, values in filters:
+        if not values:
+            continue
+        colMask = categoryMask(df[col], values)
+        mask = colMask if mask is None else mask & colMask
+    return df if mask is None else df[mask]
+
+
+def extendFrame(old: pd.DataFrame, new: pd.DataFrame, categoricalCols=(), dateCol: str = None) -> pd.DataFrame:
+    """
+    `old` com as linhas de `new` acrescentadas, sem alterar `old`.
+
+    Colunas categóricas ganham só as categorias novas (os códigos de `old`
+    só são remapeados quando aparece um valor novo). Com `dateCol`, a ordem
+    por data (NaT no fim) de `old` é mantida e as linhas de `new` entram
+    depois das de mesma data, como numa ordenação estável do conjunto.
+    """
+    if old.empty:
+        return new.reset_index(drop=True)
+    if new.empty:
+        return old
+    old = old.copy(deep=False)
+    new = new.copy()
+    for c in categoricalCols:
+        if c not in old.columns or c not in new.columns or not isinstance(old[c].dtype, pd.CategoricalDtype):
+            continue
+        values = new[c].astype(object) if isinstance(new[c].dtype, pd.CategoricalDtype) else new[c]
+        categories = old[c].cat.categories
+        extra = pd.Index(values.dropna().unique()).difference(categories)
+        if len(extra):
+            # mantém as categorias ordenadas, como num astype("category") do histórico inteiro
+            merged = categories.append(extra)
+            old[c] = old[c].cat.set_categories(merged.sort_values() if categories.is_monotonic_increasing else merged)
+        new[c] = pd.Categorical(values, dtype=old[c].dtype)
+
+    if not dateCol or dateCol not in old.columns:
+        return pd.concat([old, new], ignore_index=True)
+
+    # `old` já está ordenado (NaT no fim): cada linha nova é intercalada na
+    # posição dada pela busca binária, sem reordenar o histórico inteiro
+    new = new.sort_values(dateCol, kind="mergesort", na_position="last")
+    oldDates = validSortedDates(old[dateCol])
+    newDates = new[dateCol]
+    pos = np.searchsorted(oldDates, newDates.to_numpy(), side="right")
+    pos[newDates.isna().to_numpy()] = len(old)
+    out = pd.concat([old, new], ignore_index=True)
+    if (pos == len(old)).all():
+        return out
+    newIdx = pos + np.arange(len(new))
+    order = np.empty(len(out), dtype=np.int64)
+    isOld = np.ones(len(out), dtype=bool)
+    isOld[newIdx] = False
+    order[isOld] = np.arange(len(old))
+    order[newIdx] = len(old) + np.arange(len(new))
+    return out.take(order).reset_index(drop=True)
@@ -0,0 +1,220 @@
+import io
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from models import compact, dataModel, sqlBackend
+from models.dataStore import store
+from models.indexing import extendFrame
+from models.instrumentation import traced
+from models.schemas import applySchema, normalizeColumns, readDtypes, schemaFor
+from models.uploadPipeline import UploadError
+
+# Ingestão incremental (só acréscimo) de compras e vendas.
+#
+# Cada lote é validado, deduplicado pela chave do schema (compra_id /
+# venda_id) e gravado como CSVs imutáveis em data/<dataset>/mes=AAAA-MM/,
+# ao lado do arquivo principal, que não é reescrito. Os loaders leem arquivo
+# + lotes; neste processo, as entradas do cache compartilhado que sabem se
+# estender (store.registerAppend) recebem só as linhas novas em vez de serem
+# refeitas. A marca d'água (maior data e maior chave já ingeridas) fica em
+# data/<dataset>/_watermark.json para os feeds saberem de onde continuar.
+
+appendable = ("compras", "vendas")
+watermarkFile = "_watermark.json"
+
+# um lote por vez: a deduplicação precisa ver os lotes anteriores já gravados
+_appendLock = threading.Lock()
+
+
+def _dateCol(name: str) -> str:
+    return next(iter(schemaFor(name)["dates"]))
+
+
+def _readBatch(batch, name: str) -> pd.DataFrame:
+    # DataFrame, caminho ou arquivo enviado (bytes): tudo vira linhas tipadas pelo schema
+    if isinstance(batch, pd.DataFrame):
+        df = batch.copy()
+        # datas já convertidas voltam a texto para passar pelo mesmo parse do loader
+        for col, fmt in schemaFor(name)["dates"].items():
+            if col in df.columns and pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = df[col].dt.strftime(fmt)
+    else:
+        if hasattr(batch, "seek"):
+            batch.seek(0)
+        if hasattr(batch, "read") and not isinstance(batch, io.TextIOBase):
+            batch = io.TextIOWrapper(batch, encoding="utf-8-sig", newline="")
+        try:
+            # sep=None: vírgula ou tab, como nos CSVs do diretório data/
+            df = pd.read_csv(batch, sep=None, engine="python", dtype=readDtypes(name))
+        except pd.errors.EmptyDataError:
+            df = pd.DataFrame()
+        finally:
+            if isinstance(batch, io.TextIOWrapper):
+                batch.detach()
+    df = normalizeColumns(df, name)
+    return applySchema(df, name)
+
+
+def _sortedIds(df: pd.DataFrame, key: str) -> np.ndarray:
+    if df.empty or key not in df.columns:
+        return np.array([], dtype="int64")
+    ids = np.sort(df[key].dropna().to_numpy())
+    return ids[np.r_[True, ids[1:] != ids[:-1]]] if len(ids) else ids
+
+
+def _knownIds(name: str, key: str) -> np.ndarray:
+    # chaves já ingeridas, ordenadas (busca binária por lote em vez de isin no histórico)
+    return store.getDerived(("ingest", "ids", name), (name,), lambda: _sortedIds(store.get(name), key))
+
+
+def _isKnown(ids: np.ndarray, known: np.ndarray) -> np.ndarray:
+    if not len(known):
+        return np.zeros(len(ids), dtype=bool)
+    pos = np.searchsorted(known, ids).clip(max=len(known) - 1)
+    return known[pos] == ids
+
+
+def _writePartitions(name: str, rows: pd.DataFrame, dateCol: str) -> list:
+    """Grava `rows` em um CSV por mês; cada arquivo aparece de uma vez (os.replace)."""
+    root = dataModel.partitionRoot(name)
+    # instante + pid no nome: ordena os lotes e evita colisão entre processos
+    fileName = f"lote-{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}-{os.getpid()}.csv"
+    formats = schemaFor(name)["dates"]
+    written = []
+    for month, part in rows.groupby(rows[dateCol].dt.strftime("%Y-%m"), sort=True):
+        target = root / f"mes={month}" / fileName
+        target.parent.mkdir(parents=True, exist_ok=True)
+        out = part.copy()
+        for col, fmt in formats.items():
+            if col in out.columns:
+                out[col] = out[col].dt.strftime(fmt)
+        tmp = target.with_name(f".{target.name}.tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            out.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+        written.append(target)
+    return written
+
+
+def watermark(name: str) -> dict:
+    """
+    Marca d'água de `name`: maior data e maior chave já ingeridas, número
+    de lotes e de linhas acrescentadas. Sem lotes, vem do arquivo principal.
+    """
+    path = dataModel.partitionRoot(name) / watermarkFile
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    df = store.get(name)
+    key, dateCol = schemaFor(name)["key"], _dateCol(name)
+    return {
+        "ultimaData": _isoDate(df[dateCol].max()) if dateCol in df.columns else None,
+        "ultimaChave": _scalar(df[key].max()) if key in df.columns else None,
+        "lotes": 0,
+        "linhas": 0,
+    }
+
+
+def _isoDate(value):
+    return None if pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _scalar(value):
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def _updateWatermark(name: str, rows: pd.DataFrame, key: str, dateCol: str) -> dict:
+    mark = watermark(name)
+    dates = [d for d in (mark["ultimaData"], _isoDate(rows[dateCol].max())) if d]
+    keys = [k for k in (mark["ultimaChave"], _scalar(rows[key].max())) if k is not None]
+    mark = {
+        "ultimaData": max(dates) if dates else None,
+        "ultimaChave": max(keys) if keys else None,
+        "lotes": mark["lotes"] + 1,
+        "linhas": mark["linhas"] + len(rows),
+    }
+    path = dataModel.partitionRoot(name) / watermarkFile
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(mark, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    return mark
+
+
+@traced("ingest.appendBatch")
+def appendBatch(name: str, batch) -> dict:
+    """
+    Acrescenta um lote de `name` ("compras" ou "vendas") sem reescrever o histórico.
+
+    `batch` pode ser um DataFrame, um caminho ou um arquivo CSV. Linhas sem
+    chave ou sem data são recusadas; chaves repetidas no lote ou já
+    ingeridas são ignoradas. Retorna as contagens (recebidas, novas,
+    duplicadas, invalidas), os arquivos gravados e a nova marca d'água.
+    Levanta UploadError se faltarem colunas obrigatórias ou a chave.
+    """
+    if name not in appendable:
+        raise UploadError(f"{name} não aceita lotes incrementais.")
+    schema = schemaFor(name)
+    key, dateCol = schema["key"], _dateCol(name)
+    rows = _readBatch(batch, name)
+
+    missing = [c for c in schema.get("required", []) + [key] if c not in rows.columns]
+    if missing:
+        raise UploadError(f"Lote de {name} sem as colunas obrigatórias: {', '.join(missing)}")
+
+    received = len(rows)
+    valid = rows[key].notna() & rows[dateCol].notna()
+    rows = rows[valid]
+    result = {
+        "recebidas": received, "novas": 0, "duplicadas": 0, "invalidas": int((~valid).sum()),
+        "particoes": [], "cache": {"atualizadas": 0, "descartadas": 0},
+    }
+
+    with _appendLock:
+        repeated = rows[key].duplicated(keep="first").to_numpy() | _isKnown(rows[key].to_numpy(), _knownIds(name, key))
+        result["duplicadas"] = int(repeated.sum())
+        rows = rows[~repeated]
+        if rows.empty:
+            result["marca"] = watermark(name)
+            return result
+
+        # mesma ordem de colunas do histórico: o lote relido tem o formato do loader
+        current = store.get(name)
+        columns = list(current.columns) + [c for c in rows.columns if c not in current.columns]
+        rows = rows.reindex(columns=columns)
+
+        previousVersion = dataModel.datasetVersion(name)
+        written = _writePartitions(name, rows, dateCol)
+        # relidas pelo mesmo caminho do loader (e já deixam o cache Arrow pronto)
+        stored = dataModel.readPartitions(name, written)
+
+        result["cache"] = store.applyAppend(name, previousVersion, stored)
+        if sqlBackend.enabled():
+            sqlBackend.appendRows(name, stored, previousVersion)
+        result["novas"] = len(stored)
+        result["particoes"] = [str(p) for p in written]
+        result["marca"] = _updateWatermark(name, stored, key, dateCol)
+    return result
+
+
+def _appendDataset(value, name, rows):
+    # no modo compacto, o lote entra com as mesmas categorias e inteiros do histórico
+    categorical = [c for c in value.columns if isinstance(value[c].dtype, pd.CategoricalDtype)]
+    return extendFrame(value, compact.conform(rows, value), categoricalCols=categorical)
+
+
+def _appendIds(value, name, rows):
+    # as chaves do lote já foram deduplicadas contra `value`: basta intercalar
+    new = _sortedIds(rows, schemaFor(name)["key"])
+    return np.insert(value, np.searchsorted(value, new), new)
+
+
+store.registerAppend(("dataset",), _appendDataset)
+store.registerAppend(("ingest", "ids"), _appendIds)
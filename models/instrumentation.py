@@ -0,0 +1,189 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Medição dos caminhos quentes (loaders, controllers e renderização).
+#
+# `traced` (decorator) e `span` (context manager) registram tempo de parede,
+# linhas de entrada/saída e variação de memória residente de cada chamada.
+# Desligado (padrão), o custo é um teste de booleano por chamada. Liga com
+# FCD_PROFILE=1 ou pelo painel "Performance" da barra lateral; a flag vale
+# para o processo inteiro, como o cache compartilhado.
+
+_enabled = os.environ.get("FCD_PROFILE", "0") == "1"
+# só os eventos mais recentes ficam em memória
+maxEvents = int(os.environ.get("FCD_PROFILE_MAX_EVENTS", "20000"))
+_events = deque(maxlen=maxEvents)
+_lock = threading.Lock()
+_local = threading.local()
+_origin = time.perf_counter_ns()
+_pageSize = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def isEnabled() -> bool:
+    return _enabled
+
+
+def setEnabled(value: bool):
+    global _enabled
+    _enabled = bool(value)
+
+
+def _rss():
+    # memória residente atual (Linux); None onde /proc não existe
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _pageSize
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, tuple):
+        for v in value:
+            if isinstance(v, (pd.DataFrame, pd.Series)):
+                return len(v)
+    return None
+
+
+def _rowsIn(args, kwargs):
+    # primeiro DataFrame entre os argumentos (ex.: o df de get_monthly_volume)
+    for v in list(args) + list(kwargs.values()):
+        if isinstance(v, (pd.DataFrame, pd.Series)):
+            return len(v)
+    return None
+
+
+class _Span:
+    __slots__ = ("name", "rowsIn", "rowsOut", "start", "rssStart", "depth")
+
+    def __init__(self, name, rowsIn=None):
+        self.name = name
+        self.rowsIn = rowsIn
+        self.rowsOut = None
+
+    def __enter__(self):
+        self.depth = getattr(_local, "depth", 0)
+        _local.depth = self.depth + 1
+        self.rssStart = _rss()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        rssEnd = _rss()
+        _local.depth = self.depth
+        event = {
+            "name": self.name,
+            "start": (self.start - _origin) / 1e9,
+            "seconds": (end - self.start) / 1e9,
+            "rowsIn": self.rowsIn,
+            "rowsOut": self.rowsOut,
+            "memDelta": rssEnd - self.rssStart if rssEnd is not None and self.rssStart is not None else None,
+            "depth": self.depth,
+            "thread": threading.get_ident(),
+            "error": exc[0].__name__ if exc[0] else None,
+        }
+        with _lock:
+            _events.append(event)
+        return False
+
+
+class _NoSpan:
+    # usado quando a medição está desligada
+    rowsIn = rowsOut = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_noSpan = _NoSpan()
+
+
+def span(name: str, rowsIn: int = None):
+    """
+    Mede um bloco. `rowsOut` pode ser preenchido dentro do bloco:
+
+        with span("render.tabela") as s:
+            s.rowsOut = len(df)
+    """
+    return _Span(name, rowsIn) if _enabled else _noSpan
+
+
+def traced(name: str = None):
+    """Decorator que mede cada chamada da função (nome padrão: Classe.método)."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label, _rowsIn(args, kwargs)) as s:
+                result = fn(*args, **kwargs)
+                s.rowsOut = _rows(result)
+            return result
+        return wrapper
+    return decorate
+
+
+def events() -> list:
+    with _lock:
+        return list(_events)
+
+
+def clear():
+    with _lock:
+        _events.clear()
+
+
+def summary() -> pd.DataFrame:
+    """Tempo total/médio/máximo e linhas por nome de evento, do mais caro ao mais barato."""
+    df = pd.DataFrame(events())
+    if df.empty:
+        return pd.DataFrame(columns=["name", "calls", "totalSeconds", "meanSeconds",
+                                     "maxSeconds", "rowsIn", "rowsOut", "memDeltaMB"])
+    df["memDeltaMB"] = df["memDelta"].astype("float64") / 1024 / 1024
+    out = df.groupby("name").agg(
+        calls=("seconds", "size"),
+        totalSeconds=("seconds", "sum"),
+        meanSeconds=("seconds", "mean"),
+        maxSeconds=("seconds", "max"),
+        rowsIn=("rowsIn", "max"),
+        rowsOut=("rowsOut", "max"),
+        memDeltaMB=("memDeltaMB", "sum"),
+    )
+    return out.sort_values("totalSeconds", ascending=False).reset_index()
+
+
+def toJson() -> str:
+    return json.dumps({"events": events()}, indent=2)
+
+
+def toChromeTrace() -> str:
+    """Eventos no formato Trace Event (chrome://tracing, Perfetto)."""
+    pid = os.getpid()
+    trace = [
+        {
+            "name": e["name"],
+            "ph": "X",
+            "ts": e["start"] * 1e6,
+            "dur": e["seconds"] * 1e6,
+            "pid": pid,
+            "tid": e["thread"],
+            "args": {k: e[k] for k in ("rowsIn", "rowsOut", "memDelta", "error") if e[k] is not None},
+        }
+        for e in events()
+    ]
+    return json.dumps({"traceEvents": trace, "displayTimeUnit": "ms"})
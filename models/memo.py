@@ -0,0 +1,129 @@
+import datetime
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from models.dataStore import ByteBoundedLRU, store
+from models.identityTags import IdentityTags
+
+# Memo dos filtros e agregações dos controllers, compartilhado por todas as
+# sessões do processo.
+#
+# Cada resultado é guardado por (método, versões dos datasets, filtro
+# normalizado), num LRU limitado em bytes (FCD_MEMO_MAX_MB, padrão 256). Os
+# recortes devolvidos pelos filtros ficam registrados (pela identidade do
+# objeto, não em `attrs`, que o pandas copia para frames derivados) com a
+# etiqueta do filtro que os gerou; as agregações sobre esse mesmo objeto usam
+# a etiqueta como chave, então a mesma combinação de filtros vista por outro
+# usuário sai direto do memo. Um frame derivado (assign, reindex, ...) não
+# tem etiqueta e é agregado na hora. Os resultados são compartilhados: não
+# devem ser modificados.
+
+maxBytes = int(os.environ.get("FCD_MEMO_MAX_MB", "256")) * 1024 * 1024
+
+_cache = ByteBoundedLRU(maxBytes)
+_counts = {}  # método -> [acertos, faltas]
+_countsLock = threading.Lock()
+# recorte -> (versões, filtro) que o gerou
+_tags = IdentityTags()
+_missing = object()
+
+
+def normalize(value):
+    """Forma canônica (hashable) de um valor de filtro: listas viram tuplas ordenadas."""
+    if value is None:
+        return None
+    if isinstance(value, (list, set, frozenset, np.ndarray, pd.Index, pd.Series)):
+        # seleção de filtro: a ordem não importa e vazia equivale a nenhuma
+        items = [normalize(v) for v in value]
+        if not items:
+            return None
+        try:
+            return tuple(sorted(items))
+        except TypeError:
+            return tuple(sorted(items, key=repr))
+    if isinstance(value, tuple):
+        return tuple(normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize(v)) for k, v in value.items()))
+    if isinstance(value, (pd.Timestamp, datetime.date, np.datetime64)):
+        value = pd.Timestamp(value)
+        return None if pd.isna(value) else value
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def currentVersions(deps) -> tuple:
+    """Versões atuais dos arquivos de `deps` (quando os dados são lidos na hora, ex.: SQL)."""
+    return tuple(store.version(d) for d in deps)
+
+
+def _count(method: str, hit: bool):
+    with _countsLock:
+        counts = _counts.setdefault(method, [0, 0])
+        counts[0 if hit else 1] += 1
+
+
+def tag(df: pd.DataFrame, versions: tuple, key) -> pd.DataFrame:
+    """Registra `df` (este objeto) como o recorte `key` dos dados nas versões `versions`."""
+    return _tags.set(df, (versions, key))
+
+
+def keyOf(df: pd.DataFrame):
+    """(versões, recorte) de `df`, se ele é o próprio resultado registrado."""
+    return _tags.get(df)
+
+
+def _lookup(method: str, fullKey, compute):
+    value = _cache.get(fullKey, _missing)
+    if value is not _missing:
+        _count(method, True)
+        return value
+    _count(method, False)
+    value = compute()
+    _cache.put(fullKey, value)
+    return value
+
+
+def filtered(method: str, versions: tuple, filters, compute) -> pd.DataFrame:
+    """
+    Recorte memoizado: `compute()` só roda para uma combinação nova de
+    (`versions` dos dados usados por ele, `filters`) e o resultado sai
+    etiquetado para as agregações.
+    """
+    if versions is None:
+        # dados ainda não carregados: sem versão não há como reaproveitar
+        return compute()
+    key = (method, normalize(filters))
+    return _lookup(method, (method, versions, key), lambda: tag(compute(), versions, key))
+
+
+def aggregated(method: str, df: pd.DataFrame, params, compute):
+    """
+    Agregação memoizada sobre o recorte `df`. Sem etiqueta (recorte montado
+    fora dos controllers ou derivado de um resultado), calcula direto.
+    """
+    source = keyOf(df)
+    if source is None:
+        return compute()
+    return _lookup(method, (method, source, normalize(params)), compute)
+
+
+def stats() -> dict:
+    with _countsLock:
+        hits = sum(c[0] for c in _counts.values())
+        misses = sum(c[1] for c in _counts.values())
+        perMethod = {m: {"acertos": c[0], "faltas": c[1]} for m, c in _counts.items()}
+    return {
+        "acertos": hits, "faltas": misses, "entradas": len(_cache),
+        "bytes": _cache.totalBytes, "maxBytes": _cache.maxBytes, "metodos": perMethod,
+    }
+
+
+def clear():
+    _cache.clear()
+    with _countsLock:
+        _counts.clear()
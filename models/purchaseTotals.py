@@ -0,0 +1,105 @@
+import pandas as pd
+
+from models.timeSeries import TimeSeriesEngine
+
+
+def accumulate(total, partial):
+    """Soma agregados parciais alinhando pelos grupos."""
+    if total is None:
+        return partial
+    out = total.add(partial, fill_value=0)
+    # o alinhamento com fill_value promove inteiros a float; volta ao tipo original
+    return out.astype({c: dt for c, dt in partial.dtypes.items() if dt.kind in "iu"})
+
+
+class PurchaseTotals:
+    """
+    Agregados de compras que se atualizam por lote.
+
+    Guarda só somas e contagens (por dia, por fornecedor e por produto), que
+    podem ser combinadas: `fold` de um bloco novo custa o tamanho do bloco,
+    não do histórico. Usado na leitura em blocos (models/streaming.py) e na
+    ingestão incremental (models/ingestion.py). `fold` substitui os
+    atributos em vez de alterá-los, então uma cópia rasa pode ser atualizada
+    sem afetar quem ainda lê a versão anterior.
+    """
+
+    supplierCols = ["fornecedor", "valor_unitario", "prazo_entrega_dias", "valor_total"]
+
+    def __init__(self):
+        self.daily = None
+        self.suppliers = None
+        self.products = None
+        self.hasSupplierCols = True
+
+    def fold(self, chunk: pd.DataFrame) -> "PurchaseTotals":
+        if chunk.empty:
+            return self
+        if "data_compra" in chunk.columns:
+            partial = chunk.groupby(chunk["data_compra"].dt.normalize())[["valor_total"]].sum()
+            self.daily = accumulate(self.daily, partial)
+        if all(c in chunk.columns for c in self.supplierCols):
+            # médias viram soma + contagem para poderem ser combinadas entre blocos
+            partial = chunk.groupby("fornecedor", observed=True).agg(
+                somaPreco=("valor_unitario", "sum"),
+                nPreco=("valor_unitario", "count"),
+                somaPrazo=("prazo_entrega_dias", "sum"),
+                nPrazo=("prazo_entrega_dias", "count"),
+                gasto_total=("valor_total", "sum"),
+            )
+            partial.index = partial.index.astype(object)
+            self.suppliers = accumulate(self.suppliers, partial)
+        else:
+            self.hasSupplierCols = False
+        if "valor_total" in chunk.columns:
+            partial = chunk.groupby("produto_id")[["valor_total"]].sum()
+            self.products = accumulate(self.products, partial)
+        return self
+
+    def merge(self, other: "PurchaseTotals") -> "PurchaseTotals":
+        """Soma os agregados de `other` (ex.: calculados sobre outra partição de datas)."""
+        self.daily = accumulate(self.daily, other.daily) if other.daily is not None else self.daily
+        self.suppliers = accumulate(self.suppliers, other.suppliers) if other.suppliers is not None else self.suppliers
+        self.products = accumulate(self.products, other.products) if other.products is not None else self.products
+        self.hasSupplierCols = self.hasSupplierCols and other.hasSupplierCols
+        return self
+
+    def monthlyVolume(self) -> pd.DataFrame:
+        """Mesmo formato de PurchasesController.get_monthly_volume."""
+        if self.daily is None:
+            return pd.DataFrame()
+        return TimeSeriesEngine(self.daily.sort_index(), "data_compra", ["valor_total"]).view("M")
+
+    def supplierComparative(self) -> pd.DataFrame:
+        """Mesmo formato de PurchasesController.get_supplier_comparative."""
+        if self.suppliers is None or not self.hasSupplierCols:
+            return pd.DataFrame()
+        total = self.suppliers.sort_index()
+        comp = pd.DataFrame({
+            "preco_medio": total["somaPreco"] / total["nPreco"],
+            "prazo_medio": total["somaPrazo"] / total["nPrazo"],
+            "gasto_total": total["gasto_total"],
+        })
+        return comp.rename_axis("fornecedor").reset_index()
+
+    def topProducts(self, names: pd.Series, top: int = 10) -> pd.DataFrame:
+        """Mesmo formato de get_top_products_by_spend; `names` mapeia produto_id -> nome."""
+        if self.products is None:
+            return pd.DataFrame()
+        total = self.products.copy()
+        # nomes resolvidos só no fim; ids sem cadastro ficam de fora, como no merge
+        total["produto_nome"] = total.index.map(names)
+        top_df = (
+            total.dropna(subset=["produto_nome"])
+            .groupby("produto_nome")
+            .agg({"valor_total": "sum"})
+            .reset_index()
+            .sort_values("valor_total", ascending=False)
+            .head(top)
+        )
+        return top_df.rename(columns={"valor_total": "gasto_total"})
+
+    @property
+    def nbytes(self) -> int:
+        parts = [p for p in (self.daily, self.suppliers, self.products) if p is not None]
+        return int(sum(p.memory_usage(index=True, deep=True).sum() for p in parts))
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+from models import dataModel, sqlBackend
+from models.dataStore import store
+from models.instrumentation import span
+
+# Atualização em segundo plano dos dados dos dashboards.
+#
+# Uma thread daemon confere a versão (mtime/tamanho, lotes incluídos) de cada
+# arquivo em data/ a cada FCD_REFRESH_SECONDS segundos (padrão 2; 0 desliga).
+# Quando algum muda, ela recarrega os datasets e refaz as visões registradas
+# (registerWarmup) dentro de store.refreshing(): as páginas continuam vendo a
+# última versão completa até a nova ser publicada de uma vez, e nenhum request
+# paga a carga. No backend SQL a reimportação também roda nesta thread.
+
+interval = float(os.environ.get("FCD_REFRESH_SECONDS", "2"))
+
+# (datasets de que depende, função que monta a visão pelo cache compartilhado)
+_warmups = []
+_startLock = threading.Lock()
+_thread = None
+_wake = threading.Event()
+# versões já reconstruídas (ou que falharam): o que difere daqui está pendente
+_seen = None
+_status = {"ultimaAtualizacao": None, "datasets": [], "emAndamento": False, "erro": None}
+
+
+def registerWarmup(deps: tuple, warm):
+    """Registra `warm()`, refeita em segundo plano quando algum dataset de `deps` muda."""
+    _warmups.append((tuple(deps), warm))
+
+
+def _versions() -> dict:
+    return {name: dataModel.datasetVersion(name) for name in dataModel.loaders}
+
+
+def refresh(names):
+    """Recarrega `names` e refaz as visões que dependem deles, publicando tudo junto."""
+    names = list(names)
+    _status["emAndamento"] = True
+    try:
+        erros = []
+        with span("refresh.background"), store.refreshing(names):
+            if not sqlBackend.enabled():
+                store.warm(names)
+            for deps, warm in _warmups:
+                if not set(deps) & set(names):
+                    continue
+                # uma visão com erro não descarta os dados recarregados nem as outras visões
+                try:
+                    warm()
+                except Exception as e:
+                    erros.append(f"{getattr(warm, '__name__', warm)}: {e}")
+                    print(f"❌ Erro ao refazer a visão {erros[-1]}")
+        _status.update(ultimaAtualizacao=time.time(), datasets=names, erro="; ".join(erros) or None)
+    finally:
+        _status["emAndamento"] = False
+
+
+def _pending(deps) -> bool:
+    # arquivo mudou e a thread ainda não publicou a versão nova: serve a anterior
+    seen = _seen
+    if seen is None or not running():
+        return False
+    stale = any(seen.get(d) != dataModel.datasetVersion(d) for d in deps)
+    if stale:
+        _wake.set()
+    return stale
+
+
+def _run():
+    global _seen
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        current = _versions()
+        changed = [name for name, version in current.items() if version != _seen.get(name)]
+        if not changed:
+            continue
+        try:
+            refresh(changed)
+        except Exception as e:
+            _status["erro"] = str(e)
+            print(f"❌ Erro ao atualizar {', '.join(changed)} em segundo plano: {e}")
+        # mesmo com erro não tenta de novo a cada ciclo: o próximo request recarrega
+        _seen = current
+
+
+def start() -> bool:
+    """Inicia a thread (uma por processo). Retorna False se estiver desligada."""
+    global _thread, _seen
+    if interval <= 0:
+        return False
+    with _startLock:
+        if _thread is None or not _thread.is_alive():
+            _seen = _versions()
+            store.serveStaleWhile(_pending)
+            _thread = threading.Thread(target=_run, name="fcd-refresher", daemon=True)
+            _thread.start()
+    return True
+
+
+def running() -> bool:
+    return _thread is not None and _thread.is_alive()
+
+
+def wake():
+    """Antecipa a próxima verificação (ex.: logo após um upload)."""
+    _wake.set()
+
+
+def status() -> dict:
+    return dict(_status)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from models.indexing import dateRange, extendFrame, membershipFilter, validSortedDates
+
+cubeColumns = ["data", "loja", "produtoId", "produtoNome", "quantidadeVendida", "valorTotal"]
+
+
+class SalesCube:
+    """
+    Cubo pré-agregado de vendas: (dia × loja × produtoId).
+
+    Guarda quantidade e receita somadas por célula, ordenado por data. Tem as
+    mesmas colunas das vendas brutas, então os agregadores do SalesController
+    (receita, top-N, série temporal) funcionam igualmente sobre um recorte
+    do cubo — só a tabela detalhada precisa das linhas originais.
+    """
+
+    def __init__(self, vendasDf: pd.DataFrame):
+        self.cube = self._build(vendasDf)
+        self._dates = validSortedDates(self.cube["data"])
+
+    def _build(self, vendasDf: pd.DataFrame) -> pd.DataFrame:
+        if vendasDf.empty or any(c not in vendasDf.columns for c in ["data", "loja", "produtoId"]):
+            return pd.DataFrame({c: pd.Series(dtype="float64") for c in cubeColumns}).astype(
+                {"data": "datetime64[ns]", "loja": "category", "produtoNome": "category"}
+            )
+
+        df = vendasDf[["data", "loja", "produtoId", "quantidadeVendida", "valorTotal"]].copy()
+        df["data"] = df["data"].dt.normalize()
+        cube = (
+            df.groupby(["data", "loja", "produtoId"], dropna=False, sort=False)
+            .agg(quantidadeVendida=("quantidadeVendida", "sum"), valorTotal=("valorTotal", "sum"))
+            .reset_index()
+        )
+
+        # nome do produto vem de uma única linha por produtoId
+        if "produtoNome" in vendasDf.columns:
+            nomes = vendasDf[["produtoId", "produtoNome"]].drop_duplicates("produtoId").set_index("produtoId")["produtoNome"]
+            cube["produtoNome"] = cube["produtoId"].map(nomes)
+        else:
+            cube["produtoNome"] = np.nan
+
+        cube["loja"] = cube["loja"].astype("category")
+        cube["produtoNome"] = cube["produtoNome"].astype("category")
+        cube = cube.sort_values("data", kind="mergesort", na_position="last").reset_index(drop=True)
+        return cube[cubeColumns]
+
+    def extended(self, vendasDf: pd.DataFrame) -> "SalesCube":
+        """
+        Novo cubo com as vendas de `vendasDf` acrescentadas (este não muda).
+
+        Só o lote é agregado; uma célula (dia, loja, produto) que já existia
+        aparece de novo em vez de ser somada, o que não altera nenhum
+        agregado (todos os consumidores somam por grupo).
+        """
+        out = SalesCube.__new__(SalesCube)
+        out.cube = extendFrame(self.cube, self._build(vendasDf), ["loja", "produtoNome"], "data")
+        out._dates = validSortedDates(out.cube["data"])
+        return out
+
+    def slice(self, lojas=None, produtos=None, startDate=None, endDate=None) -> pd.DataFrame:
+        """Recorte do cubo com a mesma semântica de SalesController.filterData."""
+        lo, hi = dateRange(self._dates, len(self.cube), startDate, endDate)
+        # sem recorte de período devolve o próprio cubo (os agregadores reconhecem)
+        cube = self.cube if (lo, hi) == (0, len(self.cube)) else self.cube.iloc[lo:hi]
+        return membershipFilter(cube, (("loja", lojas), ("produtoNome", produtos)))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.cube.memory_usage(index=True, deep=True).sum())
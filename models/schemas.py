@@ -0,0 +1,217 @@
+import pandas as pd
+
+# Registro de schemas por dataset.
+#   aliases: nome canônico -> outros cabeçalhos aceitos (já em minúsculas)
+#   dates:   coluna -> formato exato (strftime) usado no parse vetorizado
+#   columns: coluna -> tipo ("int64", "float64" ou "str")
+#   required: colunas que um upload precisa ter (após os aliases)
+#   key:      identificador único de cada linha, usado na ingestão incremental
+# Inteiros com valores ausentes/inválidos ficam float64, como no read_csv padrão.
+schemas = {
+    "produtos": {
+        "aliases": {
+            "produto_id": ["produtoid", "id_produto", "id"],
+            "produto_nome": ["produto nome", "produtonome", "produto", "nome"],
+            "preco_unitario": ["preço_unitario", "preço_unitário", "preco", "preço"],
+            "custo_unitario": ["custo", "custo_unitário"],
+        },
+        "dates": {},
+        "columns": {
+            "produto_id": "int64",
+            "sku": "str",
+            "produto_nome": "str",
+            "categoria": "str",
+            "marca": "str",
+            "preco_unitario": "float64",
+            "custo_unitario": "float64",
+            "estoque_inicial": "int64",
+            "unidade_medida": "str",
+            "peso_kg": "float64",
+            "dimensao_cm": "str",
+        },
+        "required": ["produto_id", "produto_nome"],
+    },
+    "estoque": {
+        "aliases": {
+            "produto_id": ["produtoid", "id_produto"],
+            "data_referencia": ["data", "data_ref"],
+            "quantidade_estoque": ["quantidade", "estoque", "qtd_estoque"],
+            "estoque_minimo": ["estoque_mínimo", "minimo", "mínimo"],
+            "localizacao": ["localização", "loja"],
+        },
+        "dates": {"data_referencia": "%Y-%m-%d"},
+        "columns": {
+            "estoque_id": "int64",
+            "produto_id": "int64",
+            "quantidade_estoque": "int64",
+            "estoque_minimo": "int64",
+            "localizacao": "str",
+        },
+        "required": ["produto_id", "quantidade_estoque"],
+    },
+    "compras": {
+        "aliases": {
+            "produto_id": ["produtoid", "id_produto"],
+            "data_compra": ["data"],
+            "quantidade_comprada": ["quantidade"],
+            "prazo_entrega_dias": ["prazo_entrega", "prazo"],
+            "status_compra": ["status"],
+        },
+        "dates": {"data_compra": "%d/%m/%Y"},
+        "columns": {
+            "compra_id": "int64",
+            "produto_id": "int64",
+            "fornecedor": "str",
+            "quantidade_comprada": "int64",
+            "valor_unitario": "float64",
+            "valor_total": "float64",
+            "prazo_entrega_dias": "int64",
+            "status_compra": "str",
+        },
+        "required": ["produto_id", "data_compra", "fornecedor", "valor_total"],
+        "key": "compra_id",
+    },
+    "vendas": {
+        "aliases": {
+            "produto_id": ["produtoid", "id_produto"],
+            "data_venda": ["data"],
+            "loja_id": ["loja"],
+            "quantidade_vendida": ["quantidade"],
+            "valor_unitario": ["preco_unitario", "preço_unitario"],
+        },
+        "dates": {"data_venda": "%Y-%m-%d"},
+        "columns": {
+            "venda_id": "int64",
+            "produto_id": "int64",
+            "loja_id": "str",
+            "quantidade_vendida": "int64",
+            "valor_unitario": "float64",
+            "valor_total": "float64",
+        },
+        "required": ["produto_id", "data_venda", "quantidade_vendida"],
+        "key": "venda_id",
+    },
+    "fornecedores": {
+        "aliases": {
+            "nome_fornecedor": ["fornecedor", "nome", "razao_social", "razão_social"],
+            "avaliacao_media": ["avaliação_média", "avaliacao", "avaliação"],
+        },
+        "dates": {},
+        "columns": {
+            "fornecedor_id": "int64",
+            "nome_fornecedor": "str",
+            "cnpj": "str",
+            "email": "str",
+            "telefone": "str",
+            "cidade": "str",
+            "estado": "str",
+            "produto_principal": "str",
+            "avaliacao_media": "float64",
+        },
+        "required": ["nome_fornecedor"],
+    },
+}
+
+# nomes canônicos -> nomes camelCase usados pelas views dos dashboards
+viewNames = {
+    "vendas": {
+        "data_venda": "data",
+        "produto_id": "produtoId",
+        "loja_id": "loja",
+        "quantidade_vendida": "quantidadeVendida",
+        "valor_unitario": "precoUnitario",
+        "valor_total": "valorTotal",
+    },
+    "produtos": {
+        "produto_id": "produtoId",
+        "produto_nome": "produtoNome",
+        "preco_unitario": "precoUnitario",
+    },
+}
+
+
+def schemaFor(name: str) -> dict:
+    return schemas.get(name, {"aliases": {}, "dates": {}, "columns": {}, "required": []})
+
+
+def canonicalHeader(columns, name: str) -> list:
+    """Nomes canônicos para uma lista de cabeçalhos (mesma regra de normalizeColumns)."""
+    columns = [str(c).strip().lower() for c in columns]
+    rename = {}
+    for canonical, alternatives in schemaFor(name).get("aliases", {}).items():
+        if canonical in columns:
+            continue
+        for alias in alternatives:
+            if alias in columns and alias not in rename:
+                rename[alias] = canonical
+                break
+    return [rename.get(c, c) for c in columns]
+
+
+def normalizeColumns(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Padroniza os cabeçalhos de `df` para os nomes canônicos de `name`.
+
+    Feito uma única vez na carga: cabeçalhos ficam sem espaços nas pontas e
+    em minúsculas, e os aliases do registro viram o nome canônico (o primeiro
+    alias encontrado vence; um nome canônico já presente nunca é sobrescrito).
+    """
+    df.columns = canonicalHeader(df.columns, name)
+    return df
+
+
+def readDtypes(name: str) -> dict:
+    """Tipos passados direto ao read_csv (só texto; números são validados depois)."""
+    return {c: str for c, t in schemaFor(name)["columns"].items() if t == "str"}
+
+
+def fingerprint(name: str) -> str:
+    """Identifica a versão do schema, para invalidar caches quando ele muda."""
+    schema = schemaFor(name)
+    return repr([sorted(schema.get(k, {}).items()) for k in ("aliases", "dates", "columns")])
+
+
+def applySchema(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Converte as colunas de `df` para os tipos do schema de `name`.
+
+    Datas são lidas com o formato declarado numa única passada vetorizada.
+    A contagem de linhas que não puderam ser convertidas fica em
+    `df.attrs["parseErrors"]` ({coluna: linhas}).
+    """
+    schema = schemaFor(name)
+    errors = {}
+
+    for col, fmt in schema["dates"].items():
+        if col not in df.columns:
+            continue
+        raw = df[col]
+        parsed = pd.to_datetime(raw, format=fmt, errors="coerce")
+        failed = int((raw.notna() & parsed.isna()).sum())
+        if failed and failed == int(raw.notna().sum()):
+            # nenhuma linha no formato declarado: tenta inferir antes de desistir
+            print(f"⚠️ {name}.{col} não está no formato {fmt}; usando inferência de formato.")
+            parsed = pd.to_datetime(raw, errors="coerce")
+            failed = int((raw.notna() & parsed.isna()).sum())
+        df[col] = parsed
+        if failed:
+            errors[col] = failed
+
+    for col, dtype in schema["columns"].items():
+        if col not in df.columns or dtype == "str":
+            continue
+        raw = df[col]
+        values = pd.to_numeric(raw, errors="coerce")
+        failed = int((raw.notna() & values.isna()).sum())
+        if dtype == "int64" and not values.isna().any():
+            values = values.astype("int64")
+        else:
+            values = values.astype("float64")
+        df[col] = values
+        if failed:
+            errors[col] = failed
+
+    if errors:
+        print(f"⚠️ {name}: linhas que falharam na conversão de tipos: {errors}")
+    df.attrs["parseErrors"] = errors
+    return df
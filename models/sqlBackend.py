@@ -0,0 +1,216 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from models import dataModel
+from models.arrowCache import cacheDirName
+from models.identityTags import IdentityTags
+from models.schemas import fingerprint, schemaFor
+
+# Backend SQL embutido (SQLite, da biblioteca padrão).
+#
+# Com FCD_BACKEND=sqlite os controllers empurram filtros e agregações para
+# um arquivo SQLite em data/.cache/ e recebem só o resultado; o padrão
+# ("pandas") mantém tudo em DataFrames. Cada tabela é (re)importada do CSV
+# quando a versão do arquivo ou do schema muda, numa transação: leitores
+# continuam vendo a versão anterior até o commit.
+
+backend = os.environ.get("FCD_BACKEND", "pandas").lower()
+dbFileName = "fcd.sqlite"
+ingestChunkRows = 100_000
+
+# índices criados após cada importação: tabela -> colunas de cada índice
+indexes = {
+    "produtos": [("produto_id",)],
+    "estoque": [("produto_id", "localizacao", "data_referencia"), ("localizacao",)],
+    "compras": [("data_compra",), ("fornecedor",), ("produto_id",)],
+    "vendas": [("data_venda",), ("loja_id",), ("produto_id",)],
+    "fornecedores": [("nome_fornecedor",)],
+}
+_sqlTypes = {"int64": "INTEGER", "float64": "REAL", "str": "TEXT"}
+
+_local = threading.local()
+# resultado de filtro -> filtro SQL que o gerou (pela identidade do frame, não por attrs)
+_specs = IdentityTags()
+_ingestLock = threading.Lock()
+
+
+def enabled() -> bool:
+    return backend == "sqlite"
+
+
+def dbPath():
+    return dataModel.dataDir / cacheDirName / dbFileName
+
+
+def connection() -> sqlite3.Connection:
+    """Conexão da thread atual (uma por thread e por arquivo de banco)."""
+    path = dbPath()
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=60)
+        # WAL: consultas não bloqueiam durante uma reimportação
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS _fcd_meta (name TEXT PRIMARY KEY, version TEXT)")
+        conns[path] = conn
+    return conn
+
+
+def _version(name: str) -> str:
+    return repr((dataModel.datasetVersion(name), fingerprint(name)))
+
+
+def _emptyTableSql(name: str, table: str) -> str:
+    schema = schemaFor(name)
+    cols = [f'"{c}" TEXT' for c in schema.get("dates", {})]
+    cols += [f'"{c}" {_sqlTypes[t]}' for c, t in schema.get("columns", {}).items()]
+    return f'CREATE TABLE "{table}" ({", ".join(cols) or "vazio TEXT"})'
+
+
+def _toSql(df: pd.DataFrame) -> pd.DataFrame:
+    # datas como texto ISO: comparação lexicográfica == cronológica
+    out = df.copy()
+    for c in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[c]):
+            out[c] = out[c].dt.strftime("%Y-%m-%d")
+        elif isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object)
+    return out
+
+
+def _chunks(name: str):
+    # arquivos grandes vêm em blocos, sem carregar o CSV inteiro
+    from models import streaming
+    if streaming.shouldStream(name):
+        yield from streaming.iterChunks(name)
+        return
+    df = dataModel.loaders[name]()
+    for start in range(0, len(df), ingestChunkRows):
+        yield df.iloc[start:start + ingestChunkRows]
+
+
+def ensureTables(names) -> None:
+    """Importa os datasets em `names` cujo arquivo mudou desde a última importação."""
+    conn = connection()
+    stale = [
+        n for n in names
+        if conn.execute("SELECT version FROM _fcd_meta WHERE name = ?", (n,)).fetchone() != (_version(n),)
+    ]
+    if not stale:
+        return
+    with _ingestLock:
+        for name in stale:
+            version = _version(name)
+            if conn.execute("SELECT version FROM _fcd_meta WHERE name = ?", (name,)).fetchone() == (version,):
+                continue
+            _ingest(conn, name, version)
+
+
+def _ingest(conn: sqlite3.Connection, name: str, version: str):
+    tmp = f"{name}__novo"
+    with conn:
+        conn.execute(f'DROP TABLE IF EXISTS "{tmp}"')
+        wrote = False
+        if dataModel.datasetVersion(name) is not None:
+            for chunk in _chunks(name):
+                _toSql(chunk).to_sql(tmp, conn, if_exists="append", index=False)
+                wrote = True
+        if not wrote:
+            conn.execute(_emptyTableSql(name, tmp))
+        conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+        conn.execute(f'ALTER TABLE "{tmp}" RENAME TO "{name}"')
+        columns = {r[1] for r in conn.execute(f'PRAGMA table_info("{name}")')}
+        for cols in indexes.get(name, []):
+            if all(c in columns for c in cols):
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{name}_{"_".join(cols)}" ON "{name}" ({", ".join(cols)})'
+                )
+        conn.execute("INSERT OR REPLACE INTO _fcd_meta (name, version) VALUES (?, ?)", (name, version))
+
+
+def appendRows(name: str, rows: pd.DataFrame, previousVersion) -> bool:
+    """
+    Insere um lote já gravado em disco (models/ingestion.py) sem reimportar
+    a tabela, se ela estava na versão anterior ao lote. Caso contrário (ou se
+    as colunas não baterem) nada é feito e a próxima consulta reimporta tudo.
+    """
+    conn = connection()
+    expected = (repr((previousVersion, fingerprint(name))),)
+    with _ingestLock:
+        if conn.execute("SELECT version FROM _fcd_meta WHERE name = ?", (name,)).fetchone() != expected:
+            return False
+        try:
+            with conn:
+                _toSql(rows).to_sql(name, conn, if_exists="append", index=False)
+                conn.execute("INSERT OR REPLACE INTO _fcd_meta (name, version) VALUES (?, ?)", (name, _version(name)))
+        except sqlite3.Error:
+            return False
+    return True
+
+
+def columns(name: str) -> set:
+    ensureTables([name])
+    return {r[1] for r in connection().execute(f'PRAGMA table_info("{name}")')}
+
+
+def query(sql: str, params=(), tables=(), dates=()) -> pd.DataFrame:
+    """Executa `sql` depois de garantir as tabelas; `dates` são convertidas para datetime."""
+    ensureTables(tables)
+    df = pd.read_sql_query(sql, connection(), params=list(params))
+    for c in dates:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], format="%Y-%m-%d", errors="coerce")
+    return df
+
+
+def where(start=None, end=None, dateExpr: str = None, members=(), extra=()) -> tuple:
+    """
+    Cláusula WHERE e parâmetros com a mesma semântica dos filtros em pandas:
+    start <= data <= end e pertinência por listas (listas vazias não filtram).
+    As listas vão como um único parâmetro JSON, sem limite de variáveis;
+    `extra` são condições SQL fixas acrescentadas com AND.
+    """
+    clauses, params = list(extra), []
+    if start is not None and dateExpr:
+        clauses.append(f"{dateExpr} >= ?")
+        params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+    if end is not None and dateExpr:
+        clauses.append(f"{dateExpr} <= ?")
+        params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+    for expr, values in members:
+        if values:
+            clauses.append(f"{expr} IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([v.item() if hasattr(v, "item") else v for v in values]))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def attachSpec(df: pd.DataFrame, start=None, end=None, dateExpr: str = None, members=()) -> pd.DataFrame:
+    """
+    Registra o filtro que gerou `df`, para que as agregações sobre ele
+    possam ser refeitas em SQL com o mesmo filtro.
+    """
+    return _specs.set(df, {
+        "start": start, "end": end, "dateExpr": dateExpr,
+        "members": tuple((expr, list(values) if values else None) for expr, values in members),
+    })
+
+
+def specWhere(spec: dict, extra=()) -> tuple:
+    return where(spec["start"], spec["end"], spec["dateExpr"], spec["members"], extra)
+
+
+def specOf(df: pd.DataFrame):
+    """
+    Filtro SQL de `df`, só se ele é o próprio resultado de um filtro: um
+    frame derivado (mesmo com o mesmo número de linhas) é agregado em pandas.
+    """
+    if not enabled():
+        return None
+    return _specs.get(df)
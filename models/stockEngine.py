@@ -0,0 +1,100 @@
+import threading
+
+import pandas as pd
+
+from models.stockSnapshot import LatestStockSnapshot
+
+semLocalizacao = "Geral"
+
+
+class StockEngine:
+    """
+    Estoque por (produto_id, localizacao) e consolidação da rede de lojas.
+
+    O último registro de cada loja vem de um snapshot incremental; as
+    consolidações por produto (soma das quantidades, soma dos mínimos e
+    quantidade de lojas em alerta) são feitas num único groupby vetorizado,
+    sem montar um DataFrame por loja.
+    """
+
+    def __init__(self):
+        self.perStoreSnapshot = LatestStockSnapshot(keyCols=("produto_id", "localizacao"))
+        # usado quando o estoque.csv não tem a coluna localizacao
+        self.perProductSnapshot = LatestStockSnapshot(keyCols=("produto_id",))
+        self._lock = threading.Lock()
+        self._source = None
+        self._rollups = {}
+
+    def latestPerStore(self, estoque: pd.DataFrame) -> pd.DataFrame:
+        """Último registro por produto e loja, com a flag de alerta da loja."""
+        cols = {str(c).strip().lower() for c in estoque.columns}
+        if "localizacao" in cols:
+            latest = self.perStoreSnapshot.refresh(estoque)
+        else:
+            latest = self.perProductSnapshot.refresh(estoque)
+            if latest is not None:
+                latest = latest.assign(localizacao=semLocalizacao).set_index("localizacao", append=True)
+
+        if latest is None:
+            perStore = self._fallbackPerStore(estoque)
+        else:
+            perStore = latest.reset_index()
+
+        for c in ["quantidade_estoque", "estoque_minimo"]:
+            if c not in perStore.columns:
+                perStore[c] = 0
+        perStore["em_alerta"] = perStore["quantidade_estoque"] < perStore["estoque_minimo"]
+        return perStore
+
+    def _fallbackPerStore(self, estoque: pd.DataFrame) -> pd.DataFrame:
+        # sem data de referência: soma as quantidades por produto e loja
+        dfEst = estoque.copy()
+        dfEst.columns = dfEst.columns.str.strip().str.lower()
+        if "localizacao" not in dfEst.columns:
+            dfEst["localizacao"] = semLocalizacao
+        agg = {}
+        if "quantidade_estoque" in dfEst.columns:
+            agg["quantidade_estoque"] = "sum"
+        if "estoque_minimo" in dfEst.columns:
+            agg["estoque_minimo"] = "max"
+        if not agg:
+            return dfEst[["produto_id", "localizacao"]].drop_duplicates().reset_index(drop=True)
+        return dfEst.groupby(["produto_id", "localizacao"], as_index=False).agg(agg)
+
+    def networkRollup(self, perStore: pd.DataFrame, locations=None) -> pd.DataFrame:
+        """Consolida por produto as lojas em `locations` (todas, se vazio)."""
+        if locations:
+            perStore = perStore[perStore["localizacao"].isin(locations)]
+        return (
+            perStore.groupby("produto_id", sort=True)
+            .agg(
+                quantidade_estoque=("quantidade_estoque", "sum"),
+                estoque_minimo=("estoque_minimo", "sum"),
+                lojas=("localizacao", "size"),
+                lojas_em_alerta=("em_alerta", "sum"),
+            )
+            .reset_index()
+        )
+
+    def rollup(self, estoque: pd.DataFrame, locations=None):
+        """
+        Retorna (perStore, rollup) para o histórico `estoque`.
+
+        Os resultados ficam guardados enquanto o snapshot não mudar, então
+        reruns com o mesmo filtro de lojas não refazem o groupby.
+        """
+        with self._lock:
+            perStore = self._rollups.get("perStore") if self._source is estoque else None
+            if perStore is None:
+                perStore = self.latestPerStore(estoque)
+                self._source = estoque
+                self._rollups = {"perStore": perStore}
+
+            key = tuple(sorted(locations)) if locations else ()
+            if key not in self._rollups:
+                self._rollups[key] = self.networkRollup(perStore, list(key))
+            return perStore, self._rollups[key]
+
+    def locations(self, estoque: pd.DataFrame) -> list:
+        perStore, _ = self.rollup(estoque)
+        return sorted(perStore["localizacao"].dropna().unique().tolist())
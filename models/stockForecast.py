@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+# Previsão de ruptura e reposição para todos os produtos de uma vez.
+#
+# Tudo é feito com groupby/diff sobre o histórico inteiro, sem laços
+# por produto:
+#   consumo diário    vendas recentes (média e desvio na janela) ou, sem
+#                     vendas, as quedas entre snapshots de estoque
+#   prazo de entrega  mediana de prazo_entrega_dias das compras entregues
+#   em pedido         quantidade das compras pendentes
+# e, a partir deles, dias de cobertura, data prevista de ruptura, ponto de
+# pedido e quantidade sugerida de reposição.
+
+# nível de serviço de ~95% para o estoque de segurança
+defaultServiceZ = 1.65
+defaultWindowDays = 90
+defaultReviewDays = 30
+# coberturas acima disso não viram data (evita overflow de Timestamp)
+maxCoverDays = 3650
+
+
+def snapshotConsumption(estoque: pd.DataFrame, locations=None) -> pd.Series:
+    """
+    Consumo diário por produto estimado pelas quedas entre snapshots.
+
+    Cada série (produto, loja) é ordenada por data; as quedas de quantidade
+    entre snapshots consecutivos são somadas e divididas pelos dias
+    decorridos. Reposições entre dois snapshots escondem consumo, então é
+    uma estimativa por baixo — usada só quando não há vendas.
+    """
+    if estoque.empty or any(c not in estoque.columns for c in ["produto_id", "data_referencia", "quantidade_estoque"]):
+        return pd.Series(dtype="float64", name="consumo")
+    keys = ["produto_id", "localizacao"] if "localizacao" in estoque.columns else ["produto_id"]
+    df = estoque[keys + ["data_referencia", "quantidade_estoque"]]
+    if locations and "localizacao" in df.columns:
+        df = df[df["localizacao"].isin(locations)]
+    df = df.dropna(subset=["data_referencia"]).sort_values(keys + ["data_referencia"], kind="mergesort")
+
+    grouped = df.groupby(keys, sort=False)
+    drops = (-grouped["quantidade_estoque"].diff()).clip(lower=0)
+    days = grouped["data_referencia"].diff().dt.days
+    frame = pd.DataFrame({"produto_id": df["produto_id"], "queda": drops, "dias": days}).dropna()
+    totals = frame.groupby("produto_id").agg(queda=("queda", "sum"), dias=("dias", "sum"))
+    totals = totals[totals["dias"] > 0]
+    return (totals["queda"] / totals["dias"]).rename("consumo")
+
+
+def salesConsumption(sales: pd.DataFrame, windowDays: int = defaultWindowDays,
+                     dateCol: str = "data", keyCol: str = "produtoId",
+                     qtyCol: str = "quantidadeVendida") -> pd.DataFrame:
+    """
+    Média e desvio-padrão da venda diária por produto nos últimos `windowDays`.
+
+    Os dias sem venda contam como zero sem precisar materializá-los: a média
+    e a variância saem das somas de x e x² divididas pelo tamanho da janela.
+    """
+    if sales.empty or any(c not in sales.columns for c in [dateCol, keyCol, qtyCol]):
+        return pd.DataFrame(columns=["consumo", "desvio"], dtype="float64")
+    end = sales[dateCol].max()
+    recent = sales[sales[dateCol] > end - pd.Timedelta(days=windowDays)]
+    # uma linha por (produto, dia) antes de elevar ao quadrado
+    daily = recent.groupby([keyCol, recent[dateCol].dt.normalize()], observed=True)[qtyCol].sum()
+    stats = pd.DataFrame({"soma": daily, "somaQuadrados": daily.astype("float64") ** 2}).groupby(level=0).sum()
+    mean = stats["soma"] / windowDays
+    var = (stats["somaQuadrados"] / windowDays - mean ** 2).clip(lower=0)
+    out = pd.DataFrame({"consumo": mean, "desvio": np.sqrt(var)})
+    out.index.name = "produto_id"
+    return out
+
+
+def leadTimes(compras: pd.DataFrame) -> pd.Series:
+    """Mediana do prazo de entrega por produto (compras entregues, se houver status)."""
+    if compras.empty or "prazo_entrega_dias" not in compras.columns:
+        return pd.Series(dtype="float64", name="prazo")
+    df = compras
+    if "status_compra" in df.columns:
+        delivered = df[df["status_compra"] == "Entregue"]
+        df = delivered if not delivered.empty else df
+    return df.groupby("produto_id", observed=True)["prazo_entrega_dias"].median().rename("prazo")
+
+
+def onOrder(compras: pd.DataFrame) -> pd.Series:
+    """Quantidade em compras pendentes por produto."""
+    cols = ["produto_id", "status_compra", "quantidade_comprada"]
+    if compras.empty or any(c not in compras.columns for c in cols):
+        return pd.Series(dtype="float64", name="emPedido")
+    pending = compras[compras["status_compra"] == "Pendente"]
+    return pending.groupby("produto_id", observed=True)["quantidade_comprada"].sum().rename("emPedido")
+
+
+def forecast(stock: pd.DataFrame, asOf, salesRate: pd.DataFrame = None, snapshotRate: pd.Series = None,
+             leadTime: pd.Series = None, pending: pd.Series = None,
+             reviewDays: int = defaultReviewDays, serviceZ: float = defaultServiceZ) -> pd.DataFrame:
+    """
+    Combina estoque atual e taxas de consumo numa previsão por produto.
+
+    `stock` precisa de produtoId, quantidadeEstoque e estoqueMinimo (a view do
+    InventoryController serve). As demais séries são indexadas por produto_id.
+    """
+    out = stock.copy()
+    ids = out["produtoId"]
+    estoque = out["quantidadeEstoque"].astype("float64").to_numpy()
+
+    vendas = ids.map(salesRate["consumo"]) if salesRate is not None and not salesRate.empty else pd.Series(np.nan, index=out.index)
+    desvio = ids.map(salesRate["desvio"]) if salesRate is not None and not salesRate.empty else pd.Series(np.nan, index=out.index)
+    snap = ids.map(snapshotRate) if snapshotRate is not None and not snapshotRate.empty else pd.Series(np.nan, index=out.index)
+    rate = vendas.fillna(snap).fillna(0.0).to_numpy(dtype="float64")
+    out["fonteConsumo"] = np.select([vendas.notna(), snap.notna()], ["vendas", "estoque"], "sem histórico")
+    out["consumoDiario"] = rate
+
+    globalLead = float(leadTime.median()) if leadTime is not None and not leadTime.empty else 0.0
+    lead = ids.map(leadTime).fillna(globalLead) if leadTime is not None else pd.Series(globalLead, index=out.index)
+    lead = lead.to_numpy(dtype="float64")
+    out["prazoEntrega"] = lead
+    out["emPedido"] = (ids.map(pending) if pending is not None else pd.Series(0, index=out.index)).fillna(0).to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(rate > 0, estoque / rate, np.where(estoque > 0, np.inf, 0.0))
+    out["diasCobertura"] = cover
+
+    asOf = pd.Timestamp(asOf)
+    # NaN (cobertura infinita ou longa demais) vira NaT
+    out["dataRuptura"] = asOf + pd.to_timedelta(np.where(cover <= maxCoverDays, np.ceil(cover), np.nan), unit="D")
+
+    safety = serviceZ * desvio.fillna(0.0).to_numpy() * np.sqrt(lead)
+    minimo = out["estoqueMinimo"].astype("float64").to_numpy()
+    reorderPoint = np.maximum(rate * lead + safety, minimo)
+    out["pontoPedido"] = reorderPoint
+
+    # data em que o estoque cruza o ponto de pedido (hoje, se já cruzou)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        untilReorder = np.where(rate > 0, np.maximum(estoque - reorderPoint, 0) / rate,
+                                np.where(estoque > reorderPoint, np.inf, 0.0))
+    out["dataPedido"] = asOf + pd.to_timedelta(
+        np.where(untilReorder <= maxCoverDays, np.floor(untilReorder), np.nan), unit="D"
+    )
+
+    target = np.maximum(rate * (lead + reviewDays) + safety, minimo)
+    out["quantidadeSugerida"] = np.ceil(np.maximum(target - estoque - out["emPedido"].to_numpy(), 0)).astype("int64")
+    out["rupturaNoPrazo"] = cover <= lead
+    return out
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+# Razão de estoque: conciliação de compras, vendas e snapshots de estoque.
+#
+# Tudo é feito para todos os produtos de uma vez, com groupby/cumsum sobre o
+# histórico inteiro, sem laços por produto:
+#   movimentos      entradas (compras entregues, na data de recebimento) e
+#                   saídas (vendas) somadas por (produto, dia)
+#   estoque da rede snapshots de todas as lojas consolidados por produto; a
+#                   loja que não informou numa data conta com o último valor
+#   conciliação     entre dois snapshots seguidos, o esperado é o anterior
+#                   mais as entradas menos as saídas do período; a diferença
+#                   para o snapshot é a divergência
+# Divergência negativa é perda (quebra, furto, baixa não registrada);
+# positiva indica entrada sem compra registrada. As compras não têm loja,
+# então a conciliação é sempre da rede inteira.
+
+defaultTolerance = 0
+situacoes = {"ok": "ok", "perda": "perda", "entrada": "entrada não registrada"}
+ledgerColumns = [
+    "produtoId", "dataAnterior", "data", "estoqueAnterior", "entradas", "saidas",
+    "esperado", "estoque", "divergencia", "situacao",
+]
+
+
+def dailyMovements(compras: pd.DataFrame, sales: pd.DataFrame, dateCol: str = "data",
+                   keyCol: str = "produtoId", qtyCol: str = "quantidadeVendida") -> pd.DataFrame:
+    """
+    Entradas, saídas, movimento e saldo acumulado por (produto_id, dia).
+
+    As compras entram só com status "Entregue" (quando há status), na data
+    da compra mais o prazo de entrega. `sales` pode ser o cubo de vendas ou
+    as vendas brutas (colunas `dateCol`, `keyCol`, `qtyCol`). O acumulado é
+    a soma dos movimentos do produto até o dia, inclusive.
+    """
+    parts = []
+    cols = ["produto_id", "data_compra", "quantidade_comprada"]
+    if not compras.empty and all(c in compras.columns for c in cols):
+        df = compras
+        if "status_compra" in df.columns:
+            df = df[df["status_compra"] == "Entregue"]
+        day = df["data_compra"].dt.normalize()
+        if "prazo_entrega_dias" in df.columns:
+            day = day + pd.to_timedelta(df["prazo_entrega_dias"].fillna(0), unit="D")
+        parts.append(pd.DataFrame({
+            "produto_id": df["produto_id"].to_numpy(), "data": day.to_numpy(),
+            "entradas": df["quantidade_comprada"].to_numpy(dtype="float64"), "saidas": 0.0,
+        }))
+    if not sales.empty and all(c in sales.columns for c in [dateCol, keyCol, qtyCol]):
+        parts.append(pd.DataFrame({
+            "produto_id": sales[keyCol].to_numpy(), "data": sales[dateCol].dt.normalize().to_numpy(),
+            "entradas": 0.0, "saidas": sales[qtyCol].to_numpy(dtype="float64"),
+        }))
+
+    if not parts:
+        out = pd.DataFrame(columns=["entradas", "saidas", "movimento", "acumulado"], dtype="float64")
+        out.index = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])], names=["produto_id", "data"])
+        return out
+    frame = pd.concat(parts, ignore_index=True).dropna(subset=["produto_id", "data"])
+    # uma linha por (produto, dia), ordenada por produto e data
+    out = frame.groupby(["produto_id", "data"], sort=True)[["entradas", "saidas"]].sum()
+    out["movimento"] = out["entradas"] - out["saidas"]
+    out["acumulado"] = out.groupby(level="produto_id", sort=False)["movimento"].cumsum()
+    return out
+
+
+def networkSnapshots(estoque: pd.DataFrame) -> pd.Series:
+    """
+    Estoque da rede por (produto_id, data_referencia).
+
+    Cada loja contribui com a variação desde o próprio snapshot anterior;
+    a soma acumulada dessas variações por produto dá o total da rede em
+    cada data, mantendo o último valor das lojas que não informaram nela.
+    """
+    cols = ["produto_id", "data_referencia", "quantidade_estoque"]
+    if estoque.empty or any(c not in estoque.columns for c in cols):
+        return pd.Series(dtype="float64", name="estoque")
+    keys = ["produto_id", "localizacao"] if "localizacao" in estoque.columns else ["produto_id"]
+    df = estoque[keys + ["data_referencia", "quantidade_estoque"]].dropna(subset=["produto_id", "data_referencia"])
+    # mais de um registro da mesma loja no mesmo dia: vale o último do arquivo
+    df = df.sort_values(keys + ["data_referencia"], kind="mergesort")
+    df = df.drop_duplicates(keys + ["data_referencia"], keep="last")
+
+    qty = df["quantidade_estoque"].astype("float64").fillna(0)
+    delta = qty - qty.groupby([df[k] for k in keys], observed=True, sort=False).shift(fill_value=0)
+    changes = delta.groupby([df["produto_id"], df["data_referencia"].rename("data")], sort=True).sum()
+    return changes.groupby(level="produto_id", sort=False).cumsum().rename("estoque")
+
+
+def reconcile(snapshots: pd.Series, movements: pd.DataFrame, tolerance: float = defaultTolerance) -> pd.DataFrame:
+    """
+    Um registro por par de snapshots seguidos de cada produto, com o
+    esperado pelos movimentos do período e a divergência.
+
+    O snapshot é considerado de fim de dia: os movimentos da própria data
+    já estão nele. Divergências com módulo até `tolerance` contam como ok.
+    """
+    if snapshots.empty:
+        return pd.DataFrame(columns=ledgerColumns)
+    snap = snapshots.rename("estoque").reset_index()
+    mov = movements[["entradas", "saidas"]].reset_index()
+    # eventos de todos os produtos numa única ordenação; no mesmo dia o
+    # snapshot vem depois dos movimentos
+    events = pd.concat([
+        mov.assign(estoque=np.nan, ordem=0),
+        snap.assign(entradas=0.0, saidas=0.0, ordem=1),
+    ], ignore_index=True)
+    events = events.sort_values(["produto_id", "data", "ordem"], kind="mergesort")
+    acum = events.groupby("produto_id", sort=False)[["entradas", "saidas"]].cumsum()
+    atSnapshot = events["ordem"].to_numpy() == 1
+    at = events.loc[atSnapshot, ["produto_id", "data", "estoque"]].join(acum[atSnapshot])
+
+    previous = at.groupby("produto_id", sort=False)[["data", "estoque", "entradas", "saidas"]].shift()
+    out = pd.DataFrame({
+        "produtoId": at["produto_id"],
+        "dataAnterior": previous["data"],
+        "data": at["data"],
+        "estoqueAnterior": previous["estoque"],
+        "entradas": at["entradas"] - previous["entradas"],
+        "saidas": at["saidas"] - previous["saidas"],
+        "estoque": at["estoque"],
+    })
+    # o primeiro snapshot de cada produto só serve de ponto de partida
+    out = out[out["dataAnterior"].notna()]
+    out["esperado"] = out["estoqueAnterior"] + out["entradas"] - out["saidas"]
+    out["divergencia"] = out["estoque"] - out["esperado"]
+    div = out["divergencia"].to_numpy()
+    out["situacao"] = np.select(
+        [div < -tolerance, div > tolerance], [situacoes["perda"], situacoes["entrada"]], situacoes["ok"]
+    )
+    return out[ledgerColumns].reset_index(drop=True)
+
+
+def summarize(ledger: pd.DataFrame) -> pd.DataFrame:
+    """Resumo por produto: períodos conciliados, divergentes, perda e entradas sem registro."""
+    cols = ["produtoId", "periodos", "periodosDivergentes", "perda", "entradaNaoRegistrada",
+            "divergenciaLiquida", "ultimaConferencia", "ultimaSituacao"]
+    if ledger.empty:
+        return pd.DataFrame(columns=cols)
+    div = ledger["divergencia"]
+    frame = ledger.assign(
+        divergente=ledger["situacao"] != situacoes["ok"],
+        perda=(-div).clip(lower=0).where(ledger["situacao"] == situacoes["perda"], 0.0),
+        entrada=div.clip(lower=0).where(ledger["situacao"] == situacoes["entrada"], 0.0),
+    )
+    # o razão já vem ordenado por produto e data: "last" é a conferência mais recente
+    out = frame.groupby("produtoId", sort=True).agg(
+        periodos=("data", "size"),
+        periodosDivergentes=("divergente", "sum"),
+        perda=("perda", "sum"),
+        entradaNaoRegistrada=("entrada", "sum"),
+        divergenciaLiquida=("divergencia", "sum"),
+        ultimaConferencia=("data", "last"),
+        ultimaSituacao=("situacao", "last"),
+    ).reset_index()
+    return out[cols]
@@ -0,0 +1,117 @@
+import threading
+
+import pandas as pd
+
+
+class LatestStockSnapshot:
+    """
+    Último registro de estoque por chave, mantido de forma incremental.
+
+    O estoque.csv só cresce com novas datas de referência anexadas ao final.
+    O snapshot guarda a data de corte (watermark) e quantas linhas do
+    histórico já foram processadas; num refresh, apenas as linhas novas são
+    combinadas com o snapshot atual. Se o histórico encolher, for reescrito
+    ou receber datas anteriores ao watermark, o snapshot é refeito do zero.
+    """
+
+    def __init__(self, keyCols=("produto_id",), dateCol="data_referencia",
+                 valueCols=("quantidade_estoque", "estoque_minimo")):
+        self.keyCols = list(keyCols)
+        self.dateCol = dateCol
+        self.valueCols = list(valueCols)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.latest = None      # DataFrame indexado pelas chaves
+        self.watermark = None   # maior data_referencia já incorporada
+        self.rowsSeen = 0
+        self._lastRow = None    # última linha processada, para detectar reescritas
+
+    def _resolveColumns(self, df: pd.DataFrame) -> dict:
+        # nome canônico (minúsculo, sem espaços) -> nome real no DataFrame
+        return {str(c).strip().lower(): c for c in df.columns}
+
+    def _select(self, df: pd.DataFrame, colmap: dict) -> pd.DataFrame:
+        wanted = [c for c in self.keyCols + [self.dateCol] + self.valueCols if c in colmap]
+        rows = df[[colmap[c] for c in wanted]]
+        rows.columns = wanted
+        return rows
+
+    def _canonical(self, df: pd.DataFrame, colmap: dict) -> pd.DataFrame:
+        rows = self._select(df, colmap)
+        return rows[rows[self.dateCol].notna()]
+
+    def _build(self, rows: pd.DataFrame) -> pd.DataFrame:
+        # ordenação estável: empates de data mantêm a ordem de chegada
+        rows = rows.sort_values(self.dateCol, kind="mergesort")
+        return rows.groupby(self.keyCols, sort=True).last()
+
+    def _isAppendOnly(self, df: pd.DataFrame, colmap: dict) -> bool:
+        if self.latest is None or len(df) < self.rowsSeen or self.rowsSeen == 0:
+            return False
+        lastRow = self._select(df.iloc[[self.rowsSeen - 1]], colmap).reset_index(drop=True)
+        return lastRow.equals(self._lastRow)
+
+    def refresh(self, df: pd.DataFrame):
+        """
+        Atualiza o snapshot com o histórico `df` e retorna o último registro
+        por chave (ou None se o histórico não tiver datas utilizáveis).
+        """
+        with self._lock:
+            colmap = self._resolveColumns(df)
+            if self.dateCol not in colmap or any(k not in colmap for k in self.keyCols):
+                self.reset()
+                return None
+
+            if self._isAppendOnly(df, colmap):
+                delta = self._canonical(df.iloc[self.rowsSeen:], colmap)
+                if not delta.empty:
+                    if delta[self.dateCol].min() < self.watermark:
+                        # linhas fora de ordem: não dá para só anexar
+                        self._rebuild(df, colmap)
+                    else:
+                        combined = pd.concat([self.latest.reset_index(), delta], ignore_index=True)
+                        self.latest = self._build(combined)
+                        self.watermark = delta[self.dateCol].max()
+                        self._markSeen(df, colmap)
+            else:
+                self._rebuild(df, colmap)
+
+            if self.latest is None or self.latest.empty:
+                return None
+            return self.latest
+
+    def _rebuild(self, df: pd.DataFrame, colmap: dict):
+        rows = self._canonical(df, colmap)
+        if rows.empty:
+            self.reset()
+            return
+        self.latest = self._build(rows)
+        self.watermark = rows[self.dateCol].max()
+        self._markSeen(df, colmap)
+
+    def _markSeen(self, df: pd.DataFrame, colmap: dict):
+        self.rowsSeen = len(df)
+        self._lastRow = self._select(df.iloc[[len(df) - 1]], colmap).reset_index(drop=True)
+
+    def foldChunk(self, chunk: pd.DataFrame) -> None:
+        """
+        Incorpora um pedaço do histórico em qualquer ordem de datas.
+
+        Usado na leitura em blocos (models/streaming.py): como o snapshot só
+        guarda a última linha por chave, combinar bloco a bloco dá o mesmo
+        resultado que processar o histórico inteiro de uma vez.
+        """
+        with self._lock:
+            colmap = self._resolveColumns(chunk)
+            if self.dateCol not in colmap or any(k not in colmap for k in self.keyCols):
+                return
+            rows = self._canonical(chunk, colmap)
+            if rows.empty:
+                return
+            if self.latest is not None:
+                rows = pd.concat([self.latest.reset_index(), rows], ignore_index=True)
+            self.latest = self._build(rows)
+            chunkMax = rows[self.dateCol].max()
+            self.watermark = chunkMax if self.watermark is None else max(self.watermark, chunkMax)
@@ -0,0 +1,121 @@
+# Leitura em blocos para CSVs maiores que a memória.
+#
+# Cada função percorre o arquivo em pedaços de `chunkRows` linhas e reduz
+# cada pedaço aos agregados que os controllers precisam; só os agregados
+# parciais ficam em memória, então o pico depende do tamanho do bloco e do
+# número de grupos, não do tamanho do arquivo. Os resultados têm o mesmo
+# formato dos métodos equivalentes dos controllers, que passam a usá-los
+# (sem carregar o dataset) quando shouldStream() indica um arquivo grande
+# demais; DataStore.warm também deixa esses datasets de fora.
+import os
+
+import pandas as pd
+
+from models import dataModel
+from models.purchaseTotals import PurchaseTotals, accumulate
+from models.schemas import applySchema, normalizeColumns, readDtypes
+from models.stockEngine import StockEngine, semLocalizacao
+from models.stockSnapshot import LatestStockSnapshot
+
+defaultChunkRows = int(os.environ.get("FCD_CHUNK_ROWS", "200000"))
+# arquivos acima deste tamanho devem ser agregados em blocos em vez de carregados
+streamThresholdBytes = int(os.environ.get("FCD_STREAM_THRESHOLD_MB", "1024")) * 1024 * 1024
+
+
+def _sniffSep(path) -> str:
+    # mesmo critério do _try_read_csv: vírgula por padrão, tab se o cabeçalho indicar
+    with open(path, encoding="utf-8", errors="replace") as f:
+        header = f.readline()
+    return "\t" if "\t" in header and "," not in header else ","
+
+
+def shouldStream(name: str) -> bool:
+    """Indica se o dataset (arquivo principal e lotes) é grande demais para a carga em memória."""
+    paths = [dataModel.datasetPath(name)] + dataModel.partitionFiles(name)
+    return sum(p.stat().st_size for p in paths if p.exists()) > streamThresholdBytes
+
+
+def iterChunks(name: str, chunkRows: int = None):
+    """Gera o dataset `name` (arquivo principal e lotes) em blocos normalizados e tipados pelo schema."""
+    for path in [dataModel.datasetPath(name)] + dataModel.partitionFiles(name):
+        if not path.exists() or path.stat().st_size == 0:
+            continue
+        reader = pd.read_csv(
+            path, sep=_sniffSep(path), dtype=readDtypes(name),
+            chunksize=chunkRows or defaultChunkRows,
+        )
+        for chunk in reader:
+            chunk = normalizeColumns(chunk, name)
+            yield applySchema(chunk, name)
+
+
+def _productNames() -> pd.Series:
+    # produtos é uma tabela de dimensão pequena: lida inteira
+    produtos = dataModel.loadProdutos()
+    if produtos.empty or "produto_nome" not in produtos.columns:
+        return pd.Series(dtype="object")
+    return produtos.drop_duplicates("produto_id").set_index("produto_id")["produto_nome"]
+
+
+def purchaseTotals(chunkRows: int = None) -> PurchaseTotals:
+    """Somas e contagens de todas as compras (PurchasesController.get_totals), lidas em blocos."""
+    totals = PurchaseTotals()
+    for chunk in iterChunks("compras", chunkRows):
+        totals.fold(chunk)
+    return totals
+
+
+def monthlyVolume(chunkRows: int = None) -> pd.DataFrame:
+    """Equivalente a PurchasesController.get_monthly_volume sobre todas as compras."""
+    return purchaseTotals(chunkRows).monthlyVolume()
+
+
+def supplierComparative(chunkRows: int = None) -> pd.DataFrame:
+    """Equivalente a PurchasesController.get_supplier_comparative sobre todas as compras."""
+    return purchaseTotals(chunkRows).supplierComparative()
+
+
+def topProductsBySpend(top: int = 10, chunkRows: int = None) -> pd.DataFrame:
+    """Equivalente a PurchasesController.get_top_products_by_spend sobre todas as compras."""
+    return purchaseTotals(chunkRows).topProducts(_productNames(), top)
+
+
+def topSoldProducts(top: int = 10, chunkRows: int = None) -> pd.DataFrame:
+    """Equivalente a SalesController.getTopProducts sobre todas as vendas."""
+    total = None
+    for chunk in iterChunks("vendas", chunkRows):
+        partial = chunk.groupby("produto_id")[["quantidade_vendida"]].sum()
+        total = accumulate(total, partial)
+    if total is None:
+        return pd.DataFrame(columns=["produtoNome", "quantidadeVendida"])
+    total["produtoNome"] = total.index.map(_productNames())
+    return (
+        total.dropna(subset=["produtoNome"])
+        .groupby("produtoNome")["quantidade_vendida"].sum()
+        .sort_values(ascending=False)
+        .head(top)
+        .rename("quantidadeVendida")
+        .reset_index()
+    )
+
+
+def latestStockPerProduct(locations=None, chunkRows: int = None) -> pd.DataFrame:
+    """Equivalente a InventoryController.getLatestStockPerProduct lendo o estoque em blocos."""
+    columns = ["produto_id", "quantidade_estoque", "estoque_minimo", "lojas_em_alerta"]
+    perStore = LatestStockSnapshot(keyCols=("produto_id", "localizacao"))
+    perProduct = LatestStockSnapshot(keyCols=("produto_id",))
+    hasLocation = True
+    for chunk in iterChunks("estoque", chunkRows):
+        hasLocation = "localizacao" in chunk.columns
+        (perStore if hasLocation else perProduct).foldChunk(chunk)
+
+    latest = perStore.latest if hasLocation else perProduct.latest
+    if latest is None:
+        return pd.DataFrame(columns=columns)
+
+    engine = StockEngine()
+    latest = latest.reset_index()
+    if not hasLocation:
+        latest["localizacao"] = semLocalizacao
+    latest["em_alerta"] = latest["quantidade_estoque"] < latest["estoque_minimo"]
+    return engine.networkRollup(latest, locations)[columns]
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Scorecard de fornecedores sobre o histórico de compras.
+#
+# As métricas saem de um único groupby por fornecedor (ou fornecedor ×
+# categoria de produto). O cadastro (fornecedores.csv) é ligado pelo nome
+# normalizado, resolvido uma vez por fornecedor distinto e espalhado pelos
+# códigos do categórico — nada de merge linha a linha. Fornecedores das
+# compras sem nome igual no cadastro ficam sem os atributos; a contagem vai
+# em `attrs["cadastro"]` e colunas do cadastro vazias em todas as linhas
+# são omitidas.
+
+statusRates = {"Entregue": "taxaEntregue", "Pendente": "taxaPendente", "Cancelada": "taxaCancelada"}
+cadastroCols = ["fornecedor_id", "cnpj", "cidade", "estado", "avaliacao_media"]
+
+
+def _normalizeName(values) -> pd.Index:
+    return pd.Index(values).astype(str).str.strip().str.casefold()
+
+
+def supplierLookup(df: pd.DataFrame, fornecedores: pd.DataFrame) -> pd.DataFrame:
+    """
+    Atributos do cadastro alinhados linha a linha com `df` (coluna `fornecedor`).
+
+    A busca é feita só nos valores distintos de `fornecedor` (categorias) e
+    depois expandida pelos códigos; fornecedores sem cadastro ficam NaN.
+    """
+    cols = [c for c in cadastroCols if c in fornecedores.columns]
+    if fornecedores.empty or "nome_fornecedor" not in fornecedores.columns or not cols:
+        return pd.DataFrame(index=df.index)
+    cadastro = fornecedores.drop_duplicates("nome_fornecedor")
+    cadastro = cadastro.set_index(_normalizeName(cadastro["nome_fornecedor"]))[cols]
+
+    fornecedor = df["fornecedor"].astype("category")
+    positions = cadastro.index.get_indexer(_normalizeName(fornecedor.cat.categories))
+    codes = fornecedor.cat.codes.to_numpy()
+    # código -1 (fornecedor ausente) e categoria sem cadastro viram -1
+    rows = np.where(codes >= 0, positions[codes], -1) if len(positions) else np.full(len(codes), -1)
+    out = cadastro.reset_index(drop=True).reindex(rows)
+    out.index = df.index
+    return out
+
+
+def scorecard(compras: pd.DataFrame, fornecedores: pd.DataFrame = None, byCategory: bool = False) -> pd.DataFrame:
+    """
+    Indicadores por fornecedor (ou fornecedor × categoria):
+
+    - percentilPreco: posição média do preço pago entre todas as compras do
+      mesmo produto (perto de 0 = mais barato, 1 = mais caro);
+    - prazoP50 / prazoP95: distribuição do prazo de entrega;
+    - taxaEntregue / taxaPendente / taxaCancelada: status das compras;
+    - participacaoGasto: fatia do gasto total (ou da categoria).
+
+    Com `fornecedores`, `attrs["cadastro"]` traz quantos fornecedores
+    distintos há no scorecard e quantos foram achados no cadastro.
+    """
+    needed = ["fornecedor", "produto_id", "valor_unitario", "valor_total", "prazo_entrega_dias"]
+    if compras.empty or any(c not in compras.columns for c in needed):
+        return pd.DataFrame()
+    keys = ["fornecedor"] + (["categoria"] if byCategory and "categoria" in compras.columns else [])
+
+    status = compras["status_compra"] if "status_compra" in compras.columns else pd.Series(index=compras.index, dtype="object")
+    prazo = compras["prazo_entrega_dias"]
+    work = pd.DataFrame({
+        **{k: compras[k] for k in keys},
+        "percentilPreco": compras.groupby("produto_id")["valor_unitario"].rank(pct=True),
+        "prazo": prazo,
+        "valor_total": compras["valor_total"],
+        **{col: status == s for s, col in statusRates.items()},
+    })
+
+    grouped = work.groupby(keys, observed=True)
+    card = grouped.agg(
+        compras=("valor_total", "size"),
+        gastoTotal=("valor_total", "sum"),
+        percentilPreco=("percentilPreco", "mean"),
+        **{col: (col, "mean") for col in statusRates.values()},
+    )
+    quantiles = grouped["prazo"].quantile([0.5, 0.95]).unstack()
+    card["prazoP50"] = quantiles[0.5]
+    card["prazoP95"] = quantiles[0.95]
+
+    if "categoria" in keys:
+        card["participacaoGasto"] = card["gastoTotal"] / card.groupby(level="categoria")["gastoTotal"].transform("sum")
+    else:
+        card["participacaoGasto"] = card["gastoTotal"] / card["gastoTotal"].sum()
+    card = card.reset_index()
+
+    match = None
+    if fornecedores is not None and not fornecedores.empty:
+        lookup = supplierLookup(card, fornecedores)
+        found = lookup.notna().any(axis=1) if not lookup.columns.empty else pd.Series(False, index=card.index)
+        match = {
+            "fornecedores": int(card["fornecedor"].nunique()),
+            "encontrados": int(card.loc[found, "fornecedor"].nunique()),
+        }
+        # atributos que nenhum fornecedor tem não viram colunas vazias
+        card = pd.concat([card, lookup.dropna(axis=1, how="all")], axis=1)
+    card = card.sort_values("gastoTotal", ascending=False, kind="mergesort").reset_index(drop=True)
+    if match is not None:
+        card.attrs["cadastro"] = match
+    return card
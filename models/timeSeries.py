@@ -0,0 +1,102 @@
+import pandas as pd
+
+# Séries temporais a partir de baldes diários.
+#
+# Vendas e compras são somadas por dia uma única vez; semana, mês e
+# trimestre, médias móveis e comparação com o ano anterior saem desses
+# baldes (no máximo um ponto por dia), sem voltar às linhas brutas. Cada
+# TimeSeriesEngine guarda as visões já calculadas, então trocar de
+# granularidade e voltar é imediato.
+
+# granularidade -> regra de resample (rótulo no início do período)
+frequencies = {"D": "D", "W": "W-MON", "M": "MS", "Q": "QS"}
+frequencyLabels = {"D": "Diário", "W": "Semanal", "M": "Mensal", "Q": "Trimestral"}
+# deslocamento usado para achar o mesmo período do ano anterior
+_yearLag = {
+    "D": pd.DateOffset(years=1),
+    "W": pd.Timedelta(weeks=52),
+    "M": pd.DateOffset(years=1),
+    "Q": pd.DateOffset(years=1),
+}
+
+
+def dailyBuckets(df: pd.DataFrame, dateCol: str, valueCols: list, keyCols: list = ()) -> pd.DataFrame:
+    """Soma `valueCols` por dia (e por `keyCols`), ordenado por data."""
+    keyCols = [k for k in keyCols if k in df.columns]
+    frame = df[[dateCol] + keyCols + valueCols]
+    day = frame[dateCol].dt.normalize()
+    out = (
+        frame.groupby([day] + [frame[k] for k in keyCols], observed=True, sort=False)[valueCols]
+        .sum()
+        .reset_index()
+    )
+    return out.sort_values(dateCol, kind="mergesort").reset_index(drop=True)
+
+
+class TimeSeriesEngine:
+    """Totais diários de `valueCols` e as visões derivadas deles."""
+
+    def __init__(self, daily: pd.DataFrame, dateCol: str, valueCols: list):
+        self.dateCol = dateCol
+        self.valueCols = list(valueCols)
+        self.daily = daily
+        self._views = {}
+
+    @classmethod
+    def fromFrame(cls, df: pd.DataFrame, dateCol: str, valueCols: list) -> "TimeSeriesEngine":
+        """Engine a partir de linhas brutas ou de baldes diários (re-somados por dia)."""
+        valueCols = [c for c in valueCols if c in df.columns]
+        if df.empty or dateCol not in df.columns:
+            daily = pd.DataFrame(columns=valueCols, index=pd.DatetimeIndex([], name=dateCol))
+        else:
+            daily = df.groupby(df[dateCol].dt.normalize(), observed=True)[valueCols].sum()
+            daily.index.name = dateCol
+        return cls(daily, dateCol, valueCols)
+
+    @property
+    def empty(self) -> bool:
+        return self.daily.empty
+
+    def _resampled(self, freq: str) -> pd.DataFrame:
+        if freq == "D":
+            # dias sem movimento entram com zero, como nas outras granularidades
+            return self.daily.asfreq("D", fill_value=0)
+        rule = frequencies[freq]
+        if freq == "W":
+            return self.daily.resample(rule, closed="left", label="left").sum()
+        return self.daily.resample(rule).sum()
+
+    def view(self, freq: str = "M", window: int = None, yoy: bool = False) -> pd.DataFrame:
+        """
+        Série na granularidade `freq` ("D", "W", "M" ou "Q").
+
+        `window` acrescenta a média móvel de `window` períodos
+        (<coluna>Media); `yoy` acrescenta o valor do mesmo período no ano
+        anterior (<coluna>AnoAnterior) e a variação relativa (<coluna>VarAnual).
+        """
+        key = (freq, window or None, bool(yoy))
+        cached = self._views.get(key)
+        if cached is not None:
+            return cached
+        if self.empty:
+            return pd.DataFrame(columns=[self.dateCol] + self.valueCols)
+
+        series = self._resampled(freq)
+        out = series.copy()
+        if window and window > 1:
+            rolled = series.rolling(window, min_periods=1).mean()
+            for c in self.valueCols:
+                out[f"{c}Media"] = rolled[c]
+        if yoy:
+            previous = series.reindex(series.index - _yearLag[freq])
+            previous.index = series.index
+            for c in self.valueCols:
+                out[f"{c}AnoAnterior"] = previous[c]
+                out[f"{c}VarAnual"] = series[c] / previous[c].where(previous[c] != 0) - 1
+        out = out.rename_axis(self.dateCol).reset_index()
+        self._views[key] = out
+        return out
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.daily.memory_usage(index=True, deep=True).sum())
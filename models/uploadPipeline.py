@@ -0,0 +1,103 @@
+import csv
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from models import dataModel, refresher
+from models.dataStore import store
+from models.schemas import canonicalHeader, schemaFor
+
+# um único worker: pré-builds de uploads seguidos não disputam CPU entre si
+_prebuildExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fcd-prebuild")
+
+
+class UploadError(ValueError):
+    """Upload rejeitado na validação (o arquivo atual em data/ não é alterado)."""
+
+
+def _lines(text, sink):
+    # repassa as linhas ao csv.reader e grava cada uma no arquivo temporário
+    for line in text:
+        sink.write(line)
+        yield line
+
+
+def _validateHeader(header: list, name: str):
+    columns = canonicalHeader(header, name)
+    missing = [c for c in schemaFor(name).get("required", []) if c not in columns]
+    if missing:
+        raise UploadError(f"{name}.csv sem as colunas obrigatórias: {', '.join(missing)}")
+
+
+def saveUpload(upload, name: str, prebuild: bool = True):
+    """
+    Grava o upload de `name` em data/ sem passar por um DataFrame.
+
+    Os bytes são copiados em fluxo para um arquivo temporário enquanto o
+    cabeçalho e a largura de cada linha são validados; só no fim o arquivo é
+    trocado de forma atômica (os.replace), então um processo interrompido não
+    deixa um CSV pela metade. Retorna o Future do pré-build em background
+    (cache Arrow + cache compartilhado), ou None.
+    """
+    target = dataModel.datasetPath(name)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.upload-{os.getpid()}.tmp")
+
+    upload.seek(0)
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as sink:
+            lines = _lines(text, sink)
+            first = next(lines, "")
+            delimiter = "\t" if "\t" in first and "," not in first else ","
+            header = next(csv.reader([first], delimiter=delimiter), [])
+            if not header:
+                raise UploadError(f"{name}.csv está vazio.")
+            _validateHeader(header, name)
+
+            width = len(header)
+            for lineNo, row in enumerate(csv.reader(lines, delimiter=delimiter), start=2):
+                if row and len(row) != width:
+                    raise UploadError(
+                        f"{name}.csv: linha {lineNo} tem {len(row)} colunas (esperado {width})."
+                    )
+            sink.flush()
+            os.fsync(sink.fileno())
+        os.replace(tmp, target)
+    except UnicodeDecodeError:
+        raise UploadError(f"{name}.csv não está em UTF-8.")
+    finally:
+        # devolve o buffer do Streamlit intacto e remove sobras em caso de erro
+        text.detach()
+        if tmp.exists():
+            tmp.unlink()
+
+    if prebuild:
+        return _prebuildExecutor.submit(_prebuild, name)
+    return None
+
+
+def _prebuild(name: str):
+    # com a atualização em segundo plano ligada, ela recarrega o dataset e as visões
+    if refresher.running():
+        refresher.wake()
+        return None
+    # senão carrega pelo cache compartilhado, que também grava o cache Arrow
+    return store.get(name)
+
+
+def saveUploads(uploads: dict) -> list:
+    """
+    Grava vários uploads {dataset: arquivo}; arquivos None são ignorados.
+
+    Retorna a lista de mensagens de erro (vazia se tudo foi salvo).
+    """
+    errors = []
+    for name, upload in uploads.items():
+        if upload is None:
+            continue
+        try:
+            saveUpload(upload, name)
+        except UploadError as e:
+            errors.append(str(e))
+    return errors
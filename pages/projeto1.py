@@ -1,14 +1,25 @@
 # app.py
+import time
+
+renderStart = time.perf_counter()
+
 import streamlit as st
-import plotly.express as px
 from controllers.inventoryController import InventoryController
-import pandas as pd
+from controllers.forecastController import ForecastController
+from controllers.ledgerController import LedgerController
+from controllers import warmup
+from models.uploadPipeline import saveUploads
+from components.rendering import pagedDataframe
+from components.performancePanel import performancePanel
+from models import refresher
+from models.instrumentation import span
 
 st.set_page_config(page_title="Dashboard de Estoque", layout="wide")
 
 st.title("📦 Dashboard de Controle de Estoque")
 
-invCtrl = InventoryController()
+# dados recarregados em segundo plano quando os arquivos de data/ mudam
+refresher.start()
 
 # upload opcional
 st.sidebar.header("Dados")
@@ -16,18 +27,22 @@ with st.sidebar.expander("Carregar novos CSVs (opcional)"):
     uploadedProdutos = st.file_uploader("produtos.csv", type=["csv"], key="upProdutos")
     uploadedEstoque = st.file_uploader("estoque.csv", type=["csv"], key="upEstoque")
     if st.button("Atualizar dados"):
-        if uploadedProdutos is not None:
-            uploadedProdutos.seek(0)
-            pd.read_csv(uploadedProdutos).to_csv("data/produtos.csv", index=False)
-        if uploadedEstoque is not None:
-            uploadedEstoque.seek(0)
-            pd.read_csv(uploadedEstoque).to_csv("data/estoque.csv", index=False)
-        st.success("Arquivos salvos em data/. Reinicialize para recarregar.")
-
-invCtrl.reloadData()
-inventoryDf = invCtrl.buildInventoryView()
+        erros = saveUploads({"produtos": uploadedProdutos, "estoque": uploadedEstoque})
+        if erros:
+            st.error("\n\n".join(erros))
+        else:
+            st.success("Arquivos salvos em data/. Os dados novos aparecem na próxima interação, sem reiniciar.")
+
+# controller criado após o upload: os dados vêm do cache compartilhado,
+# que já detecta arquivos novos pela versão
+invCtrl = InventoryController()
 
 st.sidebar.header("Filtros")
+localizacoes = invCtrl.getLocations()
+selectedLocations = st.sidebar.multiselect("Filtrar por localização", options=localizacoes, default=localizacoes)
+# todas selecionadas = rede inteira (evita o filtro desnecessário)
+inventoryDf = invCtrl.buildInventoryView(None if set(selectedLocations) == set(localizacoes) else selectedLocations)
+
 categorias = sorted(inventoryDf["categoria"].dropna().unique().tolist()) if "categoria" in inventoryDf.columns else []
 selectedCategories = st.sidebar.multiselect("Filtrar por categoria", options=categorias, default=categorias)
 
@@ -49,36 +64,82 @@ with col3:
 
 st.markdown("---")
 st.subheader("Tabela de Produtos")
-displayCols = ["produtoId", "produtoNome", "categoria", "quantidadeEstoque", "estoqueMinimo", "precoUnitario", "valorTotal"]
-for c in displayCols:
-    if c not in filtered.columns:
-        filtered[c] = ""
+displayCols = ["produtoId", "produtoNome", "categoria", "quantidadeEstoque", "estoqueMinimo", "lojasEmAlerta", "precoUnitario", "valorTotal"]
+# o recorte é compartilhado (memo): colunas ausentes entram só na cópia exibida
+tableDf = filtered.reindex(columns=displayCols, fill_value="")
 
-st.dataframe(filtered[displayCols].sort_values(["categoria", "produtoNome"]).reset_index(drop=True), use_container_width=True)
+pagedDataframe(tableDf.sort_values(["categoria", "produtoNome"]).reset_index(drop=True), key="tabelaProdutos", use_container_width=True)
 
 st.markdown("---")
 st.subheader("Estoque Atual vs Estoque Mínimo")
+# plotly só é importado depois das métricas: o primeiro paint não espera por ele
+import plotly.express as px
+
 maxBars = 40
-plotDf = filtered.copy().sort_values("quantidadeEstoque", ascending=False).head(maxBars)
-
-fig = px.bar(
-    plotDf.melt(id_vars=["produtoNome"], value_vars=["quantidadeEstoque", "estoqueMinimo"]),
-    x="produtoNome", y="value", color="variable",
-    barmode="group",
-    labels={"value": "Quantidade", "produtoNome": "Produto", "variable": "Métrica"},
-    title=f"Comparação (top {min(maxBars, len(plotDf))} produtos)"
-)
+# só os maiores estoques vão para o gráfico; a tabela acima tem todos os produtos
+plotDf = filtered[["produtoNome", "quantidadeEstoque", "estoqueMinimo"]].nlargest(maxBars, "quantidadeEstoque")
+
+with span("render.projeto1.estoqueVsMinimo", rowsIn=len(plotDf)):
+    fig = px.bar(
+        plotDf.melt(id_vars=["produtoNome"], value_vars=["quantidadeEstoque", "estoqueMinimo"]),
+        x="produtoNome", y="value", color="variable",
+        barmode="group",
+        labels={"value": "Quantidade", "produtoNome": "Produto", "variable": "Métrica"},
+        title=f"Comparação (top {min(maxBars, len(filtered))} produtos)"
+    )
 
-alertProducts = plotDf[plotDf["quantidadeEstoque"] < plotDf["estoqueMinimo"]]["produtoNome"].tolist()
-if alertProducts:
-    fig.update_layout(legend_title_text=None)
+    alertProducts = plotDf[plotDf["quantidadeEstoque"] < plotDf["estoqueMinimo"]]["produtoNome"].tolist()
+    if alertProducts:
+        fig.update_layout(legend_title_text=None)
 
-st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True)
 
 st.markdown("---")
 st.subheader("Produtos com Estoque Abaixo do Mínimo (filtrado)")
 if numBelow > 0:
-    alertDf = filtered[belowMask].sort_values("categoria")
-    st.table(alertDf[["produtoId", "produtoNome", "categoria", "quantidadeEstoque", "estoqueMinimo", "precoUnitario", "valorTotal"]])
+    alertDf = tableDf[belowMask].sort_values("categoria")
+    pagedDataframe(alertDf[["produtoId", "produtoNome", "categoria", "quantidadeEstoque", "estoqueMinimo", "lojasEmAlerta", "precoUnitario", "valorTotal"]], key="tabelaAlertas", use_container_width=True)
+else:
+    st.info("Nenhum produto em alerta no conjunto filtrado.")
+
+st.markdown("---")
+st.subheader("🔮 Previsão de Ruptura e Reposição")
+reviewDays = int(st.number_input("Dias até a próxima revisão de compras", min_value=1, max_value=365, value=30, step=1))
+forecastDf = ForecastController(invCtrl=invCtrl).getForecast(
+    None if set(selectedLocations) == set(localizacoes) else selectedLocations, reviewDays=reviewDays
+)
+forecastDf = invCtrl.filterByCategory(forecastDf, selectedCategories)
+if forecastDf.empty:
+    st.info("Sem histórico suficiente para a previsão.")
+else:
+    emRisco = forecastDf[forecastDf["rupturaNoPrazo"]]
+    col1, col2 = st.columns(2)
+    col1.metric("Ruptura antes da próxima entrega", f"{len(emRisco)}")
+    col2.metric("Unidades sugeridas para reposição", f"{int(forecastDf['quantidadeSugerida'].sum()):,}")
+    st.caption("Consumo diário pelas vendas recentes (ou, sem vendas, pelas quedas entre snapshots de estoque); prazo pela mediana das compras entregues.")
+    pagedDataframe(forecastDf, key="tabelaPrevisao", use_container_width=True)
+
+st.markdown("---")
+st.subheader("🧾 Conciliação do Estoque")
+# rede inteira: as compras não têm loja, então o filtro de localização não se aplica
+ledgerCtrl = LedgerController(invCtrl=invCtrl)
+reconciliationDf = invCtrl.filterByCategory(ledgerCtrl.getReconciliation(), selectedCategories)
+if reconciliationDf.empty:
+    st.info("São necessários ao menos dois snapshots de estoque por produto para a conciliação.")
 else:
-    st.info("Nenhum produto em alerta no conjunto filtrado.")
\ No newline at end of file
+    divergentes = reconciliationDf[reconciliationDf["periodosDivergentes"] > 0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Produtos com divergência", f"{len(divergentes)}")
+    col2.metric("Perda estimada (unidades)", f"{int(reconciliationDf['perda'].sum()):,}")
+    col3.metric("Entradas sem compra registrada (unidades)", f"{int(reconciliationDf['entradaNaoRegistrada'].sum()):,}")
+    st.caption("Entre dois snapshots seguidos, o esperado é o estoque anterior mais as compras entregues (na data de recebimento) menos as vendas do período.")
+    pagedDataframe(reconciliationDf, key="tabelaConciliacao", use_container_width=True)
+    with st.expander("Períodos com divergência"):
+        ledgerDf = invCtrl.filterByCategory(ledgerCtrl.getLedger(), selectedCategories)
+        pagedDataframe(ledgerDf[ledgerDf["situacao"] != "ok"], key="tabelaRazao", use_container_width=True)
+
+performancePanel()
+
+warmup.recordRender("projeto1", time.perf_counter() - renderStart)
+# acesso direto à página (sem passar pelo app.py) também dispara a pré-carga das demais
+warmup.start()
@@ -1,13 +1,24 @@
+import time
+
+renderStart = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from controllers.salesController import SalesController
+from controllers import warmup
+from models.ingestion import appendBatch
+from models.uploadPipeline import UploadError, saveUploads
+from components.rendering import downsample, pagedDataframe
+from components.performancePanel import performancePanel
+from models import refresher
+from models.instrumentation import span
+from models.timeSeries import frequencyLabels
 
 st.set_page_config(page_title="Dashboard de Vendas", layout="wide")
 st.title("📈 Dashboard de Movimentações de Vendas")
 
-salesCtrl = SalesController()
-df = salesCtrl.vendasDf
+# dados recarregados em segundo plano quando os arquivos de data/ mudam
+refresher.start()
 
 # Upload opcional
 st.sidebar.header("Dados")
@@ -15,32 +26,64 @@ with st.sidebar.expander("Carregar novos CSVs (opcional)"):
     uploadedVendas = st.file_uploader("vendas.csv", type=["csv"], key="upVendas")
     uploadedProdutos = st.file_uploader("produtos.csv", type=["csv"], key="upProdutos")
     if st.button("Atualizar dados"):
-        if uploadedVendas is not None:
-            uploadedVendas.seek(0)
-            pd.read_csv(uploadedVendas).to_csv("data/vendas.csv", index=False)
-        if uploadedProdutos is not None:
-            uploadedProdutos.seek(0)
-            pd.read_csv(uploadedProdutos).to_csv("data/produtos.csv", index=False)
-        st.success("Arquivos salvos em data/. Reinicialize para recarregar.")
+        erros = saveUploads({"vendas": uploadedVendas, "produtos": uploadedProdutos})
+        if erros:
+            st.error("\n\n".join(erros))
+        else:
+            st.success("Arquivos salvos em data/. Os dados novos aparecem na próxima interação, sem reiniciar.")
+    # lote incremental: só vendas com venda_id inédito, sem reprocessar o histórico
+    uploadedLote = st.file_uploader("Lote de vendas (acréscimo)", type=["csv"], key="upLoteVendas")
+    if st.button("Acrescentar lote", key="acrescentarVendas") and uploadedLote is not None:
+        try:
+            res = appendBatch("vendas", uploadedLote)
+            st.success(
+                f"{res['novas']} vendas novas ({res['duplicadas']} repetidas, "
+                f"{res['invalidas']} inválidas ignoradas). Última data: {res['marca']['ultimaData']}."
+            )
+        except UploadError as e:
+            st.error(str(e))
+
+salesCtrl = SalesController()
+# vendas.csv grande demais para a memória: nada de filtros, só agregados lidos em blocos
+opcoes = None if salesCtrl.streaming else salesCtrl.getFilterOptions()
 
+if salesCtrl.streaming:
+    st.warning("vendas.csv é grande demais para carregar inteiro: o ranking abaixo cobre todo o histórico, "
+               "lido em blocos, sem filtros, série temporal nem tabela de vendas.")
+    import plotly.express as px
+
+    st.subheader("Top 10 Produtos Mais Vendidos")
+    topDf = salesCtrl.getTopProducts()
+    if topDf.empty:
+        st.info("Não há produtos vendidos.")
+    else:
+        figTop = px.bar(topDf, x="produtoNome", y="quantidadeVendida", labels={"produtoNome":"Produto", "quantidadeVendida":"Quantidade Vendida"})
+        st.plotly_chart(figTop, use_container_width=True)
 # Verifica se há dados
-if df.empty:
+elif not opcoes["lojas"] and not opcoes["produtos"]:
     st.warning("Nenhum dado de vendas disponível. Por favor, carregue os arquivos CSV.")
 else:
     st.sidebar.header("Filtros")
-    lojas = sorted(df["loja"].dropna().unique())
-    produtos = sorted(df["produtoNome"].dropna().unique())
+    lojas = opcoes["lojas"]
+    produtos = opcoes["produtos"]
 
     selectedLojas = st.sidebar.multiselect("Filtrar por loja", options=lojas, default=lojas)
     selectedProdutos = st.sidebar.multiselect("Filtrar por produto", options=produtos, default=produtos)
-    startDate = st.sidebar.date_input("Data inicial", value=df["data"].min())
-    endDate = st.sidebar.date_input("Data final", value=df["data"].max())
+    startDate = st.sidebar.date_input("Data inicial", value=opcoes["inicio"])
+    endDate = st.sidebar.date_input("Data final", value=opcoes["fim"])
+
+    # seleção completa vira "sem filtro": o controller reconhece o cubo inteiro
+    filtroLojas = None if set(selectedLojas) == set(lojas) else selectedLojas
+    filtroProdutos = None if set(selectedProdutos) == set(produtos) else selectedProdutos
+    filtroInicio = None if pd.Timestamp(startDate) <= opcoes["inicio"] else pd.to_datetime(startDate)
+    filtroFim = None if pd.Timestamp(endDate) >= opcoes["fim"] else pd.to_datetime(endDate)
 
-    filtered = salesCtrl.filterData(selectedLojas, selectedProdutos, pd.to_datetime(startDate), pd.to_datetime(endDate))
+    # KPIs e gráficos saem do cubo pré-agregado; as linhas brutas só para a tabela
+    cubeDf = salesCtrl.filterCube(filtroLojas, filtroProdutos, filtroInicio, filtroFim)
 
     # Métricas principais
-    totalRevenue = salesCtrl.getRevenue(filtered)
-    totalQty = filtered["quantidadeVendida"].sum()
+    totalRevenue = salesCtrl.getRevenue(cubeDf)
+    totalQty = cubeDf["quantidadeVendida"].sum()
     col1, col2 = st.columns(2)
     with col1:
         st.metric("Receita Total", f"R$ {totalRevenue:,.2f}")
@@ -48,30 +91,62 @@ else:
         st.metric("Quantidade Total Vendida", f"{totalQty}")
 
     st.markdown("---")
+    # plotly só é importado depois das métricas: o primeiro paint não espera por ele
+    import plotly.express as px
+
     # Série temporal
-    st.subheader("Quantidade Vendida por Mês")
-    tsDf = salesCtrl.getTimeSeries(filtered)
+    st.subheader("Quantidade Vendida ao Longo do Tempo")
+    colFreq, colMedia, colAno = st.columns([2, 1, 1])
+    with colFreq:
+        freq = st.radio("Granularidade", options=list(frequencyLabels), index=2,
+                        format_func=frequencyLabels.get, horizontal=True, key="granularidadeVendas")
+    with colMedia:
+        window = int(st.number_input("Média móvel (períodos)", min_value=0, max_value=52, value=0, step=1))
+    with colAno:
+        yoy = st.checkbox("Comparar com ano anterior", key="yoyVendas")
+    # totais diários do recorte ficam em cache: trocar a granularidade não reagrega as vendas
+    if filtroLojas is None and filtroProdutos is None and filtroInicio is None and filtroFim is None:
+        # sem filtro a série mensal padrão pode vir pronta do job em lote
+        tsDf = salesCtrl.getTimeSeries(cubeDf, freq, window, yoy)
+    else:
+        tsDf = salesCtrl.getTimeSeriesEngine(filtroLojas, filtroProdutos, filtroInicio, filtroFim).view(freq, window, yoy)
+    tsDf = downsample(tsDf, "data", "quantidadeVendida")
     if tsDf.empty:
         st.info("Não há dados para o período selecionado.")
     else:
-        fig = px.line(tsDf, x="data", y="quantidadeVendida", markers=True, labels={"data":"Mês", "quantidadeVendida":"Quantidade Vendida"})
-        st.plotly_chart(fig, use_container_width=True)
+        with span("render.projeto2.serieTemporal", rowsIn=len(tsDf)):
+            yCols = ["quantidadeVendida"] + [c for c in ["quantidadeVendidaMedia", "quantidadeVendidaAnoAnterior"] if c in tsDf.columns]
+            fig = px.line(tsDf, x="data", y=yCols, markers=True, labels={"data": frequencyLabels[freq], "value": "Quantidade Vendida", "variable": "Série"})
+            st.plotly_chart(fig, use_container_width=True)
+            if yoy and tsDf["quantidadeVendidaVarAnual"].notna().any():
+                figYoy = px.bar(tsDf, x="data", y="quantidadeVendidaVarAnual", labels={"data": frequencyLabels[freq], "quantidadeVendidaVarAnual": "Variação anual"})
+                figYoy.update_yaxes(tickformat=".0%")
+                st.plotly_chart(figYoy, use_container_width=True)
+            elif yoy:
+                st.caption("Sem histórico do ano anterior para comparar.")
 
     st.markdown("---")
     # Top 10 produtos
     st.subheader("Top 10 Produtos Mais Vendidos")
-    topDf = salesCtrl.getTopProducts(filtered)
+    topDf = salesCtrl.getTopProducts(cubeDf)
     if topDf.empty:
         st.info("Não há produtos vendidos no período filtrado.")
     else:
-        figTop = px.bar(topDf, x="produtoNome", y="quantidadeVendida", labels={"produtoNome":"Produto", "quantidadeVendida":"Quantidade Vendida"})
-        st.plotly_chart(figTop, use_container_width=True)
+        with span("render.projeto2.topProdutos", rowsIn=len(topDf)):
+            figTop = px.bar(topDf, x="produtoNome", y="quantidadeVendida", labels={"produtoNome":"Produto", "quantidadeVendida":"Quantidade Vendida"})
+            st.plotly_chart(figTop, use_container_width=True)
 
     st.markdown("---")
     # Tabela detalhada
     st.subheader("Tabela de Vendas Filtradas")
+    filtered = salesCtrl.filterData(filtroLojas, filtroProdutos, filtroInicio, filtroFim)
     displayCols = ["data", "loja", "produtoId", "produtoNome", "quantidadeVendida", "precoUnitario", "valorTotal"]
-    for c in displayCols:
-        if c not in filtered.columns:
-            filtered[c] = ""
-    st.dataframe(filtered[displayCols].sort_values(["data", "loja", "produtoNome"]).reset_index(drop=True), use_container_width=True)
+    # o recorte pode ser o frame compartilhado: colunas ausentes entram só na cópia exibida
+    filtered = filtered.reindex(columns=displayCols, fill_value="")
+    pagedDataframe(filtered.sort_values(["data", "loja", "produtoNome"]).reset_index(drop=True), key="tabelaVendas", use_container_width=True)
+
+performancePanel()
+
+warmup.recordRender("projeto2", time.perf_counter() - renderStart)
+# acesso direto à página (sem passar pelo app.py) também dispara a pré-carga das demais
+warmup.start()
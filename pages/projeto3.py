@@ -1,16 +1,29 @@
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import time
+
+renderStart = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from controllers.purchasesController import PurchasesController
+from controllers import warmup
+from models.ingestion import appendBatch
+from models.uploadPipeline import UploadError, saveUploads
+from components.rendering import downsample, pagedDataframe, topNWithOthers
+from components.performancePanel import performancePanel
+from models import refresher
+from models.instrumentation import span
+from models.timeSeries import frequencyLabels
 
 st.set_page_config(page_title="Dashboard de Compras e Fornecedores", layout="wide")
 st.title("📦 Dashboard de Compras e Fornecedores")
 
+# dados recarregados em segundo plano quando os arquivos de data/ mudam
+refresher.start()
+
 ctrl = PurchasesController()
-df = ctrl.comprasDf
 
 # Upload opcional
 st.sidebar.header("📂 Importar Arquivos CSV")
@@ -18,17 +31,72 @@ with st.sidebar.expander("Carregar novos arquivos"):
     compras_up = st.file_uploader("compras.csv", type=["csv"])
     produtos_up = st.file_uploader("produtos.csv", type=["csv"])
     if st.button("Atualizar dados"):
-        if compras_up:
-            pd.read_csv(compras_up).to_csv("data/compras.csv", index=False)
-        if produtos_up:
-            pd.read_csv(produtos_up).to_csv("data/produtos.csv", index=False)
-        st.success("✅ Arquivos atualizados! Recarregue a página.")
+        erros = saveUploads({"compras": compras_up, "produtos": produtos_up})
+        if erros:
+            st.error("\n\n".join(erros))
+        else:
+            st.success("✅ Arquivos atualizados! Os dados novos aparecem na próxima interação, sem reiniciar.")
         st.stop()
 
-ctrl.reload_data()
-df = ctrl.comprasDf
+# Lote incremental: só as compras novas (compra_id inédito) entram, sem reprocessar o histórico
+with st.sidebar.expander("Acrescentar lote de compras"):
+    lote_up = st.file_uploader("Lote (CSV)", type=["csv"], key="upLoteCompras")
+    if st.button("Acrescentar", key="acrescentarCompras") and lote_up is not None:
+        try:
+            res = appendBatch("compras", lote_up)
+            st.success(
+                f"✅ {res['novas']} compras novas ({res['duplicadas']} repetidas, "
+                f"{res['invalidas']} inválidas ignoradas). Última data: {res['marca']['ultimaData']}."
+            )
+            ctrl.reload_data()
+        except UploadError as e:
+            st.error(str(e))
+
+# compras.csv grande demais para a memória: só os agregados de todo o histórico, lidos em blocos
+if ctrl.streaming:
+    st.warning("⚠️ compras.csv é grande demais para carregar inteiro: os agregados abaixo cobrem todo o "
+               "histórico, lidos em blocos, sem filtros nem tabela de compras.")
+    import plotly.express as px
+
+    st.subheader("🏭 Comparativo entre Fornecedores")
+    comp = ctrl.get_supplier_comparative()
+    if not comp.empty:
+        compPlot = topNWithOthers(comp, "fornecedor", "gasto_total", 20, agg={"preco_medio": "mean", "prazo_medio": "mean"})
+        fig = px.scatter(
+            compPlot, x="preco_medio", y="prazo_medio", size="gasto_total", hover_name="fornecedor",
+            labels={"preco_medio": "Preço Médio (R$)", "prazo_medio": "Prazo Médio (dias)", "gasto_total": "Gasto Total (R$)"},
+            title="Comparativo de Fornecedores"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        pagedDataframe(comp, key="tabelaFornecedores")
+    else:
+        st.info("Sem dados disponíveis para o comparativo.")
+
+    st.subheader("📅 Volume de Compras no Tempo")
+    ts = ctrl.get_monthly_volume()
+    if not ts.empty:
+        fig_ts = px.bar(downsample(ts, "data_compra", "valor_total"), x="data_compra", y="valor_total",
+                        title="Evolução das Compras (mensal)")
+        st.plotly_chart(fig_ts, use_container_width=True)
+    else:
+        st.info("Sem dados mensais disponíveis.")
+
+    st.subheader("🏷️ Top Produtos por Gasto")
+    top = ctrl.get_top_products_by_spend()
+    if not top.empty:
+        fig_top = px.bar(top, x="produto_nome", y="gasto_total", title="Top Produtos por Gasto")
+        st.plotly_chart(fig_top, use_container_width=True)
+    else:
+        st.info("Nenhum produto encontrado.")
+
+    performancePanel()
+    warmup.recordRender("projeto3", time.perf_counter() - renderStart)
+    warmup.start()
+    st.stop()
 
-if df.empty:
+opcoes = ctrl.get_filter_options()
+
+if not opcoes["fornecedores"] and not opcoes["produtos"]:
     st.warning("⚠️ Nenhum dado encontrado. Coloque os arquivos CSV na pasta `data/`.")
     st.stop()
 
@@ -37,19 +105,25 @@ if df.empty:
 # ==============================
 
 st.sidebar.header("🔍 Filtros")
-fornecedores = sorted(df["fornecedor"].dropna().unique())
-produtos = sorted(df["produto_nome"].dropna().unique())
+fornecedores = opcoes["fornecedores"]
+produtos = opcoes["produtos"]
 
 selected_fornecedores = st.sidebar.multiselect("Fornecedor", fornecedores, default=fornecedores)
 selected_produtos = st.sidebar.multiselect("Produto", produtos, default=produtos)
 
-min_date = df["data_compra"].min()
-max_date = df["data_compra"].max()
+min_date = opcoes["inicio"]
+max_date = opcoes["fim"]
 
 start_date = st.sidebar.date_input("Data inicial", min_date)
 end_date = st.sidebar.date_input("Data final", max_date)
 
-filtered = ctrl.filter_data(selected_fornecedores, selected_produtos, pd.to_datetime(start_date), pd.to_datetime(end_date))
+# seleção completa vira "sem filtro": o controller responde com os totais já agregados
+filtro_fornecedores = None if set(selected_fornecedores) == set(fornecedores) else selected_fornecedores
+filtro_produtos = None if set(selected_produtos) == set(produtos) else selected_produtos
+filtro_inicio = None if pd.Timestamp(start_date) <= min_date else pd.to_datetime(start_date)
+filtro_fim = None if pd.Timestamp(end_date) >= max_date else pd.to_datetime(end_date)
+
+filtered = ctrl.filter_data(filtro_fornecedores, filtro_produtos, filtro_inicio, filtro_fim)
 
 # ==============================
 # ======== MÉTRICAS ============
@@ -66,30 +140,67 @@ st.divider()
 # ==============================
 
 st.subheader("🏭 Comparativo entre Fornecedores")
+# plotly só é importado depois das métricas: o primeiro paint não espera por ele
+import plotly.express as px
+
 comp = ctrl.get_supplier_comparative(filtered)
 if not comp.empty:
-    fig = px.scatter(
-        comp, x="preco_medio", y="prazo_medio", size="gasto_total",
-        hover_name="fornecedor",
-        labels={"preco_medio": "Preço Médio (R$)", "prazo_medio": "Prazo Médio (dias)", "gasto_total": "Gasto Total (R$)"},
-        title="Comparativo de Fornecedores"
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    st.dataframe(comp)
+    # fornecedores além do top-N viram um único ponto "Outros"
+    compPlot = topNWithOthers(comp, "fornecedor", "gasto_total", 20, agg={"preco_medio": "mean", "prazo_medio": "mean"})
+    with span("render.projeto3.comparativo", rowsIn=len(compPlot)):
+        fig = px.scatter(
+            compPlot, x="preco_medio", y="prazo_medio", size="gasto_total",
+            hover_name="fornecedor",
+            labels={"preco_medio": "Preço Médio (R$)", "prazo_medio": "Prazo Médio (dias)", "gasto_total": "Gasto Total (R$)"},
+            title="Comparativo de Fornecedores"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    pagedDataframe(comp, key="tabelaFornecedores")
 else:
     st.info("Sem dados disponíveis para o comparativo.")
 
 st.divider()
 
+# ==============================
+# ===== SCORECARD ==============
+# ==============================
+
+st.subheader("🏅 Scorecard de Fornecedores")
+# calculado sobre todo o histórico (cache por versão); o filtro só escolhe as linhas
+scorecard = ctrl.get_supplier_scorecard()
+if not scorecard.empty:
+    # o cadastro é ligado pelo nome do fornecedor: avisa quando os nomes não batem
+    cadastro = scorecard.attrs.get("cadastro")
+    if cadastro and cadastro["encontrados"] == 0:
+        st.warning("⚠️ Nenhum fornecedor das compras tem nome igual em fornecedores.csv: "
+                   "o scorecard sai sem os dados do cadastro (CNPJ, cidade, avaliação).")
+    elif cadastro and cadastro["encontrados"] < cadastro["fornecedores"]:
+        st.caption(f"{cadastro['encontrados']} de {cadastro['fornecedores']} fornecedores encontrados "
+                   "em fornecedores.csv (pelo nome); os demais ficam sem os dados do cadastro.")
+    pagedDataframe(scorecard[scorecard["fornecedor"].isin(selected_fornecedores)], key="tabelaScorecard")
+    with st.expander("Por categoria de produto"):
+        scorecardCat = ctrl.get_supplier_scorecard(by_category=True)
+        pagedDataframe(scorecardCat[scorecardCat["fornecedor"].isin(selected_fornecedores)], key="tabelaScorecardCategoria")
+else:
+    st.info("Sem dados disponíveis para o scorecard.")
+
+st.divider()
+
 # ==============================
 # ====== VOLUME MENSAL =========
 # ==============================
 
-st.subheader("📅 Volume de Compras por Mês")
-ts = ctrl.get_monthly_volume(filtered)
+st.subheader("📅 Volume de Compras no Tempo")
+freq = st.radio("Granularidade", options=list(frequencyLabels), index=2,
+                format_func=frequencyLabels.get, horizontal=True, key="granularidadeCompras")
+# baldes diários por filtro em cache: a troca de granularidade só reamostra
+volume = ctrl.get_volume_engine(filtro_fornecedores, filtro_produtos, filtro_inicio, filtro_fim)
+ts = volume.view(freq)
 if not ts.empty:
-    fig_ts = px.bar(ts, x="data_compra", y="valor_total", title="Evolução Mensal das Compras")
-    st.plotly_chart(fig_ts, use_container_width=True)
+    with span("render.projeto3.volumeMensal", rowsIn=len(ts)):
+        fig_ts = px.bar(downsample(ts, "data_compra", "valor_total"), x="data_compra", y="valor_total",
+                        title=f"Evolução das Compras ({frequencyLabels[freq].lower()})")
+        st.plotly_chart(fig_ts, use_container_width=True)
 else:
     st.info("Sem dados mensais disponíveis.")
 
@@ -102,12 +213,19 @@ st.divider()
 st.subheader("🏷️ Top Produtos por Gasto")
 top = ctrl.get_top_products_by_spend(filtered)
 if not top.empty:
-    fig_top = px.bar(top, x="produto_nome", y="gasto_total", title="Top Produtos por Gasto")
-    st.plotly_chart(fig_top, use_container_width=True)
+    with span("render.projeto3.topProdutos", rowsIn=len(top)):
+        fig_top = px.bar(top, x="produto_nome", y="gasto_total", title="Top Produtos por Gasto")
+        st.plotly_chart(fig_top, use_container_width=True)
 else:
     st.info("Nenhum produto encontrado.")
 
 st.divider()
 
 st.subheader("📊 Tabela de Compras Filtrada")
-st.dataframe(filtered)
+pagedDataframe(filtered, key="tabelaCompras", enrich=ctrl.with_product_attributes)
+
+performancePanel()
+
+warmup.recordRender("projeto3", time.perf_counter() - renderStart)
+# acesso direto à página (sem passar pelo app.py) também dispara a pré-carga das demais
+warmup.start()
@@ -0,0 +1,170 @@
+# Lotes incrementais (models/ingestion.py) contra uma recarga a frio.
+#
+# Um lote com ids repetidos (do histórico e do próprio lote) e datas fora de
+# ordem é acrescentado a compras e a vendas; os resultados dos controllers,
+# estendidos no cache, têm de bater com os calculados do zero sobre os
+# mesmos arquivos. Rodar da raiz do repositório: python -m pytest -q
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models import artifacts, dataModel, ingestion, memo, sqlBackend
+from models.dataStore import store
+from controllers.inventoryController import InventoryController
+from controllers.ledgerController import LedgerController
+from controllers.purchasesController import PurchasesController
+from controllers.salesController import SalesController
+
+fornecedores = ["Pirelli Brasil", "Yamaha Parts", "Distribuidora Alfa"]
+lojas = ["Loja 1", "Loja 2", "Loja 3"]
+
+
+def _writeData(directory):
+    rng = np.random.default_rng(7)
+    directory.mkdir()
+    nProdutos = 12
+    pd.DataFrame({
+        "produto_id": np.arange(1, nProdutos + 1),
+        "produto_nome": [f"Produto {i:02d}" for i in range(1, nProdutos + 1)],
+        "categoria": rng.choice(["Pneus", "Acessórios"], nProdutos),
+        "marca": rng.choice(["Yamaha", "Honda"], nProdutos),
+        "preco_unitario": rng.uniform(10, 500, nProdutos).round(2),
+    }).to_csv(directory / "produtos.csv", index=False)
+    pd.DataFrame({
+        "fornecedor_id": [1, 2, 3], "nome_fornecedor": fornecedores,
+        "cidade": ["Recife", "São Paulo", "Manaus"], "estado": ["PE", "SP", "AM"],
+        "avaliacao_media": [4.5, 4.1, 3.9],
+    }).to_csv(directory / "fornecedores.csv", index=False)
+
+    n = 300
+    qtd = rng.integers(1, 50, n)
+    preco = rng.uniform(10, 400, n).round(2)
+    pd.DataFrame({
+        "compra_id": np.arange(1, n + 1),
+        "data_compra": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")).strftime("%d/%m/%Y"),
+        "produto_id": rng.integers(1, nProdutos + 1, n),
+        "fornecedor": rng.choice(fornecedores, n),
+        "quantidade_comprada": qtd,
+        "valor_unitario": preco,
+        "valor_total": (qtd * preco).round(2),
+        "prazo_entrega_dias": rng.integers(1, 20, n),
+        "status_compra": rng.choice(["Entregue", "Pendente", "Cancelada"], n, p=[0.8, 0.1, 0.1]),
+    }).to_csv(directory / "compras.csv", index=False)
+
+    n = 500
+    qtd = rng.integers(1, 10, n)
+    preco = rng.uniform(10, 400, n).round(2)
+    pd.DataFrame({
+        "venda_id": np.arange(1, n + 1),
+        "data_venda": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")).strftime("%Y-%m-%d"),
+        "produto_id": rng.integers(1, nProdutos + 1, n),
+        "loja_id": rng.choice(lojas, n),
+        "quantidade_vendida": qtd,
+        "valor_unitario": preco,
+        "valor_total": (qtd * preco).round(2),
+    }).to_csv(directory / "vendas.csv", index=False)
+
+    datas = pd.date_range("2024-01-31", periods=10, freq="MS")
+    grid = pd.MultiIndex.from_product([datas, np.arange(1, nProdutos + 1), lojas]).to_frame(index=False)
+    pd.DataFrame({
+        "estoque_id": np.arange(1, len(grid) + 1),
+        "data_referencia": grid[0].dt.strftime("%Y-%m-%d"),
+        "produto_id": grid[1],
+        "quantidade_estoque": rng.integers(0, 80, len(grid)),
+        "estoque_minimo": 20,
+        "localizacao": grid[2],
+    }).to_csv(directory / "estoque.csv", index=False)
+
+
+def _batches(seed=11):
+    rng = np.random.default_rng(seed)
+    compras = store.get("compras")
+    novas = compras.sample(40, random_state=1).copy()
+    novas["compra_id"] = np.arange(1001, 1041)
+    # datas antes e depois do fim do histórico, fora de ordem
+    novas["data_compra"] = pd.Timestamp("2024-06-15") + pd.to_timedelta(rng.integers(-120, 200, 40), unit="D")
+    loteCompras = pd.concat([compras.head(5), novas, novas.head(3)], ignore_index=True)
+
+    vendas = store.get("vendas")
+    novas = vendas.sample(60, random_state=2).copy()
+    novas["venda_id"] = np.arange(2001, 2061)
+    novas["data_venda"] = pd.Timestamp("2024-08-01") + pd.to_timedelta(rng.integers(-150, 120, 60), unit="D")
+    loteVendas = pd.concat([novas.head(30), vendas.head(4), novas.tail(30), novas.head(2)], ignore_index=True)
+    return loteCompras, loteVendas
+
+
+def _snapshot() -> dict:
+    pc = PurchasesController()
+    sc = SalesController()
+    inv = InventoryController()
+    ledger = LedgerController(invCtrl=inv, purchasesCtrl=pc)
+    full = pc.filter_data()
+    part = pc.filter_data(fornecedores=["Pirelli Brasil"], start=pd.Timestamp("2024-04-01"))
+    cube = sc.filterCube()
+    return {
+        "gastoTotal": pc.get_total_spent(full),
+        "comparativo": pc.get_supplier_comparative(full),
+        "comparativoRecorte": pc.get_supplier_comparative(part),
+        "volumeMensal": pc.get_monthly_volume(full),
+        "volumeSemanal": pc.get_volume_engine().view("W"),
+        "topCompras": pc.get_top_products_by_spend(full),
+        "receita": sc.getRevenue(cube),
+        "cubo": cube.groupby(["data", "loja", "produtoId"], observed=True)[["quantidadeVendida", "valorTotal"]]
+                    .sum().reset_index(),
+        "topVendas": sc.getTopProducts(cube),
+        "serieDiaria": sc.getTimeSeriesEngine().view("D"),
+        "estoqueAtual": inv.getLatestStockPerProduct(),
+        "movimentos": ledger.getMovements().reset_index(),
+        "razao": ledger.getLedger(),
+        "conciliacao": ledger.getReconciliation(),
+    }
+
+
+def _assertSame(appended: dict, cold: dict):
+    assert appended.keys() == cold.keys()
+    for name, value in appended.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(
+                value.reset_index(drop=True), cold[name].reset_index(drop=True),
+                check_dtype=False, check_categorical=False, obj=name,
+            )
+        else:
+            assert value == pytest.approx(cold[name]), name
+
+
+@pytest.fixture(params=["pandas", "sqlite"])
+def dataDir(request, tmp_path, monkeypatch):
+    directory = tmp_path / "data"
+    _writeData(directory)
+    monkeypatch.setattr(dataModel, "dataDir", directory)
+    monkeypatch.setattr(sqlBackend, "backend", request.param)
+    monkeypatch.setattr(artifacts, "enabled", False)
+    store.invalidate()
+    memo.clear()
+    yield directory
+    store.invalidate()
+    memo.clear()
+
+
+def test_appendMatchesColdReload(dataDir, tmp_path, monkeypatch):
+    _snapshot()
+    loteCompras, loteVendas = _batches()
+
+    res = ingestion.appendBatch("compras", loteCompras)
+    assert (res["novas"], res["duplicadas"]) == (40, 8)
+    res = ingestion.appendBatch("vendas", loteVendas)
+    assert (res["novas"], res["duplicadas"]) == (60, 6)
+    # o mesmo lote de novo não acrescenta nada
+    assert ingestion.appendBatch("compras", loteCompras)["novas"] == 0
+
+    appended = _snapshot()
+
+    # recarga a frio: os mesmos arquivos num diretório novo, sem cache nem banco
+    cold = tmp_path / "frio"
+    shutil.copytree(dataDir, cold, ignore=shutil.ignore_patterns(".cache"))
+    monkeypatch.setattr(dataModel, "dataDir", cold)
+    store.invalidate()
+    memo.clear()
+    _assertSame(appended, _snapshot())